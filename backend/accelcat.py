@@ -2,22 +2,25 @@
 # -*- coding: utf-8 -*-
 
 ''' Accelerometer, Velocity and Displacement python service'''
+import argparse
 import time
 import datetime
 import numpy
-import pandas
 import json
-import math
-from microstacknode.hardware.accelerometer.mma8452q import MMA8452Q
+
+try:
+    from microstacknode.hardware.accelerometer.mma8452q import MMA8452Q
+except ImportError:  # only present on the board; the filter engine runs anywhere
+    MMA8452Q = None
 
 G_RANGE = 2
 GRAVITY = 9.80665 # in SI units (m/s^2)
 SAMPLE_CALIBRATION = 1024 # number of sampples
-SAMPLE_FILTERING = 100 # rolling mean samples number
+SAMPLE_FILTERING = 100 # samples read per processing batch
 WINDOW_FILTERING = 20 # rolling mean window
 #T = 0.2  # seconds. Sample rate (5 Hz)
 T = 0.02  # seconds. Sample rate (50 Hz)
-#T = 0.002  # seconds. Sample rate (500 Hz)
+#T = 0.002  # seconds. Sample rate (500 Hz), e.g. --period 0.002
 R = 1 # sample transport rate in minutes
 
 REPOSITORY = "./repository";
@@ -25,13 +28,13 @@ HUBNAME = "accelcat";
 
 # calibration: This calibration routine removes the acceleration offset component in the sensor output due
 # to the earth's gravity (static acceleration)
-def auto_calibration():
+def auto_calibration(accelerometer):
     sstatex = 0
     sstatey = 0
     sstatez = 0
     for i in range(0, SAMPLE_CALIBRATION):
         ms = accelerometer.get_xyz_ms2()
-        
+
         sstatex = sstatex + ms['x']
         sstatey = sstatey + ms['y']
         sstatez = sstatez + ms['z']
@@ -42,158 +45,225 @@ def auto_calibration():
 
     return (sstatex, sstatey, sstatez)
 
-# low pass filtering: pandas rolling mean
-def low_pass_filtering(s, N):
-    # return pandas.rolling_mean(x, N)[N-1:]
-    return s.rolling(window=N, win_type='triang').mean()
-           
-if __name__ == '__main__':
-    # STEP01: initialize transport time and final meassures
+# low pass filtering: triangular window weights, the same as pandas
+# rolling(window=N, win_type='triang') (scipy.signal.windows.triang)
+def triangular_kernel(N):
+    n = numpy.arange(1, (N + 1) // 2 + 1)
+    if N % 2 == 0:
+        w = (2 * n - 1.0) / N
+        w = numpy.concatenate([w, w[::-1]])
+    else:
+        w = 2 * n / (N + 1.0)
+        w = numpy.concatenate([w, w[-2::-1]])
+    return w / w.sum()
+
+
+class TriangularFilter:
+    """
+    Streaming triangular rolling mean over (x, y, z) samples.
+
+    The last N-1 samples are carried over in a preallocated buffer, so every
+    sample after the first N-1 of the stream gets a filtered value, however
+    the stream is split into batches.
+    """
+
+    def __init__(self, N=WINDOW_FILTERING, max_batch=SAMPLE_FILTERING):
+        self.N = N
+        self.kernel = triangular_kernel(N)
+        self.seen = 0
+        self._buffer = numpy.empty((N - 1 + max_batch, 3))
+
+    def process(self, samples):
+        """Filtered values of the samples (n x 3) that complete a window"""
+        n = len(samples)
+        if n > len(self._buffer) - (self.N - 1):
+            # Larger batch than planned for, grow once
+            buffer = numpy.empty((self.N - 1 + n, 3))
+            buffer[:self.N - 1] = self._buffer[:self.N - 1]
+            self._buffer = buffer
+
+        history = min(self.seen, self.N - 1)
+        start = self.N - 1 - history
+        self._buffer[self.N - 1:self.N - 1 + n] = samples
+        window = self._buffer[start:self.N - 1 + n]
+        self.seen += n
+
+        if len(window) < self.N:
+            filtered = numpy.empty((0, 3))
+        else:
+            windows = numpy.lib.stride_tricks.sliding_window_view(window, self.N, axis=0)
+            filtered = windows @ self.kernel
+
+        # Keep the last N-1 samples for the next batch
+        keep = min(self.seen, self.N - 1)
+        self._buffer[self.N - 1 - keep:self.N - 1] = window[len(window) - keep:]
+        return filtered
+
+
+class Integrator:
+    """
+    Velocity and displacement of filtered samples, vectorized per batch.
+
+    Each step is the trapezoid between the previous and the current sample,
+    signed by the direction of the filtered acceleration; the previous
+    acceleration and velocity carry across batches.
+    """
+
+    def __init__(self, calibration, period=T):
+        self.Cax, self.Cay, self.Caz = calibration
+        self.T = period
+        self.Ai = numpy.zeros(3)  # mm/s^2
+        self.Vi = numpy.zeros(3)  # mm/s
+
+    def process(self, filtered):
+        """(A, V, D) arrays (n x 3) in mm/s^2, mm/s and mm"""
+        T = self.T
+        sign = numpy.where(filtered >= 0, 1.0, -1.0)
+        # remove the calibration offsets, and gravity from the z axis
+        A = numpy.empty_like(filtered)
+        A[:, 0] = (filtered[:, 0] - self.Cax) * 1000
+        A[:, 1] = (filtered[:, 1] - self.Cay) * 1000
+        A[:, 2] = (filtered[:, 2] - self.Caz - sign[:, 2] * GRAVITY) * 1000
+
+        A_prev = numpy.vstack([self.Ai, A[:-1]])
+        V = A_prev * T + sign * numpy.abs((A - A_prev) / 2) * T
+        V_prev = numpy.vstack([self.Vi, V[:-1]])
+        D = V_prev * T + sign * numpy.abs((V - V_prev) / 2) * T
+
+        if len(A):
+            self.Ai = A[-1].copy()
+            self.Vi = V[-1].copy()
+        return A, V, D
+
+
+class PeakTracker:
+    """Per axis, A, V and D at the largest |V| since the last report"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.A = numpy.zeros(3)
+        self.V = numpy.zeros(3)
+        self.D = numpy.zeros(3)
+
+    def update(self, A, V, D):
+        if not len(V):
+            return
+        speed = numpy.abs(V)
+        # first occurrence of the maximum, like a running strict comparison
+        k = numpy.argmax(speed, axis=0)
+        axes = numpy.arange(3)
+        better = speed[k, axes] > self.V
+        self.A[better] = numpy.abs(A[k, axes])[better]
+        self.V[better] = speed[k, axes][better]
+        self.D[better] = numpy.abs(D[k, axes])[better]
+
+
+def read_batch(accelerometer, samples, period, next_tick):
+    """
+    Fill `samples` (n x 3) with one reading per `period`, paced against
+    absolute deadlines so the rate does not drift; returns the next deadline
+    and the number of readings that were late
+    """
+    late = 0
+    for i in range(len(samples)):
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -period:
+            late += 1
+        ms = accelerometer.get_xyz_ms2()
+        samples[i, 0] = ms['x']
+        samples[i, 1] = ms['y']
+        samples[i, 2] = ms['z']
+        next_tick += period
+    return next_tick, late
+
+
+def save_report(peaks):
+    data = {'tstamp': datetime.datetime.now().isoformat(),
+            'D': {'x': peaks.D[0],
+                  'y': peaks.D[1],
+                  'z': peaks.D[2]},
+            'V': {'x': peaks.V[0],
+                  'y': peaks.V[1],
+                  'z': peaks.V[2]},
+            'A': {'x': peaks.A[0],
+                  'y': peaks.A[1],
+                  'z': peaks.A[2]}}
+
+    # publish save JSON result on repository folder
+    with open(REPOSITORY + '/' + HUBNAME + '_' + datetime.datetime.now().strftime("%Y%m%d%H%M%S") + '.json', 'w') as f:
+        f.write(json.dumps(data))
+
+    # logging result
+    print('----')
+    print('Json file saved correctly at {}'.format(datetime.datetime.now()))
+    print('Acceleration [mm/s^2] | x: {:.2f}, y: {:.2f}, z: {:.2f}'.format(*peaks.A))
+    print('Velocity [mm/s] | x: {:.2f}, y: {:.2f}, z: {:.2f}'.format(*peaks.V))
+    print('Distance [mm] | x: {:.2f}, y: {:.2f}, z: {:.2f}'.format(*peaks.D))
+    print("\n")
+
+
+def run(accelerometer, period=T, batches=None, report=save_report):
+    """
+    Sample, filter and integrate until `batches` batches are done (forever by default)
+
+    Returns:
+        int: readings that missed their deadline by more than one period
+    """
+    # STEP02: Configure accelerometer
+    accelerometer.standby()
+    accelerometer.set_g_range(G_RANGE)
+    accelerometer.activate()
+    print("Accelerometer G range configuration = {}".format(G_RANGE) + "\n")
+    time.sleep(period)
+
+    # STEP03: auto-calibration
+    calibration = auto_calibration(accelerometer)
+    print('----')
+    print('Auto-calibration data | x: {}, y: {}, z: {}'.format(*calibration) + "\n")
+
+    low_pass = TriangularFilter(WINDOW_FILTERING, SAMPLE_FILTERING)
+    integrator = Integrator(calibration, period)
+    peaks = PeakTracker()
+    samples = numpy.empty((SAMPLE_FILTERING, 3))
+
     ti = time.time()
+    next_tick = time.perf_counter()
+    late = 0
+    done = 0
+    while batches is None or done < batches:
+        # STEP04: read one batch at the sample rate and apply the convolution filter
+        next_tick, batch_late = read_batch(accelerometer, samples, period, next_tick)
+        late += batch_late
+        filtered = low_pass.process(samples)
+
+        # STEP05: velocity and displacement by trapezoidal integration
+        A, V, D = integrator.process(filtered)
+
+        # STEP06: keep the values at the maximum velocity of every axis
+        peaks.update(A, V, D)
+
+        # STEP07: report after transport rate
+        if (time.time() - ti) > R * 60:
+            report(peaks)
+            ti = time.time()
+            peaks.reset()
+        done += 1
+    return late
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Accelerometer, velocity and displacement service")
+    parser.add_argument('--period', type=float, default=T,
+                        help="sample period in seconds, 0.002 for 500 Hz")
+    args = parser.parse_args()
 
-    AxF=0
-    AyF=0
-    AzF=0
-    VxF=0
-    VyF=0
-    VzF=0
-    DxF=0
-    DyF=0
-    DzF=0
+    if MMA8452Q is None:
+        raise SystemExit("microstacknode is not installed")
 
     # connect to the accelerometer device MMA8452Q
     with MMA8452Q() as accelerometer:
-        # STEP02: Configure accelerometer
-        accelerometer.standby()
-        accelerometer.set_g_range(G_RANGE)
-        accelerometer.activate()
-        print("Accelerometer G range configuration = {}".format(G_RANGE) + "\n")
-        time.sleep(T)
-
-        # STEP03: auto-calibration
-        Cax, Cay, Caz = auto_calibration()
-        print('----')
-        print('Auto-calibration data | x: {}, y: {}, z: {}'.format(Cax, Cay, Caz) + "\n")
-        
-        Aix = 0
-        Aiy = 0
-        Aiz = 0
-        Vix = 0
-        Viy = 0
-        Viz = 0
-        
-        while True:
-            # STEP04: apply a convolution filter to the three axis (moving average filter)
-            # extract the raw data from the three accelerometer axis
-            index = range(0, SAMPLE_FILTERING)
-            filtval = []
-            for i in index:
-                filtval.append(accelerometer.get_xyz_ms2())
-
-            # create the data frame from the raw data to be filtered
-            dataFrame = pandas.DataFrame(filtval, index=index, columns=list('xyz'))
-            
-            # apply the convolution filter to the data frame
-            dataFiltered = low_pass_filtering(dataFrame, WINDOW_FILTERING)
-
-            for index, ms in dataFiltered.iterrows():
-               # STEP05: calculate displacement and velocity using a trapezoidal method integration
-               # velocity integration from acceleration
-               # displacement integration from velocity
-               # remove gravity from z axis
-               if numpy.isnan(ms['z']):
-                   continue
-
-               if ms['x'] >=0:
-                   Ax = (ms['x'] - Cax) * 1000 # mm/s^2
-                   Vx = Aix * T + abs((Ax - Aix) / 2) * T # mm/s
-                   Dx = Vix * T + abs((Vx - Vix) / 2) * T # mm
-               else:
-                   Ax = (ms['x'] - Cax) * 1000 # mm/s^2
-                   Vx = Aix * T - abs((Ax - Aix) / 2) * T # mm/s
-                   Dx = Vix * T - abs((Vx - Vix) / 2) * T # mm
-                
-               Aix = Ax
-               Vix = Vx
-
-               if ms['y'] >=0:
-                   Ay = (ms['y'] - Cay) * 1000 # mm/s^2
-                   Vy = Aiy * T + abs((Ay - Aiy) / 2) * T # mm/s
-                   Dy = Viy * T + abs((Vy - Viy) / 2) * T # mm
-               else:
-                   Ay = (ms['y'] - Cay) * 1000 # mm/s^2
-                   Vy = Aiy * T - abs((Ay - Aiy) / 2) * T # mm/s
-                   Dy = Viy * T - abs((Vy - Viy) / 2) * T # mm           
-
-               Aiy = Ay
-               Viy = Vy
-
-               if ms['z'] >=0:
-                   Az = (ms['z'] - Caz - GRAVITY) * 1000 # mm/s^2
-                   Vz = Aiz * T + abs((Az - Aiz) / 2) * T # mm/s
-                   Dz = Viz * T + abs((Vz - Viz) / 2) * T # mm
-               else:
-                   Az = (ms['z'] - Caz + GRAVITY) * 1000 # mm/s^2
-                   Vz = Aiz * T - abs((Az - Aiz) / 2) * T # mm/s
-                   Dz = Viz * T - abs((Vz - Viz) / 2) * T # mm
-
-               Aiz = Az                                 
-               Viz = Vz
-               
-               # STEP06: get the maximun value in the three axis
-               if VxF < abs(Vx):
-                  AxF = abs(Ax)
-                  VxF = abs(Vx)
-                  DxF = abs(Dx)		              
-
-               if VyF < abs(Vy):
-                  AyF = abs(Ay)
-                  VyF = abs(Vy)
-                  DyF = abs(Dy)
-
-               if VzF < abs(Vz):
-                  AzF = abs(Az)
-                  VzF = abs(Vz)
-                  DzF = abs(Dz)
-               
-               # STEP07: create JSON data after transport rate
-               if (time.time() - ti) > R * 60:
-                 data = {'tstamp': datetime.datetime.now().isoformat(),
-                         'D': {'x': DxF,
-                               'y': DyF,
-                               'z': DzF},
-                         'V': {'x': VxF,
-                               'y': VyF,
-                               'z': VzF},
-                         'A': {'x': AxF,
-                               'y': AyF,
-                               'z': AzF}}
-                       
-                 # STEP08: publish save JSON result on repository folder
-                 f = open(REPOSITORY + '/' + HUBNAME + '_' + datetime.datetime.now().strftime("%Y%m%d%H%M%S") + '.json', 'w')
-                 f.write(json.dumps(data))
-                 f.close()
-
-                 # logging result
-                 print('----')
-                 print('Json file saved correctly at {}'.format(datetime.datetime.now()))
-                 print('Acceleration [mm/s^2] | x: {:.2f}, y: {:.2f}, z: {:.2f}'.format(AxF, AyF, AzF))
-                 print('Velocity [mm/s] | x: {:.2f}, y: {:.2f}, z: {:.2f}'.format(VxF, VyF, VzF))
-                 print('Distance [mm] | x: {:.2f}, y: {:.2f}, z: {:.2f}'.format(DxF, DyF, DzF))
-                 print("\n")
-
-                 # initialize transport time and final meassures
-                 ti = time.time()
-
-                 AxF=0
-                 AyF=0
-                 AzF=0
-                 VxF=0
-                 VyF=0
-                 VzF=0
-                 DxF=0
-                 DyF=0
-                 DzF=0
-
-               # next data (T sample rate) 
-               time.sleep(T)
+        run(accelerometer, args.period)
@@ -0,0 +1,347 @@
+"""
+Vectorized player metrics used by the analytics API and the rollup builder.
+
+Every function reproduces the results of the original per-element loops in
+app.py exactly: the step state machine becomes threshold-crossing masks built
+with np.diff-style shifts, the displacement loop a cumulative trapezoid sum,
+and the jump peak scan a mask over the low-passed signal. The first-order IIR
+low-pass is the one recurrence that does not vectorize; it runs through
+scipy.signal.lfilter, or a numba-compiled loop when scipy is unavailable.
+Both are imported on first use to keep worker start-up fast.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+GRAVITY = 9.81
+STEP_THRESHOLD = 2.0
+JUMP_THRESHOLD = 4.0
+JUMP_FILTER_ALPHA = 0.2
+JUMP_MIN_DISTANCE = 5
+
+# Bump whenever a change to this module alters computed results, so cached
+# analytics from the previous version are not served
+ALGORITHM_VERSION = 2
+
+
+def calculate_speed_and_displacement(x_positions, y_positions, z_positions, timestamps):
+    """
+    Calculate speed and displacement using trapezoidal integration method
+    adapted from accelcat.py for post-processing data
+
+    Args:
+        x_positions, y_positions (np.ndarray): Positions per sample
+        z_positions (np.ndarray or None): Heights per sample, None for planar tracking
+        timestamps (np.ndarray): Sample times in epoch microseconds
+
+    Returns:
+        tuple: (speeds, displacements), one value per sample
+    """
+    timestamps = np.asarray(timestamps)
+    x_positions = np.asarray(x_positions, dtype=np.float64)
+    y_positions = np.asarray(y_positions, dtype=np.float64)
+    speeds = np.zeros(len(timestamps))
+    displacements = np.zeros(len(timestamps))
+    if len(timestamps) < 2:
+        return speeds, displacements
+
+    dt = np.diff(timestamps) / 1_000_000  # Convert microseconds to seconds
+
+    # Calculate 3D velocities
+    vx = np.diff(x_positions) / dt
+    vy = np.diff(y_positions) / dt
+    vz = np.diff(np.asarray(z_positions, dtype=np.float64)) / dt if z_positions is not None else 0.0
+
+    speeds[1:] = np.sqrt(vx**2 + vy**2 + vz**2)
+
+    # Cumulative trapezoid of the speeds
+    displacements[1:] = np.cumsum((speeds[1:] + speeds[:-1]) * dt / 2)
+
+    return speeds, displacements
+
+
+def calculate_acceleration(ax, ay, az):
+    """Calculate acceleration magnitude with gravity compensation"""
+    ax = np.asarray(ax, dtype=np.float64)
+    ay = np.asarray(ay, dtype=np.float64)
+    az = np.asarray(az, dtype=np.float64)
+    return np.sqrt(ax**2 + ay**2 + az**2) - GRAVITY
+
+
+def step_edges(acc_magnitude: np.ndarray, threshold: float,
+               prev_acc: float = -1.0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Threshold crossings of the step state machine.
+
+    Args:
+        acc_magnitude (np.ndarray): Acceleration magnitudes
+        threshold (float): Step threshold
+        prev_acc (float): Magnitude preceding the first sample, -1 if none
+
+    Returns:
+        tuple: (rising, falling) boolean masks; a step begins on a rising
+            sample and ends on a falling one
+    """
+    acc = np.asarray(acc_magnitude, dtype=np.float64)
+    prev = np.empty_like(acc)
+    if len(acc):
+        prev[0] = prev_acc
+        prev[1:] = acc[:-1]
+    above = (prev != -1) & (acc > threshold)
+    rising = above & (prev < threshold)
+    falling = ~above & (prev >= threshold) & (acc <= threshold)
+    return rising, falling
+
+
+def detect_steps(acc_magnitude, threshold):
+    """Count steps: falling threshold crossings that follow a rising one"""
+    rising, falling = step_edges(acc_magnitude, threshold)
+    if not rising.any():
+        return 0
+    first_rise = np.argmax(rising)
+    return int(np.count_nonzero(falling[first_rise + 1:]))
+
+
+def _lowpass_loop(values, alpha, initial, out):
+    previous = initial
+    for i in range(len(values)):
+        previous = alpha * values[i] + (1 - alpha) * previous
+        out[i] = previous
+    return out
+
+
+_lowpass_backend = None
+
+
+def _lowpass_impl():
+    """scipy's lfilter, else the loop compiled with numba, else the plain loop"""
+    global _lowpass_backend
+    if _lowpass_backend is None:
+        try:
+            from scipy.signal import lfilter
+            _lowpass_backend = (lfilter, None)
+        except ImportError:
+            try:
+                from numba import njit
+                _lowpass_backend = (None, njit(cache=True)(_lowpass_loop))
+            except ImportError:
+                _lowpass_backend = (None, _lowpass_loop)
+    return _lowpass_backend
+
+
+def lowpass(values: np.ndarray, alpha: float = JUMP_FILTER_ALPHA, initial: Optional[float] = None) -> np.ndarray:
+    """
+    First-order IIR low-pass: y[i] = alpha * x[i] + (1 - alpha) * y[i-1].
+
+    Args:
+        values (np.ndarray): Input signal
+        alpha (float): Smoothing factor
+        initial (float, optional): Filter output preceding values[0]; without
+            it the filter starts at values[0]
+
+    Returns:
+        np.ndarray: Filtered signal
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    if len(values) == 0:
+        return out
+
+    start = 0
+    if initial is None:
+        out[0] = initial = values[0]
+        start = 1
+
+    lfilter, loop = _lowpass_impl()
+    if lfilter is not None:
+        out[start:], _ = lfilter([alpha], [1.0, -(1 - alpha)], values[start:], zi=[(1 - alpha) * initial])
+    else:
+        loop(values[start:], alpha, initial, out[start:])
+    return out
+
+
+def local_peaks(values: np.ndarray, threshold: float) -> np.ndarray:
+    """Indices of strict local maxima above `threshold`, excluding both ends"""
+    inner = values[1:-1]
+    return np.flatnonzero((inner > values[:-2]) & (inner > values[2:]) & (inner > threshold)) + 1
+
+
+def detect_jumps(acc_buffer, jump_threshold):
+    """Count peaks of the low-passed magnitude above the jump threshold"""
+    filtered_acc = lowpass(acc_buffer, JUMP_FILTER_ALPHA)
+    peaks = local_peaks(filtered_acc, jump_threshold)
+    # The original scan only accepted index 1 or indices at least
+    # JUMP_MIN_DISTANCE past it
+    peaks = peaks[(peaks == 1) | (peaks - 1 >= JUMP_MIN_DISTANCE)]
+    return int(len(peaks))
+
+
+def analyze_columns(columns, step_threshold=STEP_THRESHOLD, jump_threshold=JUMP_THRESHOLD):
+    """
+    Metrics of a raw window as returned by DatabaseHandler.get_player_columns.
+
+    Returns:
+        dict: An analytics result (see analytics_response) with
+            resolution 'raw'; tags report planar positions only
+    """
+    timestamps = columns['timestamp_micros']
+    speeds, displacements = calculate_speed_and_displacement(
+        columns['x_position'], columns['y_position'], None, timestamps
+    )
+    acc_magnitude = calculate_acceleration(columns['accel_x'], columns['accel_y'], columns['accel_z'])
+    return {
+        'resolution': 'raw',
+        'timestamps': timestamps,
+        'speeds': speeds,
+        'displacements': displacements,
+        'acc_magnitude': acc_magnitude,
+        # Summed in order, so StreamingAnalytics arrives at the same value
+        'average_speed': float(np.cumsum(speeds)[-1] / len(speeds)),
+        'max_speed': float(np.max(speeds)),
+        'total_displacement': float(displacements[-1]),
+        'step_count': detect_steps(acc_magnitude, threshold=step_threshold),
+        'jump_count': detect_jumps(acc_magnitude, jump_threshold=jump_threshold),
+    }
+
+
+def _carried_cumsum(values, initial):
+    """Cumulative sum continuing from `initial`, rounded exactly like one long np.cumsum"""
+    return np.cumsum(np.concatenate(([initial], values)))[1:]
+
+
+class StreamingAnalytics:
+    """
+    analyze_columns over a window delivered in consecutive chunks.
+
+    Position, step edge, filter and peak state carry across chunk boundaries,
+    so the per-sample series and the summary are identical to analyze_columns
+    over the concatenated window while memory stays bounded by one chunk.
+    """
+
+    def __init__(self, step_threshold=STEP_THRESHOLD, jump_threshold=JUMP_THRESHOLD):
+        self.step_threshold = step_threshold
+        self.jump_threshold = jump_threshold
+        self.samples = 0
+        self.last_ts = None
+        self.last_x = 0.0
+        self.last_y = 0.0
+        self.last_speed = 0.0
+        self.displacement = 0.0
+        self.speed_sum = 0.0
+        self.max_speed = 0.0
+        self.prev_acc = -1.0
+        self.rising_seen = False
+        self.step_count = 0
+        self.filtered = None
+        # Last two filtered samples; the newest still needs its right
+        # neighbour before it can be tested as a peak
+        self.tail_filtered = np.empty(0)
+        self.jump_count = 0
+
+    def update(self, columns):
+        """
+        Add the next chunk of the window.
+
+        Args:
+            columns (dict): Column arrays as returned by DatabaseHandler.iter_player_columns
+
+        Returns:
+            dict: 'timestamps', 'speeds', 'displacements' and 'acc_magnitude'
+                of the chunk
+        """
+        timestamps = columns['timestamp_micros']
+        x = np.asarray(columns['x_position'], dtype=np.float64)
+        y = np.asarray(columns['y_position'], dtype=np.float64)
+        acc_magnitude = calculate_acceleration(columns['accel_x'], columns['accel_y'], columns['accel_z'])
+        n = len(timestamps)
+        if n == 0:
+            return {'timestamps': timestamps, 'speeds': np.zeros(0),
+                    'displacements': np.zeros(0), 'acc_magnitude': acc_magnitude}
+
+        # Speed and displacement, the first sample of the window standing still
+        speeds = np.zeros(n)
+        increments = np.zeros(n)
+        if self.last_ts is None:
+            prev_ts, prev_x, prev_y, prev_speed = timestamps[0], x[0], y[0], 0.0
+            first = 1
+        else:
+            prev_ts, prev_x, prev_y, prev_speed = self.last_ts, self.last_x, self.last_y, self.last_speed
+            first = 0
+        ts_ext = np.concatenate(([prev_ts], timestamps))
+        dt = np.diff(ts_ext)[first:] / 1_000_000
+        vx = np.diff(np.concatenate(([prev_x], x)))[first:] / dt
+        vy = np.diff(np.concatenate(([prev_y], y)))[first:] / dt
+        speeds[first:] = np.sqrt(vx**2 + vy**2 + 0.0**2)
+        speeds_ext = np.concatenate(([prev_speed], speeds))
+        increments[first:] = (speeds_ext[1 + first:] + speeds_ext[first:-1]) * dt / 2
+        displacements = _carried_cumsum(increments[first:], self.displacement)
+        if first:
+            displacements = np.concatenate(([0.0], displacements))
+
+        # Steps: falling crossings once a step has begun
+        rising, falling = step_edges(acc_magnitude, self.step_threshold, self.prev_acc)
+        self.step_count += int(np.count_nonzero(falling & (self.rising_seen | (np.cumsum(rising) > 0))))
+
+        # Jumps: peaks of the low-passed magnitude at global index 1 or at
+        # least JUMP_MIN_DISTANCE past it, as in detect_jumps
+        filtered = lowpass(acc_magnitude, JUMP_FILTER_ALPHA, self.filtered)
+        ext = np.concatenate((self.tail_filtered, filtered))
+        peaks = local_peaks(ext, self.jump_threshold) + (self.samples - len(self.tail_filtered))
+        self.jump_count += int(np.count_nonzero((peaks == 1) | (peaks - 1 >= JUMP_MIN_DISTANCE)))
+
+        self.samples += n
+        self.last_ts = timestamps[-1]
+        self.last_x = x[-1]
+        self.last_y = y[-1]
+        self.last_speed = speeds[-1]
+        self.displacement = displacements[-1]
+        self.speed_sum = _carried_cumsum(speeds, self.speed_sum)[-1]
+        self.max_speed = max(self.max_speed, float(np.max(speeds)))
+        self.prev_acc = acc_magnitude[-1]
+        self.rising_seen = self.rising_seen or bool(rising.any())
+        self.filtered = filtered[-1]
+        self.tail_filtered = ext[-2:]
+
+        return {'timestamps': timestamps, 'speeds': speeds,
+                'displacements': displacements, 'acc_magnitude': acc_magnitude}
+
+    def summary(self):
+        """Window statistics of everything added so far, as in analyze_columns"""
+        return {
+            'resolution': 'raw',
+            'samples': self.samples,
+            'average_speed': float(self.speed_sum / self.samples) if self.samples else 0.0,
+            'max_speed': float(self.max_speed),
+            'total_displacement': float(self.displacement),
+            'step_count': self.step_count,
+            'jump_count': self.jump_count,
+        }
+
+
+def analyze_chunks(chunks, on_chunk=None, step_threshold=STEP_THRESHOLD, jump_threshold=JUMP_THRESHOLD):
+    """
+    analyze_columns over a window delivered in consecutive chunks.
+
+    Args:
+        chunks (iterable): Column dicts as yielded by DatabaseHandler.iter_player_columns
+        on_chunk (callable, optional): Called with the StreamingAnalytics state
+            after every chunk, e.g. to report progress
+
+    Returns:
+        dict: The analytics result analyze_columns returns for the whole
+            window, None if it has no rows
+    """
+    state = StreamingAnalytics(step_threshold, jump_threshold)
+    parts = []
+    for columns in chunks:
+        parts.append(state.update(columns))
+        if on_chunk is not None:
+            on_chunk(state)
+    if not state.samples:
+        return None
+
+    result = state.summary()
+    del result['samples']
+    for key in ('timestamps', 'speeds', 'displacements', 'acc_magnitude'):
+        result[key] = np.concatenate([part[key] for part in parts])
+    return result
@@ -0,0 +1,227 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+from analytics import ALGORITHM_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Keys of an analytics result that hold per-point arrays; the rest are scalars
+ARRAY_KEYS = ('timestamps', 'speeds', 'displacements', 'acc_magnitude')
+
+# Windows ending longer ago than this are cached as final, and rows written
+# for them later bump the player's data revision (DatabaseHandler.insert_tracking_rows)
+IMMUTABLE_AFTER_SECONDS = 600
+
+
+def result_nbytes(result: Dict[str, Any]) -> int:
+    """Approximate memory held by an analytics result"""
+    return sum(result[key].nbytes for key in ARRAY_KEYS) + 512
+
+
+class AnalyticsCache:
+    """
+    Memoized analytics results keyed by player and time window.
+
+    - Keys are (player_id, start_time, end_time, variant, ALGORITHM_VERSION);
+      `variant` holds whatever else changes the result, such as the rollup
+      table and the detection thresholds.
+    - Least recently used results are evicted once the arrays held exceed
+      `max_bytes`.
+    - Windows ending more than `immutable_after` seconds ago are treated as
+      immutable and served without reading their rows. With `disk_dir`
+      they are also written there as .npz files, which survive restarts and
+      back the memory tier once entries are evicted; the directory is pruned
+      oldest first beyond `max_disk_bytes`.
+    - With `revision` (player_id -> data revision, e.g.
+      DatabaseHandler.get_data_revision) immutable results carry the
+      revision they were computed at and are recomputed once it moves, as
+      when late rows are loaded or retention moves rows. Revisions are
+      looked up at most every `revision_ttl` seconds per player.
+    - Windows closer to now are stored with the watermark (row count, newest
+      timestamp) they were computed from and recomputed as soon as the
+      watermark of the window moves.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20, disk_dir: Optional[str] = None,
+                 max_disk_bytes: int = 4 * 2**30, immutable_after: float = IMMUTABLE_AFTER_SECONDS,
+                 revision: Optional[Callable[[str], Optional[int]]] = None, revision_ttl: float = 2.0):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.immutable_after = immutable_after
+        self.revision = revision
+        self.revision_ttl = revision_ttl
+        # player_id -> (revision, monotonic time it was looked up)
+        self._revisions: Dict[str, Tuple[Optional[int], float]] = {}
+
+        # key -> (result, watermark or ('revision', data revision), nbytes)
+        self._entries: "OrderedDict[Hashable, Tuple[Dict[str, Any], Optional[tuple], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def is_immutable(self, end_time: int) -> bool:
+        """Whether no more rows are expected for a window ending at end_time (epoch micros)"""
+        return end_time < (time.time() - self.immutable_after) * 1_000_000
+
+    def _revision(self, player_id: str) -> Optional[int]:
+        """Data revision of a player, 0 without a revision source, None if unknown"""
+        if self.revision is None:
+            return 0
+        now = time.monotonic()
+        cached = self._revisions.get(player_id)
+        if cached is not None and now - cached[1] < self.revision_ttl:
+            return cached[0]
+        revision = self.revision(player_id)
+        self._revisions[player_id] = (revision, now)
+        return revision
+
+    def get_or_compute(self, player_id: str, start_time: int, end_time: int, variant: Hashable,
+                       compute: Callable[[], Optional[Dict[str, Any]]],
+                       watermark: Callable[[], Optional[tuple]]) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached result of a window, computing and storing it on a miss.
+
+        Args:
+            player_id (str): Player of the window
+            start_time (int): Start time in epoch microseconds
+            end_time (int): End time in epoch microseconds
+            variant (hashable): Further inputs the result depends on
+            compute (callable): Computes the result, None if there is no data
+            watermark (callable): Current watermark of the window, only called
+                for windows that are not yet immutable
+
+        Returns:
+            dict: The analytics result, None if compute found no data
+        """
+        key = (player_id, start_time, end_time, variant, ALGORITHM_VERSION)
+        immutable = self.is_immutable(end_time)
+        # Immutable windows are checked against the player's data revision,
+        # the others against the watermark of the window
+        if immutable:
+            revision = self._revision(player_id)
+            mark = None if revision is None else ('revision', revision)
+        else:
+            mark = watermark()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and mark is not None and entry[1] == mark:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        if immutable and mark is not None and self.disk_dir:
+            result = self._load(key, mark[1])
+            if result is not None:
+                self._remember(key, result, mark)
+                self.hits += 1
+                return result
+
+        self.misses += 1
+        result = compute()
+        if result is None:
+            return None
+        if mark is not None:
+            self._remember(key, result, mark)
+            if immutable and self.disk_dir:
+                self._save(key, result, mark[1])
+        return result
+
+    def invalidate(self, player_id: Optional[str] = None) -> None:
+        """Drop cached windows of a player (all players if None) from memory and disk"""
+        with self._lock:
+            for key in [k for k in self._entries if player_id is None or k[0] == player_id]:
+                self._bytes -= self._entries.pop(key)[2]
+        if player_id is None:
+            self._revisions.clear()
+        else:
+            self._revisions.pop(player_id, None)
+        if self.disk_dir:
+            prefix = '' if player_id is None else self._player_prefix(player_id)
+            for entry in os.scandir(self.disk_dir):
+                if entry.name.endswith('.npz') and entry.name.startswith(prefix):
+                    os.remove(entry.path)
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
+
+    def _remember(self, key: Hashable, result: Dict[str, Any], mark: Optional[tuple]) -> None:
+        nbytes = result_nbytes(result)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (result, mark, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    @staticmethod
+    def _player_prefix(player_id: str) -> str:
+        return hashlib.sha1(player_id.encode()).hexdigest()[:12] + '-'
+
+    def _path(self, key: Hashable) -> str:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.disk_dir, self._player_prefix(key[0]) + digest + '.npz')
+
+    def _load(self, key: Hashable, revision: int) -> Optional[Dict[str, Any]]:
+        """The stored result of a window, None if missing or from another data revision"""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                result = {name: data[name] for name in data.files}
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable analytics cache file {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        stored = result.pop('_revision', None)
+        if stored is None or int(stored) != revision:
+            return None
+        for name, value in result.items():
+            if name not in ARRAY_KEYS:
+                result[name] = value.item()
+        return result
+
+    def _save(self, key: Hashable, result: Dict[str, Any], revision: int) -> None:
+        path = self._path(key)
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, _revision=np.int64(revision),
+                         **{name: np.asarray(value) for name, value in result.items()})
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write analytics cache file {path}: {e}")
+            return
+        self._prune_disk()
+
+    def _prune_disk(self) -> None:
+        files = [entry for entry in os.scandir(self.disk_dir) if entry.name.endswith('.npz')]
+        total = sum(entry.stat().st_size for entry in files)
+        if total <= self.max_disk_bytes:
+            return
+        for entry in sorted(files, key=lambda e: e.stat().st_atime):
+            total -= entry.stat().st_size
+            os.remove(entry.path)
+            if total <= self.max_disk_bytes:
+                break
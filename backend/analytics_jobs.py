@@ -0,0 +1,174 @@
+"""
+Background analytics jobs.
+
+A job is one unit of work submitted under a key, run on a bounded thread
+pool and polled (or watched) through its progress record until the result
+is ready. Submitting a key that already has a queued or running job joins
+that job instead of starting another, so identical concurrent requests are
+computed once.
+
+The work function receives a `progress` callable and reports whatever it
+knows as keyword fields (stage, rows_total, rows_fetched, chunks_processed);
+every report wakes the watchers of the job.
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(RuntimeError):
+    """Raised by JobManager.submit when max_active jobs are already queued or running"""
+
+
+class Job:
+    """State of one submitted job"""
+
+    def __init__(self, key: Hashable):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.state = 'queued'
+        self.progress: Dict[str, Any] = {'stage': 'queued'}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.subscribers = 1
+        # Bumped on every change, watchers wait for it to move
+        self.version = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ('done', 'failed')
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Status record as served by the API"""
+        progress = dict(self.progress)
+        if self.state == 'done':
+            progress['fraction'] = 1.0
+        elif progress.get('rows_total'):
+            progress['fraction'] = min(progress.get('rows_fetched', 0) / progress['rows_total'], 1.0)
+        else:
+            progress['fraction'] = 0.0
+
+        now = self.finished_at or time.time()
+        status = {
+            'job_id': self.id,
+            'state': self.state,
+            'progress': progress,
+            'subscribers': self.subscribers,
+            'elapsed': round(now - (self.started_at or now), 3),
+            'error': self.error,
+        }
+        # Remaining time from the observed rate, once there is one
+        if self.state == 'running' and 0 < progress['fraction'] < 1:
+            status['eta'] = round(status['elapsed'] * (1 - progress['fraction']) / progress['fraction'], 1)
+        return status
+
+
+class JobManager:
+    """
+    Bounded pool of background jobs with coalescing by key.
+
+    Finished jobs are kept for `ttl` seconds so their status and result can
+    still be fetched; as they hold full result arrays, at most
+    `max_finished` are kept, the longest finished forgotten first.
+    """
+
+    def __init__(self, workers: int = 2, max_active: int = 32, ttl: float = 600.0, max_finished: int = 64):
+        self.max_active = max_active
+        self.ttl = ttl
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analytics-job')
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[Hashable, Job] = {}
+        self._changed = threading.Condition()
+
+    def submit(self, key: Hashable, work: Callable[[Callable[..., None]], Any]) -> Tuple[Job, bool]:
+        """
+        Start a job for `key`, or join the queued or running one.
+
+        Args:
+            key: Identity of the work; equal keys share a job while it runs
+            work (callable): Called as work(progress) on a pool thread, its
+                return value becomes the job result
+
+        Returns:
+            tuple: (job, created), created False when an existing job was joined
+
+        Raises:
+            JobQueueFull: If max_active jobs are already queued or running
+        """
+        with self._changed:
+            self._expire()
+            job = self._active.get(key)
+            if job is not None:
+                job.subscribers += 1
+                return job, False
+            if len(self._active) >= self.max_active:
+                raise JobQueueFull(f"{len(self._active)} analytics jobs already queued or running")
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._active[key] = job
+
+        self._executor.submit(self._run, job, work)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._changed:
+            return self._jobs.get(job_id)
+
+    def state_counts(self) -> Dict[str, int]:
+        """Number of known jobs in each state"""
+        counts = dict.fromkeys(('queued', 'running', 'done', 'failed'), 0)
+        with self._changed:
+            for job in self._jobs.values():
+                counts[job.state] += 1
+        return counts
+
+    def wait(self, job: Job, version: int, timeout: float) -> int:
+        """Block until the job changes past `version` or timeout, return its current version"""
+        with self._changed:
+            self._changed.wait_for(lambda: job.version != version, timeout)
+            return job.version
+
+    def _update(self, job: Job, **changes) -> None:
+        with self._changed:
+            for name, value in changes.items():
+                setattr(job, name, value)
+            job.version += 1
+            self._changed.notify_all()
+
+    def _run(self, job: Job, work: Callable[[Callable[..., None]], Any]) -> None:
+        def progress(**fields):
+            self._update(job, progress={**job.progress, **fields})
+
+        self._update(job, state='running', started_at=time.time(), progress={'stage': 'running'})
+        try:
+            result = work(progress)
+        except Exception as e:
+            logger.error(f"Analytics job {job.id} failed: {e}")
+            self._update(job, state='failed', error=str(e), finished_at=time.time())
+        else:
+            self._update(job, state='done', result=result, finished_at=time.time(),
+                         progress={**job.progress, 'stage': 'done'})
+        finally:
+            with self._changed:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+                self._expire()
+
+    def _expire(self) -> None:
+        """Forget finished jobs older than ttl or beyond max_finished; called with the lock held"""
+        cutoff = time.time() - self.ttl
+        finished = sorted((j for j in self._jobs.values() if j.finished), key=lambda j: j.finished_at)
+        excess = max(0, len(finished) - self.max_finished)
+        for i, job in enumerate(finished):
+            if i < excess or job.finished_at < cutoff:
+                del self._jobs[job.id]
+
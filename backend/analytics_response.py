@@ -0,0 +1,139 @@
+"""
+Response shapes of /api/player-analytics.
+
+An analytics result is a dict of aligned per-point arrays ('timestamps',
+'speeds', 'displacements', 'acc_magnitude') plus the window statistics
+('resolution', 'average_speed', 'max_speed', 'total_displacement',
+'step_count', 'jump_count'). The resolution is 'raw' for results computed
+from the tracking rows, with steps and jumps detected within the window, or
+the bucket width of the rollup table ('1s', '1m'), with steps and jumps
+counted over the continuous stream (see rollups.py).
+format_analytics turns it into one of:
+
+    legacy   the original nested shape, every series with its own copy of
+             the timestamps
+    compact  one shared 'timestamps' axis and a 'series' map, values rounded
+             to SERIES_DECIMALS
+    binary   the compact shape with the axis and series as base64 encoded
+             little-endian typed arrays (float64 timestamps, float32 series),
+             ready for Float64Array/Float32Array on the client
+    summary  the window statistics only, no series
+
+With max_points the series are downsampled onto one shared axis first.
+"""
+import base64
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from downsample import shared_indices
+
+ANALYTICS_FORMATS = ('legacy', 'compact', 'binary', 'summary')
+
+SERIES_DECIMALS = 4
+
+# Result key -> series name in the compact and binary shapes
+SERIES = (
+    ('speeds', 'speed'),
+    ('displacements', 'displacement'),
+    ('acc_magnitude', 'acceleration_magnitude'),
+)
+
+
+def encode_array(values: np.ndarray, dtype: str) -> str:
+    """Base64 of the array cast to a little-endian `dtype`"""
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode('ascii')
+
+
+def decode_array(payload: str, dtype: str) -> np.ndarray:
+    """Inverse of encode_array"""
+    return np.frombuffer(base64.b64decode(payload), dtype=dtype)
+
+
+def format_analytics(result: Dict[str, Any], fmt: str = 'legacy', max_points: Optional[int] = None,
+                     method: str = 'lttb') -> Dict[str, Any]:
+    """
+    Build the JSON-serialisable response for an analytics result.
+
+    Args:
+        result (dict): Analytics result, see the module docstring
+        fmt (str): 'legacy', 'compact', 'binary' or 'summary'
+        max_points (int, optional): Downsample the series to at most this many points
+        method (str): Downsampling method, 'lttb' or 'minmax'
+
+    Returns:
+        dict: The response body
+    """
+    if fmt not in ANALYTICS_FORMATS:
+        raise ValueError(f"Unknown analytics format {fmt!r}")
+
+    timestamps = result['timestamps']
+    series = {name: result[key] for key, name in SERIES}
+    if max_points is not None and fmt != 'summary':
+        keep = shared_indices(timestamps, list(series.values()), max_points, method)
+        timestamps = timestamps[keep]
+        series = {name: values[keep] for name, values in series.items()}
+
+    summary = {
+        'average_speed': float(result['average_speed']),
+        'max_speed': float(result['max_speed']),
+        'total_displacement': float(result['total_displacement']),
+        'step_count': int(result['step_count']),
+        'jump_count': int(result['jump_count']),
+    }
+
+    if fmt == 'legacy':
+        return legacy_response(result['resolution'], timestamps, series, summary)
+
+    response = {
+        'resolution': result['resolution'],
+        'format': fmt,
+        'samples': int(len(result['timestamps'])),
+        'points': int(len(timestamps)),
+        'summary': summary,
+    }
+    if fmt == 'summary':
+        del response['points']
+    elif fmt == 'compact':
+        response['timestamps'] = timestamps.tolist()
+        response['series'] = {name: np.round(values, SERIES_DECIMALS).tolist() for name, values in series.items()}
+    else:
+        response['dtypes'] = {'timestamps': '<f8', 'series': '<f4'}
+        response['timestamps'] = encode_array(timestamps, '<f8')
+        response['series'] = {name: encode_array(values, '<f4') for name, values in series.items()}
+    return response
+
+
+def legacy_response(resolution: str, timestamps: np.ndarray, series: Dict[str, np.ndarray],
+                    summary: Dict[str, Any]) -> Dict[str, Any]:
+    """The original response shape the dashboard was built against"""
+    timestamps = timestamps.tolist()
+    acc_magnitude = series['acceleration_magnitude'].tolist()
+    return {
+        'resolution': resolution,
+        'speeds': {
+            'data': series['speed'].tolist(),
+            'timestamps': timestamps,
+            'average': summary['average_speed'],
+            'max': summary['max_speed']
+        },
+        'displacement': {
+            'data': series['displacement'].tolist(),
+            'timestamps': timestamps,
+            'total': summary['total_displacement']
+        },
+        'steps': {
+            'count': summary['step_count'],
+            'timestamps': timestamps,
+            'magnitudes': acc_magnitude
+        },
+        'jumps': {
+            'count': summary['jump_count'],
+            'timestamps': timestamps,
+            'magnitudes': acc_magnitude
+        },
+        'acceleration_magnitude': {
+            'data': acc_magnitude,
+            'timestamps': timestamps
+        }
+    }
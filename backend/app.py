@@ -1,159 +1,421 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
+import os
+import json
+import itertools
+import time
 from database_handler import DatabaseHandler
 import numpy as np
-from scipy.signal import find_peaks
-import pandas as pd
-import math
+from analytics import analyze_chunks, analyze_columns, StreamingAnalytics, STEP_THRESHOLD, JUMP_THRESHOLD
+from analytics_jobs import JobManager, JobQueueFull
+from analytics_cache import AnalyticsCache
+from analytics_response import ANALYTICS_FORMATS, format_analytics
+from downsample import DOWNSAMPLE_METHODS
+from metrics import REGISTRY, SIZE_BUCKETS, MeasuredBody, start_metrics_server
+from export import (EXPORT_COLUMNS, EXPORT_COMPRESSIONS, EXPORT_FORMATS, PARQUET_ROW_GROUP_SIZE,
+                    export_filename, iter_csv, iter_parquet, parquet_available, with_derived)
+from team_analytics import TeamAnalyticsPool, team_summary
 
 app = Flask(__name__)
 CORS(app)
 
-db = DatabaseHandler()
+# Workers start on the first large team request; TEAM_ANALYTICS_WORKERS=1
+# analyses teams in the API process
+team_pool = TeamAnalyticsPool(int(os.getenv('TEAM_ANALYTICS_WORKERS', '0')) or None)
 
-def calculate_speed_and_displacement(x_positions, y_positions, z_positions, timestamps):
+# Run as a script, this module is imported again as __mp_main__ by the team
+# pool's forkserver workers, which only run team_analytics functions; the
+# database, cache, job threads and metrics server belong to the serving
+# process alone
+if __name__ != '__mp_main__':
+    # TRACKING_ARCHIVE_DIR serves rows moved out of MySQL by archive.py
+    db = DatabaseHandler(archive_dir=os.getenv('TRACKING_ARCHIVE_DIR'))
+
+    # Memoized analytics results; ANALYTICS_CACHE_DIR adds an on-disk tier for
+    # windows that are entirely in the past
+    analytics_cache = AnalyticsCache(
+        max_bytes=int(os.getenv('ANALYTICS_CACHE_MB', '256')) * 2**20,
+        disk_dir=os.getenv('ANALYTICS_CACHE_DIR') or None,
+        revision=db.get_data_revision
+    )
+
+    # Background analytics jobs with progress, see /api/analytics-jobs
+    analytics_jobs = JobManager(workers=int(os.getenv('ANALYTICS_JOB_WORKERS', '2')),
+                                max_finished=int(os.getenv('ANALYTICS_JOB_KEEP', '64')))
+JOB_CHUNK_ROWS = 50_000
+JOB_KEEPALIVE_SECONDS = 15
+
+# Prometheus metrics on http://127.0.0.1:<API_METRICS_PORT>/metrics (0 disables);
+# under the debug reloader only the process serving requests exposes them
+REQUEST_SECONDS = REGISTRY.histogram('api_request_seconds', 'Time to the end of the response body',
+                                     ['endpoint', 'method', 'status'])
+RESPONSE_BYTES = REGISTRY.histogram('api_response_bytes', 'Response body size', ['endpoint'],
+                                    buckets=SIZE_BUCKETS)
+if __name__ != '__mp_main__':
+    REGISTRY.gauge('api_analytics_jobs', 'Analytics jobs by state', ['state']).set_function(analytics_jobs.state_counts)
+    if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        metrics_server = start_metrics_server(int(os.getenv('API_METRICS_PORT', '9109')))
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Observe latency and size per endpoint; streamed bodies are measured as they are sent"""
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    labels = (endpoint, request.method, str(response.status_code))
+    
+    if not response.is_streamed:
+        REQUEST_SECONDS.labels(*labels).observe(time.perf_counter() - started)
+        RESPONSE_BYTES.labels(endpoint).observe(response.calculate_content_length() or 0)
+        return response
+    
+    def on_close(size):
+        REQUEST_SECONDS.labels(*labels).observe(time.perf_counter() - started)
+        RESPONSE_BYTES.labels(endpoint).observe(size)
+    
+    response.response = MeasuredBody(response.response, on_close)
+    return response
+
+# Windows at least this long are answered from the rollup tables unless the
+# request asks for resolution=raw; the per-minute table takes over for the
+# longest windows
+ROLLUP_MIN_WINDOW_MICROS = 15 * 60 * 1_000_000
+ROLLUP_1M_MIN_WINDOW_MICROS = 6 * 3600 * 1_000_000
+
+def select_rollup_table(window_micros, resolution):
+    """Pick the rollup table for a window, or None to read raw rows"""
+    if resolution == '1s':
+        return 'player_tracking_1s'
+    if resolution == '1m':
+        return 'player_tracking_1m'
+    if resolution != 'auto' or window_micros < ROLLUP_MIN_WINDOW_MICROS:
+        return None
+    if window_micros >= ROLLUP_1M_MIN_WINDOW_MICROS:
+        return 'player_tracking_1m'
+    return 'player_tracking_1s'
+
+def rollup_analytics(player_id, start_time, end_time, table):
     """
-    Calculate speed and displacement using trapezoidal integration method
-    adapted from accelcat.py for post-processing data
+    Build the analytics result from rollup buckets, None if there are none
+    
+    Its resolution is the table's bucket width ('1s', '1m'); step and jump
+    counts are then those of the continuous stream and can differ slightly
+    at the window edges from resolution 'raw' (see rollups.py).
     """
-    dt = np.diff(timestamps) / 1_000_000  # Convert microseconds to seconds
-    
-    # Initialize arrays
-    speeds = np.zeros(len(timestamps))
-    displacements = np.zeros(len(timestamps))
-    
-    # Calculate velocities using trapezoidal integration
-    dx = np.diff(x_positions)
-    dy = np.diff(y_positions)
-    dz = np.diff(z_positions)
-    
-    # Calculate 3D velocities
-    vx = dx / dt
-    vy = dy / dt
-    vz = dz / dt
-    
-    # Calculate speed magnitude (including all three dimensions)
-    speeds[1:] = np.sqrt(vx**2 + vy**2 + vz**2)
-    
-    # Calculate displacements using trapezoidal integration of speeds
-    for i in range(1, len(timestamps)):
-        time_interval = (timestamps[i] - timestamps[i-1]) / 1_000_000  # Convert to seconds
-        displacements[i] = displacements[i-1] + (speeds[i] + speeds[i-1]) * time_interval / 2
-    
-    return speeds, displacements
-
-def calculate_acceleration(ax, ay, az):
-    """Calculate acceleration magnitude with gravity compensation"""
-    acc_magnitude = np.sqrt(ax**2 + ay**2 + az**2) - 9.81
-    return acc_magnitude
-
-def detect_steps(acc_magnitude, threshold):
-    step_counter = 0
-    step_b_ts = -1
-    step_e_ts = -1
-    prev_acc = -1
-
-    for ts, current_acc in enumerate(acc_magnitude):
-        if prev_acc != -1 and current_acc > threshold:
-            if prev_acc < threshold:
-                step_b_ts = ts  # Step begins
-        elif prev_acc >= threshold and current_acc <= threshold:
-            step_e_ts = ts  # Step ends
-            if step_b_ts != -1 and step_e_ts > step_b_ts:
-                step_counter += 1
-        prev_acc = current_acc
-
-    return step_counter
-
-def detect_jumps(acc_buffer, jump_threshold):
-    # Low-pass filter
-    alpha = 0.2
-    filtered_acc = np.zeros_like(acc_buffer)
-    filtered_acc[0] = acc_buffer[0]
-    for i in range(1, len(acc_buffer)):
-        filtered_acc[i] = alpha * acc_buffer[i] + (1 - alpha) * filtered_acc[i-1]
-    
-    # Peak detection
-    jump_count = 0
-    min_distance = 5
-    last_jump_time = -1
-
-    for i in range(1, len(filtered_acc) - 1):
-        if (filtered_acc[i] > filtered_acc[i-1] and 
-            filtered_acc[i] > filtered_acc[i+1] and 
-            filtered_acc[i] > jump_threshold):
-            if (i == 1 or i - 1 >= min_distance):
-                jump_count += 1
-                last_jump_time = i
-
-    return jump_count
+    rows = db.get_rollups(player_id, start_time, end_time, table)
+    rows = [r for r in rows if r['sample_count'] > 0 or r['jump_count'] > 0]
+    if not rows:
+        return None
+    
+    counts = np.array([r['sample_count'] for r in rows], dtype=np.float64)
+    filled = counts > 0
+    timestamps = np.array([r['bucket_micros'] for r in rows], dtype=np.int64)[filled]
+    speed_sum = np.array([r['speed_sum'] for r in rows], dtype=np.float64)
+    distance = np.array([r['distance'] for r in rows], dtype=np.float64)
+    acc_sum = np.array([r['accel_mag_sum'] for r in rows], dtype=np.float64)
+    peak_speeds = [r['peak_speed'] for r in rows if r['peak_speed'] is not None]
+    
+    return {
+        'resolution': table.rsplit('_', 1)[-1],
+        'timestamps': timestamps,
+        'speeds': speed_sum[filled] / counts[filled],
+        'displacements': np.cumsum(distance)[filled],
+        'acc_magnitude': acc_sum[filled] / counts[filled],
+        'average_speed': float(speed_sum.sum() / counts.sum()),
+        'max_speed': float(max(peak_speeds)) if peak_speeds else 0.0,
+        'total_displacement': float(distance.sum()),
+        'step_count': int(sum(r['step_count'] for r in rows)),
+        'jump_count': int(sum(r['jump_count'] for r in rows)),
+    }
+
+def response_options(default_format='legacy'):
+    """
+    format, max_points and downsample of the request.
+    
+    format=compact|binary share one time axis; max_points downsamples the
+    series for charting.
+    
+    Raises:
+        ValueError: With the message for a 400 response
+    """
+    fmt = request.args.get('format', default_format)
+    max_points = request.args.get('max_points', type=int)
+    method = request.args.get('downsample', 'lttb')
+    if fmt not in ANALYTICS_FORMATS:
+        raise ValueError(f'Unknown format {fmt}')
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f'Unknown downsampling method {method}')
+    if max_points is not None and max_points < 3:
+        raise ValueError('max_points must be at least 3')
+    return fmt, max_points, method
+
+def compute_analytics(player_id, start_time, end_time, table, progress=None):
+    """
+    Analytics result of a window, None if it has no rows.
+    
+    With a `progress` callable (see analytics_jobs) raw rows are read and
+    analysed in chunks and the rows done so far are reported after each one.
+    """
+    if table:
+        if progress:
+            progress(stage='rollups')
+        result = rollup_analytics(player_id, start_time, end_time, table)
+        if result is not None:
+            return result
+    
+    if progress is None:
+        # Get tracking data from database as column arrays
+        tracking_data = db.get_player_columns(player_id, start_time, end_time)
+        if len(tracking_data['timestamp_micros']) == 0:
+            return None
+        return analyze_columns(tracking_data)
+    
+    watermark = db.get_window_watermark(player_id, start_time, end_time)
+    progress(stage='analyzing', rows_total=watermark[0] if watermark else None,
+             rows_fetched=0, chunks_processed=0)
+    chunks_processed = 0
+    
+    def on_chunk(state):
+        nonlocal chunks_processed
+        chunks_processed += 1
+        progress(rows_fetched=state.samples, chunks_processed=chunks_processed)
+    
+    chunks = db.iter_player_columns(player_id, start_time, end_time, JOB_CHUNK_ROWS)
+    return analyze_chunks(chunks, on_chunk)
+
+def cached_analytics(player_id, start_time, end_time, table, progress=None):
+    """compute_analytics through the analytics cache"""
+    return analytics_cache.get_or_compute(
+        player_id, start_time, end_time, (table or 'raw', STEP_THRESHOLD, JUMP_THRESHOLD),
+        lambda: compute_analytics(player_id, start_time, end_time, table, progress),
+        lambda: db.get_window_watermark(player_id, start_time, end_time)
+    )
 
 @app.route('/api/player-analytics', methods=['GET'])
 def get_player_analytics():
     player_id = request.args.get('player_id')
     start_time = int(request.args.get('start_time'))
     end_time = int(request.args.get('end_time'))
+    resolution = request.args.get('resolution', 'auto')
+    try:
+        fmt, max_points, method = response_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Long windows come from the rollups, short zoomed-in ones from raw rows
+    table = select_rollup_table(end_time - start_time, resolution)
+    result = cached_analytics(player_id, start_time, end_time, table)
+    if result is None:
+        return jsonify({'error': 'No data found'}), 404
+    
+    return jsonify(format_analytics(result, fmt, max_points, method))
+
+@app.route('/api/analytics-jobs', methods=['POST'])
+def submit_analytics_job():
+    """
+    Compute the analytics of a window in the background.
+    
+    Takes player_id, start_time, end_time and resolution as in
+    /api/player-analytics (JSON body or form) and answers 202 with the job
+    status. A submission identical to a queued or running job joins it.
+    """
+    params = request.get_json(silent=True) or request.form
+    if not params.get('player_id') or params.get('start_time') is None or params.get('end_time') is None:
+        return jsonify({'error': 'player_id, start_time and end_time are required'}), 400
+    player_id = str(params['player_id'])
+    start_time = int(params['start_time'])
+    end_time = int(params['end_time'])
+    table = select_rollup_table(end_time - start_time, params.get('resolution', 'auto'))
     
-    # Get tracking data from database
-    tracking_data = db.get_player_data(player_id, start_time, end_time)
+    try:
+        job, created = analytics_jobs.submit(
+            (player_id, start_time, end_time, table),
+            lambda progress: cached_analytics(player_id, start_time, end_time, table, progress)
+        )
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
     
-    if not tracking_data:
+    status = job.to_dict()
+    status['coalesced'] = not created
+    return jsonify(status), 202, {'Location': f'/api/analytics-jobs/{job.id}'}
+
+@app.route('/api/analytics-jobs/<job_id>', methods=['GET'])
+def get_analytics_job(job_id):
+    job = analytics_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/analytics-jobs/<job_id>/events', methods=['GET'])
+def analytics_job_events(job_id):
+    """Job status as server-sent events, one per change until the job finishes"""
+    job = analytics_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    
+    def generate():
+        version = -1
+        while True:
+            current = analytics_jobs.wait(job, version, timeout=JOB_KEEPALIVE_SECONDS)
+            if current == version:
+                yield ': keep-alive\n\n'
+                continue
+            version = current
+            yield f'data: {json.dumps(job.to_dict())}\n\n'
+            if job.finished:
+                return
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+@app.route('/api/analytics-jobs/<job_id>/result', methods=['GET'])
+def get_analytics_job_result(job_id):
+    """Result of a finished job, in the format and size of the query as in /api/player-analytics"""
+    job = analytics_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    try:
+        fmt, max_points, method = response_options()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if job.state == 'failed':
+        return jsonify({'error': job.error}), 500
+    if not job.finished:
+        return jsonify(job.to_dict()), 409
+    if job.result is None:
         return jsonify({'error': 'No data found'}), 404
+    return jsonify(format_analytics(job.result, fmt, max_points, method))
+
+@app.route('/api/player-analytics/stream', methods=['GET'])
+def stream_player_analytics():
+    """
+    Raw-resolution analytics of a window of any length as NDJSON.
+    
+    The window is read and processed chunk_size rows at a time; every chunk
+    is one {"type": "chunk", ...} line with its series and the running
+    counts, and a final {"type": "summary", ...} line carries the window
+    statistics. Values are identical to /api/player-analytics?resolution=raw.
+    """
+    player_id = request.args.get('player_id')
+    start_time = int(request.args.get('start_time'))
+    end_time = int(request.args.get('end_time'))
+    chunk_size = request.args.get('chunk_size', 50_000, type=int)
+    if chunk_size < 1:
+        return jsonify({'error': 'chunk_size must be positive'}), 400
     
-    # Prepare data for processing
-    timestamps = np.array([d.get('timestamp_micros', 0) for d in tracking_data])
-    x_positions = np.array([d.get('x_position', 0) for d in tracking_data])
-    y_positions = np.array([d.get('y_position', 0) for d in tracking_data])
-    z_positions = np.array([d.get('z_position', 0) for d in tracking_data])
+    def generate():
+        state = StreamingAnalytics()
+        for columns in db.iter_player_columns(player_id, start_time, end_time, chunk_size):
+            chunk = state.update(columns)
+            yield json.dumps({
+                'type': 'chunk',
+                'timestamps': chunk['timestamps'].tolist(),
+                'speeds': chunk['speeds'].tolist(),
+                'displacements': chunk['displacements'].tolist(),
+                'acc_magnitude': chunk['acc_magnitude'].tolist(),
+                'step_count': state.step_count,
+                'jump_count': state.jump_count
+            }) + '\n'
+        summary = state.summary()
+        summary['type'] = 'summary'
+        yield json.dumps(summary) + '\n'
     
-    ax = np.array([d.get('accel_x', 0) for d in tracking_data])
-    ay = np.array([d.get('accel_y', 0) for d in tracking_data])
-    az = np.array([d.get('accel_z', 0) for d in tracking_data])
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/export', methods=['GET'])
+def export_player_data():
+    """
+    Full-resolution tracking data of a window as a CSV or Parquet download.
     
-    # Calculate metrics using enhanced methods
-    speeds, displacements = calculate_speed_and_displacement(
-        x_positions, y_positions, z_positions, timestamps
-    )
-    acc_magnitude = calculate_acceleration(ax, ay, az)
-    step_count = detect_steps(acc_magnitude, threshold=2.0)
-    jump_count = detect_jumps(acc_magnitude, jump_threshold=4.0)
+    Streams the raw columns and the derived speed, displacement and
+    acceleration magnitude chunk by chunk, so memory does not grow with the
+    window. Query: player_id, start_time, end_time, format (csv|parquet),
+    compression (csv: none|gzip, parquet: snappy|gzip|none), columns (comma
+    separated, all by default), chunk_size and row_group_size.
+    """
+    player_id = request.args.get('player_id')
+    start_time = int(request.args.get('start_time'))
+    end_time = int(request.args.get('end_time'))
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unknown format {fmt}'}), 400
+    compression = request.args.get('compression', EXPORT_COMPRESSIONS[fmt][0])
+    if compression not in EXPORT_COMPRESSIONS[fmt]:
+        return jsonify({'error': f'Unknown compression {compression} for {fmt}'}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export needs pyarrow'}), 501
+    columns = [name for name, _ in EXPORT_COLUMNS]
+    if request.args.get('columns'):
+        columns = request.args['columns'].split(',')
+        unknown = [name for name in columns if name not in dict(EXPORT_COLUMNS)]
+        if unknown:
+            return jsonify({'error': f'Unknown columns {", ".join(unknown)}'}), 400
+    chunk_size = request.args.get('chunk_size', 50_000, type=int)
+    row_group_size = request.args.get('row_group_size', PARQUET_ROW_GROUP_SIZE, type=int)
+    if chunk_size < 1 or row_group_size < 1:
+        return jsonify({'error': 'chunk_size and row_group_size must be positive'}), 400
+    
+    chunks = db.iter_player_columns(player_id, start_time, end_time, chunk_size)
+    first = next(chunks, None)
+    if first is None:
+        return jsonify({'error': 'No data found'}), 404
+    chunks = with_derived(itertools.chain([first], chunks))
+    
+    if fmt == 'csv':
+        body = iter_csv(chunks, columns, compression)
+        mimetype = 'application/gzip' if compression == 'gzip' else 'text/csv'
+    else:
+        body = iter_parquet(chunks, columns, compression, row_group_size)
+        mimetype = 'application/vnd.apache.parquet'
+    filename = export_filename(player_id, start_time, end_time, fmt, compression)
+    return Response(stream_with_context(body), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.route('/api/team-analytics', methods=['GET'])
+def get_team_analytics():
+    """
+    Raw-resolution analytics of several players over one window.
+    
+    Players are given as a comma separated player_ids list or as a team_id.
+    Their rows are read in one query and analysed in parallel on the team
+    pool; the response has each player's analytics in the requested format
+    (summary by default), the players without data, and team totals.
+    """
+    start_time = int(request.args.get('start_time'))
+    end_time = int(request.args.get('end_time'))
+    try:
+        fmt, max_points, method = response_options('summary')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if fmt == 'legacy':
+        return jsonify({'error': 'Unknown format legacy'}), 400
+    
+    if request.args.get('player_ids'):
+        player_ids = list(dict.fromkeys(p for p in request.args['player_ids'].split(',') if p))
+    elif request.args.get('team_id'):
+        player_ids = db.get_team_player_ids(request.args['team_id'])
+    else:
+        return jsonify({'error': 'player_ids or team_id is required'}), 400
     
-    # Calculate statistics
-    avg_speed = np.mean(speeds)
-    max_speed = np.max(speeds)
-    total_displacement = displacements[-1]
+    team_columns = db.get_team_columns(player_ids, start_time, end_time)
+    if not team_columns:
+        return jsonify({'error': 'No data found'}), 404
     
+    players = team_pool.analyze(team_columns, fmt, max_points, method)
     return jsonify({
-        'speeds': {
-            'data': speeds.tolist(),
-            'timestamps': timestamps.tolist(),
-            'average': float(avg_speed),
-            'max': float(max_speed)
-        },
-        'displacement': {
-            'data': displacements.tolist(),
-            'timestamps': timestamps.tolist(),
-            'total': float(total_displacement)
-        },
-        'steps': {
-            'count': step_count,
-            'timestamps': timestamps.tolist(),
-            'magnitudes': acc_magnitude.tolist()
-        },
-        'jumps': {
-            'count': jump_count,
-            'timestamps': timestamps.tolist(),
-            'magnitudes': acc_magnitude.tolist()
-        },
-        'acceleration_magnitude': {
-            'data': acc_magnitude.tolist(),
-            'timestamps': timestamps.tolist()
-        }
+        'players': players,
+        'missing': [p for p in player_ids if p not in team_columns],
+        'team': team_summary(players)
     })
 
 @app.route('/api/players', methods=['GET'])
 def get_players():
-    connection = db.connection_pool.get_connection()
+    connection = db.get_connection()
     cursor = connection.cursor(dictionary=True)
     
     cursor.execute("SELECT player_id, name FROM players WHERE name IS NOT NULL")
@@ -166,18 +428,14 @@ def get_players():
 
 @app.route('/api/player-time-range', methods=['GET'])
 def get_player_time_range():
-    connection = db.connection_pool.get_connection()
-    cursor = connection.cursor(dictionary=True)
-    
-    cursor.execute("""
-        SELECT player_id, MIN(timestamp_micros) AS start_time, MAX(timestamp_micros) AS end_time
-        FROM player_tracking_data
-        GROUP BY player_id
-    """)
-    time_ranges = cursor.fetchall()
-    
-    cursor.close()
-    connection.close()
+    # Answered from the summary maintained at ingest instead of a MIN/MAX
+    # over every raw row; a single player also gets their recent sessions
+    player_id = request.args.get('player_id')
+    time_ranges = db.get_player_summaries(player_id)
+    if player_id is not None:
+        limit = request.args.get('sessions', 100, type=int)
+        for time_range in time_ranges:
+            time_range['sessions'] = db.get_player_sessions(player_id, limit)
     
     return jsonify(time_ranges)
 
@@ -0,0 +1,293 @@
+"""
+Tiered retention of raw tracking data.
+
+Rows of player_tracking_data older than the retention period move to a
+local Parquet archive laid out as
+
+    <root>/day=YYYY-MM-DD/player=<player_id>/part-<first_id>.parquet
+
+one UTC day at a time, oldest first. For every day the rows of each player
+are exported, the archive becomes authoritative for the day (its end is
+recorded as `archived_before` in <root>/_checkpoint.json), and only then
+are the rows removed from MySQL: by dropping the day's partition when it
+holds exactly the archived rows, otherwise by primary-key DELETE batches of
+bounded size. The checkpoint also records which players of the day in
+progress are already exported, so an interrupted run resumes where it
+stopped without exporting or deleting anything twice.
+
+DatabaseHandler reads windows before `archived_before` from the archive and
+the rest from MySQL. Rows that arrive late for an archived day (a spool
+replaying a backlog) stay in MySQL until the next run archives them as an
+extra part of the day; until then readers merge them in from MySQL, leaving
+out the rows of the day in progress that are already exported. The rollup
+tables are not archived.
+
+Needs pyarrow, which is imported on first use. Run as a script to archive
+everything older than the retention period:
+    python archive.py --archive-dir <dir> --days 30
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+DAY_MICROS = 86_400 * 1_000_000
+
+# Archived columns of player_tracking_data and their Parquet types; the
+# player is part of the path
+ARCHIVE_COLUMNS = (
+    ('id', 'int64'),
+    ('tag_id', 'string'),
+    ('timestamp_micros', 'int64'),
+    ('x_position', 'float32'),
+    ('y_position', 'float32'),
+    ('accel_x', 'float32'),
+    ('accel_y', 'float32'),
+    ('accel_z', 'float32'),
+    ('gyro_x', 'float32'),
+    ('gyro_y', 'float32'),
+    ('gyro_z', 'float32'),
+    ('battery_life', 'int32'),
+    ('heart_rate', 'int32'),
+    ('serial_number', 'int32'),
+    ('activity_status', 'int32'),
+)
+
+CHECKPOINT_FILE = '_checkpoint.json'
+
+
+def day_start(timestamp_micros: int) -> int:
+    """Start of the UTC day containing the timestamp, in epoch microseconds"""
+    return timestamp_micros // DAY_MICROS * DAY_MICROS
+
+
+class TrackingArchive:
+    """Parquet archive of tracking rows, partitioned by day and player"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._checkpoint: Dict[str, Any] = {'archived_before': 0, 'day': None}
+        self._checkpoint_mtime: Optional[float] = None
+
+    # Checkpoint
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """The checkpoint, re-read when another process has written it"""
+        path = os.path.join(self.root, CHECKPOINT_FILE)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            return self._checkpoint
+        if mtime != self._checkpoint_mtime:
+            with open(path) as f:
+                self._checkpoint = json.load(f)
+            self._checkpoint_mtime = mtime
+        return self._checkpoint
+
+    def archived_before(self) -> int:
+        """Rows older than this (epoch microseconds) are read from the archive"""
+        return int(self.checkpoint()['archived_before'])
+
+    def exported_rows(self, player_id: str) -> Optional[Tuple[int, int, int]]:
+        """
+        Rows of a player that are both archived and still in MySQL.
+
+        Returns:
+            tuple: (day start, day end, highest id) for the day whose rows are
+                being removed, if the player's rows of it are exported, else None
+        """
+        day = self.checkpoint()['day']
+        if not day or player_id not in day['exported']:
+            return None
+        return day['start'], day['start'] + DAY_MICROS - 1, day['exported'][player_id][1]
+
+    def save_checkpoint(self, archived_before: int, day: Optional[Dict[str, Any]]) -> None:
+        """Replace the checkpoint atomically"""
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, CHECKPOINT_FILE)
+        checkpoint = {'archived_before': archived_before, 'day': day}
+        with open(path + '.tmp', 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(path + '.tmp', path)
+        self._checkpoint = checkpoint
+        self._checkpoint_mtime = os.stat(path).st_mtime
+
+    # Files
+
+    def player_day_dir(self, player_id: str, day: int) -> str:
+        date = datetime.fromtimestamp(day // 1_000_000, timezone.utc).strftime('%Y-%m-%d')
+        return os.path.join(self.root, f"day={date}", f"player={quote(player_id, safe='')}")
+
+    def write_player_day(self, player_id: str, day: int, chunks: Iterable[List[tuple]]) -> Tuple[int, int]:
+        """
+        Write one player's rows of a day as a new part file.
+
+        The part is written under a temporary name and renamed into place,
+        so readers never see a partial file and an interrupted export is
+        simply redone.
+
+        Args:
+            player_id (str): Player's unique identifier
+            day (int): Start of the day in epoch microseconds
+            chunks (iterable): Lists of row tuples in ARCHIVE_COLUMNS order,
+                ordered by timestamp_micros and id
+
+        Returns:
+            tuple: (rows written, highest id written), (0, 0) if there were none
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([(name, pa.type_for_alias(kind)) for name, kind in ARCHIVE_COLUMNS])
+        directory = self.player_day_dir(player_id, day)
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, '_writing.parquet')
+
+        writer = None
+        rows = first_id = max_id = 0
+        try:
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                values = list(zip(*chunk))
+                batch = pa.record_batch([pa.array(column, type=field.type)
+                                         for column, field in zip(values, schema)], schema=schema)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, schema, compression='zstd')
+                    first_id = int(chunk[0][0])
+                writer.write_batch(batch)
+                rows += len(chunk)
+                max_id = max(max_id, int(max(values[0])))
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if writer is None:
+            return 0, 0
+        os.replace(tmp_path, os.path.join(directory, f"part-{first_id}.parquet"))
+        return rows, max_id
+
+    def read_table(self, player_id: str, start_time: int, end_time: int,
+                   columns: Optional[Sequence[str]] = None):
+        """
+        Archived rows of a player in a time range.
+
+        Args:
+            player_id (str): Player's unique identifier
+            start_time (int): Start time in epoch microseconds
+            end_time (int): End time in epoch microseconds, inclusive
+            columns (sequence, optional): Columns to read, all by default
+
+        Returns:
+            pyarrow.Table: Rows ordered by timestamp_micros and id, None if
+                there are none
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        read_columns = list(columns or [name for name, _ in ARCHIVE_COLUMNS])
+        sort_columns = [name for name in ('timestamp_micros', 'id') if name not in read_columns]
+        filters = [('timestamp_micros', '>=', start_time), ('timestamp_micros', '<=', end_time)]
+
+        tables = []
+        for day in range(day_start(start_time), end_time + 1, DAY_MICROS):
+            paths = sorted(glob.glob(os.path.join(self.player_day_dir(player_id, day), 'part-*.parquet')))
+            if not paths:
+                continue
+            table = pa.concat_tables(
+                [pq.read_table(path, columns=read_columns + sort_columns, filters=filters) for path in paths])
+            if len(paths) > 1:
+                # Rows that arrived late for an archived day land in their own part
+                table = table.sort_by([('timestamp_micros', 'ascending'), ('id', 'ascending')])
+            tables.append(table)
+
+        table = pa.concat_tables(tables) if tables else None
+        if table is None or table.num_rows == 0:
+            return None
+        return table.select(read_columns)
+
+
+def run_retention(db_handler, archive: TrackingArchive, days_to_keep: int = 30,
+                  batch_size: int = 10_000, now_micros: Optional[int] = None) -> int:
+    """
+    Archive and remove every whole day older than `days_to_keep` days.
+
+    Args:
+        db_handler (DatabaseHandler): Source of the rows
+        archive (TrackingArchive): Destination
+        days_to_keep (int): Days of raw rows kept in MySQL
+        batch_size (int): Rows per DELETE batch when a day cannot be dropped
+            as a partition
+        now_micros (int, optional): Current time, for testing
+
+    Returns:
+        int: Number of rows archived
+    """
+    now_micros = now_micros if now_micros is not None else int(time.time() * 1_000_000)
+    cutoff = day_start(now_micros - days_to_keep * DAY_MICROS)
+    archived = 0
+    previous_day = None
+
+    while True:
+        oldest = db_handler.get_oldest_timestamp()
+        if oldest is None or day_start(oldest) >= cutoff:
+            break
+        day = day_start(oldest)
+        day_end = day + DAY_MICROS
+        if day == previous_day:
+            logger.error(f"Rows before {day_end} are still in MySQL after archiving, stopping")
+            break
+        previous_day = day
+
+        checkpoint = archive.checkpoint()
+        progress = checkpoint['day'] if checkpoint['day'] and checkpoint['day']['start'] == day else None
+        exported: Dict[str, List[int]] = progress['exported'] if progress else {}
+
+        for player_id in db_handler.get_players_in_range(day, day_end - 1):
+            if player_id in exported:
+                continue
+            rows, max_id = archive.write_player_day(
+                player_id, day, db_handler.iter_tracking_rows(player_id, day, day_end - 1))
+            exported[player_id] = [rows, max_id]
+            archived += rows
+            archive.save_checkpoint(checkpoint['archived_before'], {'start': day, 'exported': exported})
+
+        # The archive now answers reads of this day, MySQL rows can go
+        archived_before = max(checkpoint['archived_before'], day_end)
+        archive.save_checkpoint(archived_before, {'start': day, 'exported': exported})
+
+        total = sum(rows for rows, _ in exported.values())
+        if not db_handler.drop_day_partition(day, day_end, total):
+            for player_id, (rows, max_id) in exported.items():
+                if rows and not db_handler.delete_tracking_range(player_id, day, day_end - 1, max_id, batch_size):
+                    logger.error(f"Stopping, the next run resumes the removal of {player_id}'s rows")
+                    return archived
+        archive.save_checkpoint(archived_before, None)
+        # Cached analytics of the day are recomputed from the archive
+        db_handler.bump_data_revisions(exported)
+        logger.info(f"Archived {total} rows of {len(exported)} players for "
+                    f"{datetime.fromtimestamp(day // 1_000_000, timezone.utc):%Y-%m-%d}")
+
+    return archived
+
+
+if __name__ == '__main__':
+    from database_handler import DatabaseHandler
+
+    parser = argparse.ArgumentParser(description="Archive old tracking rows to Parquet and remove them from MySQL")
+    parser.add_argument('--archive-dir', default=os.getenv('TRACKING_ARCHIVE_DIR'), required=not os.getenv('TRACKING_ARCHIVE_DIR'),
+                        help="archive root, defaults to TRACKING_ARCHIVE_DIR")
+    parser.add_argument('--days', type=int, default=30, help="days of raw rows kept in MySQL")
+    parser.add_argument('--batch-size', type=int, default=10_000, help="rows per DELETE batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)-15s %(name)-8s %(levelname)s: %(message)s")
+    run_retention(DatabaseHandler(archive_dir=args.archive_dir), TrackingArchive(args.archive_dir),
+                  args.days, args.batch_size)
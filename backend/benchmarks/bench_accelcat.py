@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+accelcat filter engine against the per-batch pandas pipeline it replaced.
+
+A simulated MMA8452Q produces gravity plus a few Hz of movement and noise,
+optionally spending a fixed time per read like the I2C transfer does.
+
+1. Processing cost per sample of the old pipeline (a DataFrame per 100
+   samples, rolling triangular mean, iterrows() with scalar integration)
+   and of TriangularFilter + Integrator, against the 2 ms budget per
+   sample at 500 Hz. The streaming filter must match pandas' rolling mean
+   over the continuous stream.
+2. accelcat.run() at --period (500 Hz by default) on the simulated sensor:
+   achieved sample rate and readings that missed their deadline.
+
+Usage:
+    python benchmarks/bench_accelcat.py --period 0.002 --seconds 5 --read-latency 0.0002
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import accelcat  # noqa: E402
+from accelcat import GRAVITY, Integrator, PeakTracker, SAMPLE_FILTERING, TriangularFilter, WINDOW_FILTERING  # noqa: E402
+
+
+class SimulatedMMA8452Q:
+    """Stand-in for microstacknode's MMA8452Q driver"""
+
+    def __init__(self, read_latency=0.0, seed=0):
+        self.read_latency = read_latency
+        self.rng = np.random.default_rng(seed)
+        self.reads = 0
+        self.started = time.perf_counter()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def standby(self):
+        pass
+
+    def set_g_range(self, g_range):
+        pass
+
+    def activate(self):
+        pass
+
+    def get_xyz_ms2(self):
+        if self.read_latency:
+            deadline = time.perf_counter() + self.read_latency
+            while time.perf_counter() < deadline:
+                pass
+        self.reads += 1
+        t = time.perf_counter() - self.started
+        noise = self.rng.normal(0, 0.05, 3)
+        return {'x': 0.8 * math.sin(2 * math.pi * 2 * t) + noise[0],
+                'y': 0.3 * math.cos(2 * math.pi * 3 * t) + noise[1],
+                'z': GRAVITY + 0.5 * math.sin(2 * math.pi * t) + noise[2]}
+
+
+def legacy_batch(filtval, state, period):
+    """The pre-streaming pipeline for one batch, less the sensor reads and sleeps"""
+    Cax, Cay, Caz = state['calibration']
+    dataFrame = pandas.DataFrame(filtval, index=range(len(filtval)), columns=list('xyz'))
+    dataFiltered = dataFrame.rolling(window=WINDOW_FILTERING, win_type='triang').mean()
+    for index, ms in dataFiltered.iterrows():
+        if np.isnan(ms['z']):
+            continue
+        for axis, offset in (('x', Cax), ('y', Cay), ('z', Caz)):
+            if axis == 'z':
+                A = (ms[axis] - offset - GRAVITY) * 1000 if ms[axis] >= 0 else (ms[axis] - offset + GRAVITY) * 1000
+            else:
+                A = (ms[axis] - offset) * 1000
+            Ai, Vi = state['A'][axis], state['V'][axis]
+            if ms[axis] >= 0:
+                V = Ai * period + abs((A - Ai) / 2) * period
+                D = Vi * period + abs((V - Vi) / 2) * period
+            else:
+                V = Ai * period - abs((A - Ai) / 2) * period
+                D = Vi * period - abs((V - Vi) / 2) * period
+            state['A'][axis], state['V'][axis] = A, V
+            if state['peak'][axis] < abs(V):
+                state['peak'][axis] = abs(V)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--period', type=float, default=0.002)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--read-latency', type=float, default=0.0002, help="simulated I2C read time, seconds")
+    parser.add_argument('--batches', type=int, default=50, help="batches for the processing cost comparison")
+    args = parser.parse_args()
+
+    sensor = SimulatedMMA8452Q()
+    readings = [sensor.get_xyz_ms2() for _ in range(args.batches * SAMPLE_FILTERING)]
+    stream = np.array([[ms['x'], ms['y'], ms['z']] for ms in readings])
+    calibration = (0.0, 0.0, 0.0)
+
+    state = {'calibration': calibration, 'A': dict.fromkeys('xyz', 0.0),
+             'V': dict.fromkeys('xyz', 0.0), 'peak': dict.fromkeys('xyz', 0.0)}
+    t0 = time.perf_counter()
+    for i in range(args.batches):
+        legacy_batch(readings[i * SAMPLE_FILTERING:(i + 1) * SAMPLE_FILTERING], state, args.period)
+    legacy_us = (time.perf_counter() - t0) / len(stream) * 1e6
+
+    low_pass = TriangularFilter()
+    integrator = Integrator(calibration, args.period)
+    peaks = PeakTracker()
+    filtered = []
+    t0 = time.perf_counter()
+    for i in range(args.batches):
+        batch = low_pass.process(stream[i * SAMPLE_FILTERING:(i + 1) * SAMPLE_FILTERING])
+        peaks.update(*integrator.process(batch))
+        filtered.append(batch)
+    streaming_us = (time.perf_counter() - t0) / len(stream) * 1e6
+
+    reference = pandas.DataFrame(stream).rolling(window=WINDOW_FILTERING, win_type='triang').mean().values
+    assert np.allclose(np.concatenate(filtered), reference[WINDOW_FILTERING - 1:], rtol=0, atol=1e-12)
+
+    budget_us = args.period * 1e6
+    print(f"processing per sample: pandas/iterrows {legacy_us:8.1f} us, streaming {streaming_us:6.2f} us "
+          f"(budget {budget_us:.0f} us at {1 / args.period:.0f} Hz)")
+
+    sensor = SimulatedMMA8452Q(read_latency=args.read_latency)
+    batches = max(1, int(args.seconds / args.period / SAMPLE_FILTERING))
+    t0 = time.perf_counter()
+    reads_before = accelcat.SAMPLE_CALIBRATION
+    late = accelcat.run(sensor, args.period, batches=batches, report=lambda peaks: None)
+    elapsed = time.perf_counter() - t0
+    samples = sensor.reads - reads_before
+    rate = samples / (elapsed - args.period - reads_before * args.read_latency)
+    print(f"run() at {args.period * 1000:.1f} ms: {samples} samples, {rate:.0f} Hz achieved, {late} late readings")
+    assert abs(rate - 1 / args.period) < 0.05 / args.period, "sample rate off by more than 5%"
+
+
+if __name__ == '__main__':
+    main()
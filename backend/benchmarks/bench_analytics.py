@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Vectorized analytics against the original per-element loops.
+
+Runs both implementations over the same window (1M samples by default),
+checks that step/jump counts are identical and speeds/displacements match,
+and reports the time of each. Pass --npz with arrays named timestamps, x, y,
+ax, ay, az (e.g. exported from player_tracking_data) to check recorded data
+instead of the synthetic match.
+
+Usage:
+    python benchmarks/bench_analytics.py --samples 1000000 [--npz recorded.npz]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import analytics  # noqa: E402
+
+
+# Reference implementations: the loops app.py shipped with
+
+def reference_speed_and_displacement(x_positions, y_positions, z_positions, timestamps):
+    dt = np.diff(timestamps) / 1_000_000
+    speeds = np.zeros(len(timestamps))
+    displacements = np.zeros(len(timestamps))
+    vx = np.diff(x_positions) / dt
+    vy = np.diff(y_positions) / dt
+    vz = np.diff(z_positions) / dt
+    speeds[1:] = np.sqrt(vx**2 + vy**2 + vz**2)
+    for i in range(1, len(timestamps)):
+        time_interval = (timestamps[i] - timestamps[i-1]) / 1_000_000
+        displacements[i] = displacements[i-1] + (speeds[i] + speeds[i-1]) * time_interval / 2
+    return speeds, displacements
+
+
+def reference_detect_steps(acc_magnitude, threshold):
+    step_counter = 0
+    step_b_ts = -1
+    step_e_ts = -1
+    prev_acc = -1
+    for ts, current_acc in enumerate(acc_magnitude):
+        if prev_acc != -1 and current_acc > threshold:
+            if prev_acc < threshold:
+                step_b_ts = ts
+        elif prev_acc >= threshold and current_acc <= threshold:
+            step_e_ts = ts
+            if step_b_ts != -1 and step_e_ts > step_b_ts:
+                step_counter += 1
+        prev_acc = current_acc
+    return step_counter
+
+
+def reference_detect_jumps(acc_buffer, jump_threshold):
+    alpha = 0.2
+    filtered_acc = np.zeros_like(acc_buffer)
+    filtered_acc[0] = acc_buffer[0]
+    for i in range(1, len(acc_buffer)):
+        filtered_acc[i] = alpha * acc_buffer[i] + (1 - alpha) * filtered_acc[i-1]
+    jump_count = 0
+    min_distance = 5
+    for i in range(1, len(filtered_acc) - 1):
+        if (filtered_acc[i] > filtered_acc[i-1] and
+                filtered_acc[i] > filtered_acc[i+1] and
+                filtered_acc[i] > jump_threshold):
+            if (i == 1 or i - 1 >= min_distance):
+                jump_count += 1
+    return jump_count
+
+
+def synthetic_window(n, seed=7):
+    """A match-like 50 Hz window with stride and jump bursts"""
+    rng = np.random.default_rng(seed)
+    timestamps = 1_700_000_000_000_000 + np.cumsum(rng.integers(18_000, 22_000, n))
+    t = (timestamps - timestamps[0]) / 1e6
+    x = np.cumsum(rng.normal(0, 0.05, n)) + 50 * np.sin(t / 40)
+    y = np.cumsum(rng.normal(0, 0.05, n)) + 30 * np.cos(t / 55)
+    stride = 3 * np.abs(np.sin(2 * np.pi * 1.6 * t))
+    jumps = 8 * (rng.random(n) < 0.002)
+    ax = rng.normal(0, 1.5, n)
+    ay = rng.normal(0, 1.5, n)
+    az = 9.81 + stride + jumps + rng.normal(0, 0.8, n)
+    return timestamps, x, y, ax, ay, az
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=1_000_000)
+    parser.add_argument('--npz', help='recorded window with timestamps, x, y, ax, ay, az arrays')
+    args = parser.parse_args()
+
+    if args.npz:
+        data = np.load(args.npz)
+        timestamps, x, y, ax, ay, az = (data[k] for k in ('timestamps', 'x', 'y', 'ax', 'ay', 'az'))
+    else:
+        timestamps, x, y, ax, ay, az = synthetic_window(args.samples)
+    z = np.zeros(len(timestamps))
+
+    acc = analytics.calculate_acceleration(ax, ay, az)
+    analytics.detect_jumps(acc[:10], 4.0)  # warm up a compiled fallback, if used
+
+    (ref_speeds, ref_disp), t_ref_speed = timed(reference_speed_and_displacement, x, y, z, timestamps)
+    (speeds, disp), t_speed = timed(analytics.calculate_speed_and_displacement, x, y, None, timestamps)
+    ref_steps, t_ref_steps = timed(reference_detect_steps, acc, 2.0)
+    steps, t_steps = timed(analytics.detect_steps, acc, 2.0)
+    ref_jumps, t_ref_jumps = timed(reference_detect_jumps, acc, 4.0)
+    jumps, t_jumps = timed(analytics.detect_jumps, acc, 4.0)
+
+    assert steps == ref_steps, (steps, ref_steps)
+    assert jumps == ref_jumps, (jumps, ref_jumps)
+    assert np.array_equal(speeds, ref_speeds)
+    assert np.allclose(disp, ref_disp, rtol=1e-12, atol=0)
+
+    print(f"{len(timestamps):,} samples: steps={steps} jumps={jumps} displacement={disp[-1]:.1f}")
+    print(f"{'metric':>14} {'loop s':>9} {'vector s':>9} {'speedup':>8}")
+    for name, ref, new in (("speed/disp", t_ref_speed, t_speed),
+                           ("steps", t_ref_steps, t_steps),
+                           ("jumps", t_ref_jumps, t_jumps)):
+        print(f"{name:>14} {ref:>9.3f} {new:>9.4f} {ref / new:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
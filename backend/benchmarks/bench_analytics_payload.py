@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Size and serialisation cost of the /api/player-analytics response shapes.
+
+Computes the analytics of a synthetic full match (90 minutes at 50 Hz by
+default) once, then for every format with and without max_points reports
+the JSON size, its gzip size and the time to format and serialise it.
+
+With --url the same combinations are requested from a running API instead,
+timing the whole request (query, analytics, encoding, transfer):
+
+    python benchmarks/bench_analytics_payload.py --url http://localhost:5001 \\
+        --player <player_id> --start <micros> --end <micros>
+
+Usage:
+    python benchmarks/bench_analytics_payload.py --minutes 90 --max-points 2000
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import urllib.request
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analytics import analyze_columns  # noqa: E402
+from analytics_response import ANALYTICS_FORMATS, format_analytics  # noqa: E402
+from bench_analytics import synthetic_window  # noqa: E402
+
+
+def synthetic_columns(n):
+    timestamps, x, y, ax, ay, az = synthetic_window(n)
+    return {
+        'timestamp_micros': timestamps.astype(np.int64),
+        'x_position': x.astype(np.float32),
+        'y_position': y.astype(np.float32),
+        'accel_x': ax.astype(np.float32),
+        'accel_y': ay.astype(np.float32),
+        'accel_z': az.astype(np.float32),
+    }
+
+
+def local(args):
+    result = analyze_columns(synthetic_columns(args.minutes * 60 * 50))
+    print(f"{len(result['timestamps']):,} samples")
+    print(f"{'format':>8} {'points':>10} {'JSON KiB':>10} {'gzip KiB':>10} {'encode ms':>10}")
+    for fmt in ANALYTICS_FORMATS:
+        for max_points in (None, args.max_points):
+            t0 = time.perf_counter()
+            body = json.dumps(format_analytics(result, fmt, max_points)).encode()
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            points = 'all' if max_points is None else f"{max_points:,}"
+            print(f"{fmt:>8} {points:>10} {len(body) / 1024:>10,.0f} "
+                  f"{len(gzip.compress(body)) / 1024:>10,.0f} {elapsed_ms:>10.1f}")
+
+
+def remote(args):
+    print(f"{'format':>8} {'points':>10} {'KiB':>10} {'latency ms':>11}")
+    for fmt in ANALYTICS_FORMATS:
+        for max_points in (None, args.max_points):
+            query = (f"{args.url}/api/player-analytics?player_id={args.player}"
+                     f"&start_time={args.start}&end_time={args.end}&resolution=raw&format={fmt}")
+            if max_points is not None:
+                query += f"&max_points={max_points}"
+            timings = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                with urllib.request.urlopen(query) as response:
+                    body = response.read()
+                timings.append((time.perf_counter() - t0) * 1000)
+            points = 'all' if max_points is None else f"{max_points:,}"
+            print(f"{fmt:>8} {points:>10} {len(body) / 1024:>10,.0f} {min(timings):>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=int, default=90)
+    parser.add_argument('--max-points', type=int, default=2000)
+    parser.add_argument('--url', help='base URL of a running API for end-to-end timings')
+    parser.add_argument('--player')
+    parser.add_argument('--start', type=int)
+    parser.add_argument('--end', type=int)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.url:
+        remote(args)
+    else:
+        local(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Row-dict vs columnar reads of a player window.
+
+Reads the same window with DatabaseHandler.get_player_data followed by the
+array building app.py used to do, and with DatabaseHandler.get_player_columns,
+and reports wall time and peak Python heap (tracemalloc) of each. Point it at
+a player with a full match of data, e.g. one populated by
+bench_range_reads.py.
+
+Usage:
+    python benchmarks/bench_columnar_fetch.py --player bench-00 --start <micros> --end <micros>
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database_handler import DatabaseHandler  # noqa: E402
+
+
+def rows_to_arrays(db, player_id, start, end):
+    data = db.get_player_data(player_id, start, end)
+    return {
+        'timestamp_micros': np.array([d['timestamp_micros'] for d in data]),
+        'x_position': np.array([d.get('x_position', 0) for d in data]),
+        'y_position': np.array([d.get('y_position', 0) for d in data]),
+        'accel_x': np.array([d.get('accel_x', 0) for d in data]),
+        'accel_y': np.array([d.get('accel_y', 0) for d in data]),
+        'accel_z': np.array([d.get('accel_z', 0) for d in data]),
+    }
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--player', required=True)
+    parser.add_argument('--start', type=int, required=True, help='start time, epoch microseconds')
+    parser.add_argument('--end', type=int, required=True, help='end time, epoch microseconds')
+    args = parser.parse_args()
+
+    db = DatabaseHandler()
+    rows, t_rows, peak_rows = measure(rows_to_arrays, db, args.player, args.start, args.end)
+    columns, t_cols, peak_cols = measure(db.get_player_columns, args.player, args.start, args.end)
+
+    assert np.array_equal(rows['timestamp_micros'], columns['timestamp_micros'])
+
+    print(f"{len(columns['timestamp_micros']):,} samples")
+    print(f"{'read':>10} {'seconds':>9} {'peak MiB':>9}")
+    print(f"{'rows':>10} {t_rows:>9.3f} {peak_rows / 2**20:>9.1f}")
+    print(f"{'columns':>10} {t_cols:>9.3f} {peak_cols / 2**20:>9.1f}")
+    print(f"speedup {t_rows / t_cols:.1f}x, memory {peak_rows / peak_cols:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Throughput and memory of the streaming exports.
+
+Encodes synthetic windows of growing length as CSV, gzip CSV and Parquet
+with export.iter_csv / iter_parquet, the way /api/export streams them, and
+reports rows per second, output size and the traced peak memory, which
+should stay flat as the window grows.
+
+Usage:
+    python benchmarks/bench_export.py --rows 100000,1000000 --chunk 50000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_streaming_analytics import chunks  # noqa: E402
+from export import EXPORT_COLUMNS, iter_csv, iter_parquet, parquet_available, with_derived  # noqa: E402
+
+
+def raw_chunks(rows, chunk):
+    for columns in chunks(rows, chunk):
+        columns['heart_rate'] = np.zeros(len(columns['timestamp_micros']), dtype=np.float32)
+        yield columns
+
+
+def measure(encode, rows, chunk):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    size = sum(len(piece) for piece in encode(with_derived(raw_chunks(rows, chunk))))
+    elapsed = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default='100000,1000000')
+    parser.add_argument('--chunk', type=int, default=50_000)
+    parser.add_argument('--row-group', type=int, default=100_000)
+    args = parser.parse_args()
+
+    names = [name for name, _ in EXPORT_COLUMNS]
+    encoders = {
+        'csv': lambda c: iter_csv(c, names),
+        'csv.gz': lambda c: iter_csv(c, names, 'gzip'),
+    }
+    if parquet_available():
+        encoders['parquet'] = lambda c: iter_parquet(c, names, 'snappy', args.row_group)
+
+    # Import the filter backend and pyarrow outside the measurements
+    for encode in encoders.values():
+        measure(encode, 1000, args.chunk)
+
+    print(f"{'format':>8} {'rows':>10} {'rows/s':>10} {'MB out':>8} {'peak MB':>8}")
+    for rows in (int(r) for r in args.rows.split(',')):
+        for name, encode in encoders.items():
+            elapsed, size, peak = measure(encode, rows, args.chunk)
+            print(f"{name:>8} {rows:>10,} {rows / elapsed:>10,.0f} {size / 2**20:>8.1f} {peak / 2**20:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
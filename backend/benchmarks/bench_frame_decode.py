@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Per-sample decode cost: the old per-packet path (hex string, struct.unpack,
+nested dict, json.dumps) against FrameRing batch decoding into columns.
+
+Usage:
+    python benchmarks/bench_frame_decode.py --frames 200000 --batch 50
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fake_ble import synthetic_frame  # noqa: E402
+from frame_decoder import FrameRing  # noqa: E402
+
+
+def per_packet(frames):
+    for data in frames:
+        ":".join("{:02x}".format(byte) for byte in data)
+        (x, y, ax, ay, az, gx, gy, gz, battery, hr, serial, status) = struct.unpack("<8f4B", data)
+        json.dumps({
+            "x_position": x, "y_position": y,
+            "accelerometer": {"x": ax, "y": ay, "z": az},
+            "gyroscope": {"x": gx, "y": gy, "z": gz},
+            "battery_life": battery, "heart_rate": hr,
+            "serial_number": serial, "activity_status": status,
+            "tag_id": "0f1c"
+        })
+
+
+def batched(frames, batch):
+    ring = FrameRing(batch)
+    for i, data in enumerate(frames):
+        ring.append(data, i)
+        if len(ring) == batch:
+            ring.drain()
+    ring.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=200_000)
+    parser.add_argument('--batch', type=int, default=50, help='frames decoded per drain')
+    args = parser.parse_args()
+
+    frames = [bytearray(synthetic_frame(i / 50)) for i in range(args.frames)]
+
+    for name, run in (("per-packet", lambda: per_packet(frames)),
+                      ("batched", lambda: batched(frames, args.batch))):
+        t0 = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - t0
+        print(f"{name:>10}: {elapsed * 1e6 / args.frames:7.2f} us/sample  "
+              f"{args.frames / elapsed:12,.0f} samples/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Behaviour of the per-tag ingest queue under a load spike.
+
+Feeds batches from a number of tags for a few seconds while one tag's
+processing is stalled (as with a hanging player lookup), once per overflow
+policy, and reports how many samples each tag got through, how many were
+dropped and the highest queue depth. Healthy tags must keep up, every tag's
+samples must arrive in order, and no queue may grow past its bound by more
+than one batch.
+
+Usage:
+    python benchmarks/bench_ingest_queue.py --tags 30 --seconds 3 --stall 1.0
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ingest_queue import OVERFLOW_POLICIES, TagIngestQueue  # noqa: E402
+
+BATCH_INTERVAL = 0.05
+SAMPLES_PER_BATCH = 3
+
+
+async def run(policy, tags, seconds, stall, workers, max_samples):
+    processed = {tag: [] for tag in tags}
+
+    async def process(tag_id, columns):
+        await asyncio.sleep(stall if tag_id == tags[0] else 0.001)
+        processed[tag_id].extend(columns['timestamp_micros'].tolist())
+
+    queue = TagIngestQueue(process, workers=workers, max_samples=max_samples, policy=policy)
+    await queue.start()
+    held = {tag: [] for tag in tags}
+    peak = largest = 0
+    counter = 0
+    for _ in range(int(seconds / BATCH_INTERVAL)):
+        await asyncio.sleep(BATCH_INTERVAL)
+        for tag in tags:
+            batch = np.arange(counter, counter + SAMPLES_PER_BATCH, dtype=np.int64)
+            counter += SAMPLES_PER_BATCH
+            # Under 'block' a refused batch stays with the producer, like frames in a ring
+            held[tag].append(batch)
+            if queue.has_room(tag):
+                batch = np.concatenate(held[tag])
+                largest = max(largest, len(batch))
+                queue.put(tag, {'timestamp_micros': batch})
+                held[tag] = []
+        peak = max(peak, max(queue.depth(tag) for tag in tags))
+    await queue.join()
+    await queue.stop()
+
+    for tag, timestamps in processed.items():
+        assert timestamps == sorted(timestamps), f"{tag} out of order"
+    assert peak <= max_samples + largest
+    return processed, queue.dropped, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tags', type=int, default=30)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--stall', type=float, default=1.0, help="processing time of the stalled tag, seconds")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--max-samples', type=int, default=20)
+    args = parser.parse_args()
+
+    tags = [f"{i:04x}" for i in range(args.tags)]
+    sent = int(args.seconds / BATCH_INTERVAL) * SAMPLES_PER_BATCH
+    print(f"{'policy':>12} {'stalled tag':>12} {'other tags':>11} {'dropped':>8} {'peak depth':>10}   (of {sent} each)")
+    for policy in OVERFLOW_POLICIES:
+        processed, dropped, peak = asyncio.run(
+            run(policy, tags, args.seconds, args.stall, args.workers, args.max_samples))
+        others = min(len(processed[tag]) for tag in tags[1:])
+        assert others == sent, f"healthy tags fell behind under {policy}"
+        print(f"{policy:>12} {len(processed[tags[0]]):>12} {others:>11} "
+              f"{sum(dropped.values()):>8} {peak:>10}")
+
+
+if __name__ == '__main__':
+    main()
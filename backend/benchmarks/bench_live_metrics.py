@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Per-sample cost of the gateway's live metrics stage.
+
+Feeds synthetic 50 Hz batches for a squad of tags through
+LiveMetricsEngine.process, the way process_frames delivers them, and reports
+microseconds per sample against the latency budget. Nothing is published.
+
+Usage:
+    python benchmarks/bench_live_metrics.py --tags 30 --seconds 60 --batch 3
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fake_ble import synthetic_frame  # noqa: E402
+from frame_decoder import FrameRing  # noqa: E402
+from live_metrics import LiveMetricsEngine  # noqa: E402
+
+RATE_HZ = 50
+
+
+class NullClient:
+    def publish(self, topic, payload, retain=False):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tags', type=int, default=30)
+    parser.add_argument('--seconds', type=int, default=60)
+    parser.add_argument('--batch', type=int, default=3, help='samples per tag per decode tick')
+    args = parser.parse_args()
+
+    engine = LiveMetricsEngine(NullClient(), "bench")
+    t0 = time.perf_counter()
+    engine.warm_up()
+    print(f"kernel warm-up {time.perf_counter() - t0:.2f}s")
+
+    # Pre-decode the batches so only the metrics stage is timed
+    batches = []
+    for start in range(0, args.seconds * RATE_HZ, args.batch):
+        for tag in range(args.tags):
+            ring = FrameRing(args.batch)
+            for i in range(start, start + args.batch):
+                ring.append(synthetic_frame(i / RATE_HZ, tag), 1_700_000_000_000_000 + i * 20_000)
+            batches.append((f"{tag:04x}", ring.drain()))
+
+    t0 = time.perf_counter()
+    for tag_id, columns in batches:
+        engine.process(tag_id, None, columns)
+    elapsed = time.perf_counter() - t0
+    samples = sum(len(columns['timestamp_micros']) for _, columns in batches)
+
+    per_sample = elapsed / samples * 1e6
+    print(f"{samples:,} samples for {args.tags} tags: {per_sample:.1f} us/sample "
+          f"(budget {engine.latency_budget_micros:.0f} us), "
+          f"{args.tags * RATE_HZ * per_sample / 1e4:.2f}% of one core at {RATE_HZ} Hz")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Cost of the metrics instrumentation on the hot paths.
+
+Times histogram observations, timed blocks and counter increments the way
+the gateway records them per batch, renders a registry the size of a busy
+gateway's, and measures how much a CPU-bound loop slows down while the
+sampling profiler is running.
+
+Usage:
+    python benchmarks/bench_metrics.py --ops 200000 --tags 30
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from metrics import MetricsRegistry, SamplingProfiler  # noqa: E402
+
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[^}]*\})? [-+0-9.eInf]+$')
+
+
+def per_op(fn, ops):
+    t0 = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return (time.perf_counter() - t0) / ops * 1e9
+
+
+def spin(seconds):
+    """Count loop iterations in `seconds` of wall time"""
+    n = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        n += 1
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=200_000)
+    parser.add_argument('--tags', type=int, default=30)
+    parser.add_argument('--profile-interval', type=float, default=0.005)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    stages = registry.histogram('gateway_stage_seconds', 'stage time', ['stage'])
+    frames = registry.counter('gateway_frames_processed_total', 'frames', ['tag'])
+    decode = stages.labels('decode')
+
+    def timed():
+        with decode.time():
+            pass
+
+    print(f"histogram.observe          {per_op(lambda: decode.observe(0.0003), args.ops):8.0f} ns")
+    print(f"labels().observe           {per_op(lambda: stages.labels('publish').observe(0.0003), args.ops):8.0f} ns")
+    print(f"with histogram.time()      {per_op(timed, args.ops):8.0f} ns")
+    print(f"labels().inc               {per_op(lambda: frames.labels('0f1c').inc(10), args.ops):8.0f} ns")
+
+    for stage in ('decode', 'player_lookup', 'db_write', 'publish', 'live_metrics'):
+        stages.labels(stage).observe(0.001)
+    for tag in range(args.tags):
+        frames.labels(f"{tag:04x}").inc()
+    t0 = time.perf_counter()
+    text = registry.render()
+    print(f"render                     {(time.perf_counter() - t0) * 1000:8.2f} ms, "
+          f"{len(text.splitlines())} lines")
+    for line in text.splitlines():
+        assert line.startswith('#') or SAMPLE_LINE.match(line), line
+
+    baseline = spin(1.0)
+    profiler = SamplingProfiler(args.profile_interval)
+    profiler.start()
+    profiled = spin(1.0)
+    profiler.stop()
+    assert profiler.samples > 0 and 'bench_metrics.py:spin' in profiler.folded()
+    print(f"profiler every {args.profile_interval * 1000:.0f} ms      {(1 - profiled / baseline) * 100:8.1f} % "
+          f"slower, {profiler.samples} samples")
+
+
+if __name__ == '__main__':
+    main()
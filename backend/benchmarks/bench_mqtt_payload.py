@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+MQTT traffic of the publishing modes for a squad of tags at 50 Hz.
+
+Encodes one simulated second of traffic per tag in each mode and reports
+messages/s, bytes/s and encode time. Nothing is sent to a broker.
+
+Usage:
+    python benchmarks/bench_mqtt_payload.py --tags 30 --interval 0.2
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fake_ble import synthetic_frame  # noqa: E402
+from frame_decoder import FrameRing  # noqa: E402
+from mqtt_publisher import CompactPublisher, json_documents, msgpack  # noqa: E402
+
+RATE_HZ = 50
+
+PLAYER = {
+    "_id": "66cefbaf86b267ee00f54487", "name": "Sample Player", "initials": "SP",
+    "height": 182, "weight": 78, "teamid": "66cefbaf86b267ee00f54400", "teamName": "Locus FC"
+}
+
+
+class CountingClient:
+    """Collects publish sizes instead of talking to a broker"""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    def publish(self, topic, payload, retain=False):
+        self.messages += 1
+        self.bytes += len(topic) + len(payload)
+
+
+def one_second(tag_index, batch):
+    ring = FrameRing(RATE_HZ)
+    for i in range(batch):
+        ring.append(synthetic_frame(i / RATE_HZ, tag_index), 1_700_000_000_000_000 + i * 20_000)
+    return ring.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tags', type=int, default=30)
+    parser.add_argument('--interval', type=float, default=0.2, help='compact publishing tick in seconds')
+    args = parser.parse_args()
+
+    tags = [f"{i:04x}" for i in range(args.tags)]
+    per_tick = max(1, int(RATE_HZ * args.interval))
+    ticks = RATE_HZ // per_tick
+
+    modes = ["json", "binary"] + (["msgpack"] if msgpack is not None else [])
+    print(f"{args.tags} tags at {RATE_HZ} Hz, compact tick {args.interval}s")
+    print(f"{'mode':>8} {'msgs/s':>10} {'bytes/s':>12} {'encode ms/s':>12}")
+    for mode in modes:
+        client = CountingClient()
+        batches = {tag: one_second(i, per_tick) for i, tag in enumerate(tags)}
+        t0 = time.perf_counter()
+        if mode == "json":
+            for _ in range(ticks):
+                for tag, columns in batches.items():
+                    topic = f"leaps/1234/node/uplink/ble_location/{tag}"
+                    for document in json_documents(tag, PLAYER, columns):
+                        client.publish(topic, json.dumps(document).encode())
+        else:
+            publisher = CompactPublisher(client, "leaps/1234/node/uplink/ble_location", encoding=mode)
+            for _ in range(ticks):
+                for tag, columns in batches.items():
+                    publisher.publish(tag, PLAYER, columns)
+                publisher.flush()
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+        print(f"{mode:>8} {client.messages:>10,} {client.bytes:>12,} {elapsed_ms:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
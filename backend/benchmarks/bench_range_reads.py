@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Range-read benchmark for player_tracking_data.
+
+Grows the table in steps (1M -> 10M -> 100M rows by default) with synthetic
+50 Hz samples for a squad of benchmark players and, after every step, times
+DatabaseHandler.get_player_data over a fixed window and
+DatabaseHandler.get_player_latest_data. With the clustered
+(player_id, timestamp_micros) key and daily partitions both latencies should
+stay flat as the table grows.
+
+This writes into the database configured in DatabaseHandler, so point it at a
+scratch instance. Benchmark rows use player ids starting with 'bench-' and are
+removed again with --cleanup.
+
+Usage:
+    python benchmarks/bench_range_reads.py --steps 1000000 10000000 100000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from database_handler import DatabaseHandler  # noqa: E402
+
+SAMPLE_PERIOD_MICROS = 20_000  # 50 Hz
+INSERT_BATCH = 10_000
+
+
+def populate(db: DatabaseHandler, players, start_micros: int, offset: int, target_rows: int):
+    """Append synthetic rows round-robin over `players` until `target_rows` exist."""
+    connection = db.connection_pool.get_connection()
+    cursor = connection.cursor()
+    query = """
+        INSERT INTO player_tracking_data
+        (player_id, tag_id, timestamp_micros, x_position, y_position,
+         accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z,
+         battery_life, heart_rate, serial_number, activity_status)
+        VALUES (%s, NULL, %s, %s, %s, %s, %s, %s, 0, 0, 0, 100, 120, 0, 1)
+    """
+    rows = []
+    while offset < target_rows:
+        player = players[offset % len(players)]
+        ts = start_micros + (offset // len(players)) * SAMPLE_PERIOD_MICROS
+        rows.append((player, ts, random.random() * 100, random.random() * 60,
+                     random.gauss(0, 3), random.gauss(0, 3), random.gauss(9.81, 3)))
+        offset += 1
+        if len(rows) == INSERT_BATCH:
+            cursor.executemany(query, rows)
+            connection.commit()
+            rows.clear()
+    if rows:
+        cursor.executemany(query, rows)
+        connection.commit()
+    cursor.close()
+    connection.close()
+    return offset
+
+
+def time_reads(db: DatabaseHandler, players, start_micros: int, rows: int, window_s: int, repeats: int):
+    """Return (p50, p95) milliseconds for range reads and latest-sample reads."""
+    span_micros = (rows // len(players)) * SAMPLE_PERIOD_MICROS
+    window_micros = window_s * 1_000_000
+    range_ms, latest_ms = [], []
+    for _ in range(repeats):
+        player = random.choice(players)
+        begin = start_micros + random.randint(0, max(0, span_micros - window_micros))
+
+        t0 = time.perf_counter()
+        db.get_player_data(player, begin, begin + window_micros)
+        range_ms.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        db.get_player_latest_data(player)
+        latest_ms.append((time.perf_counter() - t0) * 1000)
+
+    def p95(values):
+        return statistics.quantiles(values, n=20)[-1]
+
+    return ((statistics.median(range_ms), p95(range_ms)),
+            (statistics.median(latest_ms), p95(latest_ms)))
+
+
+def cleanup(db: DatabaseHandler):
+    connection = db.connection_pool.get_connection()
+    cursor = connection.cursor()
+    while True:
+        cursor.execute("DELETE FROM player_tracking_data WHERE player_id LIKE 'bench-%' LIMIT 50000")
+        connection.commit()
+        if cursor.rowcount == 0:
+            break
+    cursor.close()
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps', type=int, nargs='+', default=[1_000_000, 10_000_000, 100_000_000])
+    parser.add_argument('--players', type=int, default=30)
+    parser.add_argument('--window', type=int, default=60, help='range read window in seconds')
+    parser.add_argument('--repeats', type=int, default=200)
+    parser.add_argument('--cleanup', action='store_true', help='delete benchmark rows and exit')
+    args = parser.parse_args()
+
+    db = DatabaseHandler()
+    if args.cleanup:
+        cleanup(db)
+        return
+
+    players = [f"bench-{i:03d}" for i in range(args.players)]
+    # Enough daily partitions for the largest step at 50 Hz per player
+    span_days = (max(args.steps) // args.players) * SAMPLE_PERIOD_MICROS // 86_400_000_000 + 1
+    db.ensure_daily_partitions(days_ahead=span_days + 1)
+    start_micros = db.get_current_epoch_micros()
+
+    print(f"{'rows':>12} {'range p50':>10} {'range p95':>10} {'latest p50':>11} {'latest p95':>11}  (ms)")
+    offset = 0
+    for target in sorted(args.steps):
+        offset = populate(db, players, start_micros, offset, target)
+        (r50, r95), (l50, l95) = time_reads(db, players, start_micros, target, args.window, args.repeats)
+        print(f"{target:>12} {r50:>10.2f} {r95:>10.2f} {l50:>11.2f} {l95:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
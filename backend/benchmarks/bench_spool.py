@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Spool append and drain throughput.
+
+Appends synthetic frames from a number of tags to a spool in a temporary
+directory, the way the gateway's notification handler does, next to the
+FrameRing append it already makes for every frame; then reads the spool
+back and splits it into per-tag column batches as the drainer does. A
+second writer opened on the same directory must continue after the last
+record, as after a crash.
+
+Usage:
+    python benchmarks/bench_spool.py --frames 500000 --tags 30
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from frame_decoder import FRAME_DTYPE, FrameRing  # noqa: E402
+from spool import SpoolReader, SpoolWriter, list_segments, spool_batches  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=500_000)
+    parser.add_argument('--tags', type=int, default=30)
+    parser.add_argument('--segment-records', type=int, default=1 << 18)
+    parser.add_argument('--batch', type=int, default=10_000, help="records per drain batch")
+    args = parser.parse_args()
+
+    frames = np.zeros(args.frames, dtype=FRAME_DTYPE)
+    frames['x_position'] = np.arange(args.frames)
+    raw = [frame.tobytes() for frame in frames]
+    tags = [f"{i % args.tags:04x}" for i in range(args.frames)]
+    received = 1_700_000_000_000_000 + np.arange(args.frames) * 20_000 // args.tags
+
+    with tempfile.TemporaryDirectory() as directory:
+        ring = FrameRing(1024)
+        t0 = time.perf_counter()
+        for frame, ts in zip(raw, received.tolist()):
+            ring.append(frame, ts)
+        ring_rate = args.frames / (time.perf_counter() - t0)
+
+        writer = SpoolWriter(directory, segment_records=args.segment_records, max_segments=1_000)
+        t0 = time.perf_counter()
+        for tag_id, frame, ts in zip(tags, raw, received.tolist()):
+            writer.append(tag_id, frame, ts)
+        append_rate = args.frames / (time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        writer.sync()
+        sync_ms = (time.perf_counter() - t0) * 1000
+        position = writer.position
+        writer.close()
+        assert SpoolWriter(directory, segment_records=args.segment_records).position == position
+
+        reader = SpoolReader(directory)
+        read_position = reader.start()
+        samples = 0
+        t0 = time.perf_counter()
+        while True:
+            records, next_position = reader.read(read_position, args.batch)
+            if next_position == read_position:
+                break
+            samples += sum(len(columns['timestamp_micros']) for columns in spool_batches(records).values())
+            read_position = next_position
+        drain_rate = samples / (time.perf_counter() - t0)
+        reader.close()
+        assert samples == args.frames and read_position == position
+
+        print(f"FrameRing.append     {ring_rate:>12,.0f} frames/s")
+        print(f"SpoolWriter.append   {append_rate:>12,.0f} frames/s")
+        print(f"sync                 {sync_ms:>12.1f} ms")
+        print(f"read + split by tag  {drain_rate:>12,.0f} frames/s "
+              f"({len(list_segments(directory))} segments)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Stateful batch kernels against the scalar calculate_sports_numba kernels.
+
+Feeds the same synthetic samples through the scalar kernels one call per
+sample (shifting buffers as the gateway used to) and through
+process_samples in batches, checks that speeds, running step and jump
+counts and sprint phases agree, and reports the cost per sample of each.
+The scalar jump reference is one detect_jump call over the whole recording,
+which the incremental detector reproduces.
+
+Usage:
+    python benchmarks/bench_sports_kernels.py --samples 200000 --batch 3
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import calculate_sports_numba as kernels  # noqa: E402
+from numba import njit  # noqa: E402
+
+SPEED_WINDOW = 10
+HISTORY = 20
+STEP_THRESHOLD = 2.0
+JUMP_THRESHOLD = 4.0
+
+calculate_speed = njit(kernels.calculate_speed)
+calculate_acceleration = njit(kernels.calculate_acceleration)
+detect_steps = njit(kernels.detect_steps)
+detect_jump = njit(kernels.detect_jump)
+is_acceleration_phase = njit(kernels.is_acceleration_phase)
+is_max_velocity_phase = njit(kernels.is_max_velocity_phase)
+is_deceleration_phase = njit(kernels.is_deceleration_phase)
+process_samples = njit(kernels.process_samples)
+
+
+def synthetic_samples(n, seed=3):
+    rng = np.random.default_rng(seed)
+    ts = 1_700_000_000 + np.cumsum(rng.integers(18_000, 22_000, n)) / 1e6
+    t = ts - ts[0]
+    ax = rng.normal(0, 1.5, n)
+    ay = rng.normal(0, 1.5, n)
+    # sprints of rising then falling vertical acceleration, strides and jumps
+    sprint = 60 * np.clip(np.sin(2 * np.pi * t / 40), 0, None) ** 2
+    az = 9.81 + sprint + 3 * np.abs(np.sin(2 * np.pi * 1.6 * t)) + 8 * (rng.random(n) < 0.003)
+    az += rng.normal(0, 0.8, n)
+    status = (rng.random(n) > 0.01).astype(np.int64)
+    return ts, ax, ay, az, status
+
+
+def scalar_reference(ts, ax, ay, az, status):
+    n = len(ts)
+    speeds = np.empty(n)
+    steps = np.empty(n, dtype=np.int64)
+    phases = np.empty(n, dtype=np.int64)
+    acc = np.empty(n)
+    initial_ts, reference_ts, prev_ts, last_nonzero = 0.0, -1.0, -1.0, 0.0
+    max_speed = np.zeros(SPEED_WINDOW)
+    prev_acc, current_acc, prev_time, current_time = -1.0, -1.0, 0.0, 0.0
+    step_b, step_e, step_count = -1.0, -1.0, 0
+    history = np.zeros(HISTORY)
+    for k in range(n):
+        (speed, initial_ts, reference_ts, prev_ts, max_speed, last_nonzero, *_) = calculate_speed(
+            initial_ts, reference_ts, prev_ts, max_speed, last_nonzero, 0.0, ts[k], az[k], status[k])
+        (prev_acc, current_acc, prev_time, current_time, *_) = calculate_acceleration(
+            prev_acc, current_acc, prev_time, current_time, ax[k], ay[k], az[k], ts[k], reference_ts)
+        (_, _, _, step_count, _, step_b, step_e, _, _) = detect_steps(
+            prev_acc, current_acc, STEP_THRESHOLD, step_count, prev_ts, step_b, step_e, ts[k], status[k])
+        history[:-1] = history[1:]
+        history[-1] = speed / 3.6
+        if is_max_velocity_phase(history):
+            phases[k] = kernels.PHASE_MAX_VELOCITY
+        elif is_deceleration_phase(history):
+            phases[k] = kernels.PHASE_DECELERATION
+        elif is_acceleration_phase(history):
+            phases[k] = kernels.PHASE_ACCELERATION
+        else:
+            phases[k] = kernels.PHASE_IDLE
+        speeds[k] = speed
+        steps[k] = step_count
+        acc[k] = current_acc
+    jump_count = detect_jump(acc, ts, JUMP_THRESHOLD, 0, 0.0)[0]
+    return speeds, steps, jump_count, phases
+
+
+def batched(ts, ax, ay, az, status, batch):
+    state = kernels.new_state()
+    window = np.zeros(SPEED_WINDOW)
+    parts = []
+    for start in range(0, len(ts), batch):
+        end = start + batch
+        parts.append(process_samples(state, window, ts[start:end], ax[start:end], ay[start:end],
+                                     az[start:end], status[start:end], STEP_THRESHOLD, JUMP_THRESHOLD, HISTORY))
+    return tuple(np.concatenate(column) for column in zip(*parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=200_000)
+    parser.add_argument('--batch', type=int, default=3, help='samples per process_samples call')
+    args = parser.parse_args()
+
+    samples = synthetic_samples(args.samples)
+    warm = tuple(column[:50] for column in samples)
+    scalar_reference(*warm)
+    batched(*warm, args.batch)
+
+    t0 = time.perf_counter()
+    ref_speeds, ref_steps, ref_jumps, ref_phases = scalar_reference(*samples)
+    t_scalar = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    speeds, steps, jumps, phases = batched(*samples, args.batch)
+    t_batch = time.perf_counter() - t0
+
+    assert np.allclose(speeds, ref_speeds, rtol=1e-12, atol=1e-12)
+    assert np.array_equal(steps, ref_steps)
+    assert jumps[-1] == ref_jumps, (jumps[-1], ref_jumps)
+    assert np.array_equal(phases, ref_phases)
+
+    print(f"{args.samples:,} samples: steps={steps[-1]} jumps={jumps[-1]} "
+          f"phases={np.bincount(phases, minlength=4).tolist()}")
+    print(f"scalar kernels      {t_scalar / args.samples * 1e6:8.2f} us/sample")
+    print(f"process_samples({args.batch:>3}) {t_batch / args.samples * 1e6:8.2f} us/sample")
+
+
+if __name__ == '__main__':
+    main()
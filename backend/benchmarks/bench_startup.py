@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Cold-start cost of the API and the gateway.
+
+Starts a fresh interpreter per run and measures:
+
+    app      import of app.py, then the first request through the Flask
+             test client (/api/player-analytics for --player/--start/--end,
+             /api/players otherwise)
+    gateway  import of gateway.py, then the first synthetic frame batch
+             through decoding and the live metrics kernels, which includes
+             loading (or JIT compiling) the kernels
+
+Both modules connect to MySQL (and the gateway to the MQTT broker) on
+import, so run this where those are reachable. --importtime lists the
+slowest imports of each module from `python -X importtime`.
+
+Usage:
+    python benchmarks/bench_startup.py --runs 5 [--importtime]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+APP_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+client = app.app.test_client()
+response = client.get(sys.argv[1])
+t2 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "first": t2 - t1, "status": response.status_code}))
+"""
+
+GATEWAY_PROBE = """
+import json, time
+t0 = time.perf_counter()
+import gateway
+t1 = time.perf_counter()
+from fake_ble import synthetic_frame
+from frame_decoder import FrameRing
+ring = FrameRing(8)
+for i in range(3):
+    ring.append(synthetic_frame(i / 50, 1), 1_700_000_000_000_000 + i * 20_000)
+gateway.live_metrics.process("0001", None, ring.drain())
+t2 = time.perf_counter()
+import sports_kernels
+print(json.dumps({"import": t1 - t0, "first": t2 - t1, "kernels": sports_kernels.load().source}))
+gateway.mqtt_client.loop_stop()
+"""
+
+
+def probe(code, *args):
+    output = subprocess.run([sys.executable, "-c", code, *args], cwd=BACKEND,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(module, count=10):
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=BACKEND,
+                            capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--player')
+    parser.add_argument('--start', type=int)
+    parser.add_argument('--end', type=int)
+    parser.add_argument('--importtime', action='store_true')
+    args = parser.parse_args()
+
+    query = '/api/players'
+    if args.player:
+        query = f'/api/player-analytics?player_id={args.player}&start_time={args.start}&end_time={args.end}'
+
+    print(f"{'module':>8} {'import ms':>10} {'first ms':>10}  notes")
+    for name, code, extra in (("app", APP_PROBE, (query,)), ("gateway", GATEWAY_PROBE, ())):
+        runs = [probe(code, *extra) for _ in range(args.runs)]
+        import_ms = statistics.median(run["import"] for run in runs) * 1000
+        first_ms = statistics.median(run["first"] for run in runs) * 1000
+        notes = f"HTTP {runs[-1]['status']}" if name == "app" else f"kernels: {runs[-1]['kernels']}"
+        print(f"{name:>8} {import_ms:>10.0f} {first_ms:>10.0f}  {notes}")
+
+    if args.importtime:
+        for module in ("app", "gateway"):
+            print(f"\nslowest imports of {module} (cumulative ms)")
+            for cumulative, name in slowest_imports(module):
+                print(f"{cumulative / 1000:>10.1f}  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Peak memory of in-memory vs chunked streaming analytics.
+
+Feeds the same synthetic window (generated chunk by chunk) to
+analytics.analyze_columns in one piece and to analytics.StreamingAnalytics
+one chunk at a time, checks that series and summary are identical and
+reports wall time and peak traced memory of each. Streaming memory should
+stay flat as --samples grows.
+
+Usage:
+    python benchmarks/bench_streaming_analytics.py --samples 2000000 --chunk 50000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analytics import StreamingAnalytics, analyze_columns  # noqa: E402
+from bench_analytics import synthetic_window  # noqa: E402
+
+SUMMARY_KEYS = ('average_speed', 'max_speed', 'total_displacement', 'step_count', 'jump_count')
+
+
+def chunks(samples, chunk):
+    """Consecutive synthetic column chunks, generated lazily"""
+    offset = 0
+    for i, start in enumerate(range(0, samples, chunk)):
+        timestamps, x, y, ax, ay, az = synthetic_window(min(chunk, samples - start), seed=i)
+        timestamps = timestamps - timestamps[0] + offset
+        offset = int(timestamps[-1]) + 20_000
+        yield {
+            'timestamp_micros': timestamps.astype(np.int64),
+            'x_position': x.astype(np.float32),
+            'y_position': y.astype(np.float32),
+            'accel_x': ax.astype(np.float32),
+            'accel_y': ay.astype(np.float32),
+            'accel_z': az.astype(np.float32),
+        }
+
+
+def in_memory(samples, chunk):
+    parts = list(chunks(samples, chunk))
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+    del parts
+    result = analyze_columns(columns)
+    return result['displacements'][::997].copy(), {key: result[key] for key in SUMMARY_KEYS}
+
+
+def streaming(samples, chunk):
+    state = StreamingAnalytics()
+    sampled = []
+    seen = 0
+    for columns in chunks(samples, chunk):
+        displacements = state.update(columns)['displacements']
+        sampled.append(displacements[(-seen) % 997::997].copy())
+        seen += len(displacements)
+    summary = state.summary()
+    return np.concatenate(sampled), {key: summary[key] for key in SUMMARY_KEYS}
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=2_000_000)
+    parser.add_argument('--chunk', type=int, default=50_000)
+    args = parser.parse_args()
+
+    (ref_series, ref_summary), t_mem, peak_mem = measure(in_memory, args.samples, args.chunk)
+    (series, summary), t_stream, peak_stream = measure(streaming, args.samples, args.chunk)
+
+    assert np.array_equal(series, ref_series)
+    assert summary == ref_summary, (summary, ref_summary)
+
+    print(f"{args.samples:,} samples in chunks of {args.chunk:,}: {summary}")
+    print(f"{'path':>10} {'seconds':>9} {'peak MiB':>9}")
+    print(f"{'in-memory':>10} {t_mem:>9.2f} {peak_mem / 2**20:>9.1f}")
+    print(f"{'streaming':>10} {t_stream:>9.2f} {peak_stream / 2**20:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
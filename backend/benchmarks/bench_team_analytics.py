@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Team analytics on the process pool against a sequential loop.
+
+Builds synthetic raw columns for a squad, analyses them with
+TeamAnalyticsPool at each worker count (1 is the inline loop), checks the
+per-player summaries and team totals agree, and reports the speed-up.
+
+Usage:
+    python benchmarks/bench_team_analytics.py --players 22 --samples 270000 --workers 1,2,4,8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_analytics import synthetic_window  # noqa: E402
+from team_analytics import TeamAnalyticsPool, analyze_player, team_summary  # noqa: E402
+
+
+def synthetic_team(players, samples):
+    team = {}
+    for p in range(players):
+        timestamps, x, y, ax, ay, az = synthetic_window(samples, seed=p)
+        team[f"player-{p:02d}"] = {
+            'timestamp_micros': timestamps.astype(np.int64),
+            'x_position': x.astype(np.float32),
+            'y_position': y.astype(np.float32),
+            'accel_x': ax.astype(np.float32),
+            'accel_y': ay.astype(np.float32),
+            'accel_z': az.astype(np.float32),
+        }
+    return team
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--players', type=int, default=22)
+    parser.add_argument('--samples', type=int, default=270_000, help='samples per player (90 min at 50 Hz)')
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--format', default='summary')
+    parser.add_argument('--max-points', type=int)
+    args = parser.parse_args()
+
+    team = synthetic_team(args.players, args.samples)
+    # Load the lazily imported filter backend before the workers are forked
+    analyze_player(next(iter(team.values())), args.format, args.max_points, 'lttb')
+    print(f"{args.players} players x {args.samples:,} samples, format={args.format}")
+    print(f"{'workers':>8} {'seconds':>9} {'speed-up':>9}")
+
+    reference = baseline = None
+    for workers in (int(w) for w in args.workers.split(',')):
+        pool = TeamAnalyticsPool(workers, inline_max_samples=0)
+        pool.start()
+        try:
+            t0 = time.perf_counter()
+            players = pool.analyze(team, args.format, args.max_points)
+            elapsed = time.perf_counter() - t0
+        finally:
+            pool.shutdown()
+
+        if reference is None:
+            reference, baseline = players, elapsed
+        else:
+            assert players == reference
+        print(f"{workers:>8} {elapsed:>9.2f} {baseline / elapsed:>8.1f}x")
+
+    print(team_summary(reference))
+
+
+if __name__ == '__main__':
+    main()
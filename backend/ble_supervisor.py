@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Callable
+
+from bleak import BleakClient
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeviceConfig:
+    """One entry of the gateway roster: a BLE tag and the characteristic it notifies on"""
+    address: str
+    characteristic_uuid: str
+    tag_id: str
+
+
+@dataclass
+class DeviceHealth:
+    """Connection health of one supervised device"""
+    state: str = "idle"  # idle, connecting, connected, backoff, stopped
+    connect_attempts: int = 0
+    consecutive_failures: int = 0
+    reconnects: int = 0
+    notifications: int = 0
+    connected_since: Optional[float] = None
+    last_notification: Optional[float] = None
+    last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+def load_roster(path: str) -> List[DeviceConfig]:
+    """
+    Load the device/tag roster from a JSON file.
+
+    The file holds a list of objects with `address`, `characteristic_uuid`
+    and `tag_id` keys.
+
+    Args:
+        path (str): Path of the roster file
+
+    Returns:
+        List[DeviceConfig]: The configured devices
+    """
+    with open(path) as f:
+        entries = json.load(f)
+    return [DeviceConfig(address=e["address"].lower(),
+                         characteristic_uuid=e["characteristic_uuid"],
+                         tag_id=e["tag_id"]) for e in entries]
+
+
+class BleSupervisor:
+    """
+    Keeps one BLE session per roster device connected and subscribed.
+
+    Every device runs its own reconnect loop: connect, subscribe, wait for a
+    disconnect, then back off exponentially with full jitter before the next
+    attempt. At most `max_concurrent_connects` connection attempts run at once
+    since BLE adapters handle parallel connects poorly. `client_factory` is
+    called like BleakClient(address, disconnected_callback=..., **client_kwargs),
+    so a fake client can be swapped in for tests and simulation.
+    """
+
+    def __init__(self, roster: List[DeviceConfig],
+                 on_notification: Callable[[str, Any, bytearray], None],
+                 client_factory: Callable[..., Any] = BleakClient,
+                 max_concurrent_connects: int = 3, initial_backoff: float = 1.0,
+                 max_backoff: float = 60.0, **client_kwargs):
+        """
+        Args:
+            roster (List[DeviceConfig]): Devices to keep connected
+            on_notification (callable): Called as (tag_id, characteristic, data)
+                for every notification, from the event loop
+            client_factory (callable): BleakClient or a compatible fake
+            max_concurrent_connects (int): Upper bound on simultaneous connection attempts
+            initial_backoff (float): Backoff ceiling in seconds after the first failure
+            max_backoff (float): Largest backoff ceiling in seconds
+            **client_kwargs: Extra arguments for the client, e.g. mtu
+        """
+        self.roster = roster
+        self.on_notification = on_notification
+        self.client_factory = client_factory
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.client_kwargs = client_kwargs
+        self.health: Dict[str, DeviceHealth] = {device.tag_id: DeviceHealth() for device in roster}
+        self._max_concurrent_connects = max_concurrent_connects
+        self._connect_slots: Optional[asyncio.Semaphore] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    async def run(self) -> None:
+        """Supervise every device in the roster until stop() is called"""
+        self._connect_slots = asyncio.Semaphore(self._max_concurrent_connects)
+        self._stopping = asyncio.Event()
+        await asyncio.gather(*(self._supervise(device) for device in self.roster))
+
+    def stop(self) -> None:
+        """Disconnect every device and make run() return"""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    def health_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tag health state as plain dicts"""
+        return {tag_id: health.as_dict() for tag_id, health in self.health.items()}
+
+    def _backoff_delay(self, failures: int) -> float:
+        ceiling = min(self.max_backoff, self.initial_backoff * (2 ** max(0, failures - 1)))
+        return random.uniform(0, ceiling)
+
+    async def _supervise(self, device: DeviceConfig) -> None:
+        health = self.health[device.tag_id]
+        loop = asyncio.get_running_loop()
+
+        while not self._stopping.is_set():
+            disconnected = asyncio.Event()
+
+            def handle_disconnected(_client):
+                # Bleak may invoke this from another thread
+                loop.call_soon_threadsafe(disconnected.set)
+
+            def handle_notification(characteristic, data, tag_id=device.tag_id):
+                health.notifications += 1
+                health.last_notification = time.time()
+                self.on_notification(tag_id, characteristic, data)
+
+            client = self.client_factory(device.address, disconnected_callback=handle_disconnected,
+                                         **self.client_kwargs)
+            try:
+                async with self._connect_slots:
+                    health.state = "connecting"
+                    health.connect_attempts += 1
+                    logger.info("Connecting to device %s (tag %s)...", device.address, device.tag_id)
+                    await client.connect()
+
+                await client.start_notify(device.characteristic_uuid, handle_notification)
+                if health.connected_since is not None:
+                    health.reconnects += 1
+                health.state = "connected"
+                health.connected_since = time.time()
+                health.consecutive_failures = 0
+                health.last_error = None
+                logger.info("Connected to device %s (tag %s)", device.address, device.tag_id)
+
+                stop_wait = asyncio.create_task(self._stopping.wait())
+                disconnect_wait = asyncio.create_task(disconnected.wait())
+                await asyncio.wait({stop_wait, disconnect_wait}, return_when=asyncio.FIRST_COMPLETED)
+                stop_wait.cancel()
+                disconnect_wait.cancel()
+                if disconnected.is_set():
+                    logger.info("Disconnected from device %s", device.address)
+                    health.consecutive_failures += 1
+
+            except Exception as e:
+                health.consecutive_failures += 1
+                health.last_error = str(e)
+                logger.error("Error connecting to device %s: %s", device.address, e)
+
+            finally:
+                try:
+                    if client.is_connected:
+                        await client.stop_notify(device.characteristic_uuid)
+                        await client.disconnect()
+                except Exception as e:
+                    logger.debug("Error while disconnecting from %s: %s", device.address, e)
+
+            if self._stopping.is_set():
+                break
+
+            delay = self._backoff_delay(health.consecutive_failures)
+            health.state = "backoff"
+            logger.info("Reconnecting to device %s in %.1f seconds...", device.address, delay)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+        health.state = "stopped"
@@ -1,9 +1,12 @@
 from numba.pycc import CC
 import numpy as np
-from numba import types
+from numba import njit, types
 
 
-cc = CC('calculate_sports_numba')
+# `python calculate_sports_numba.py` builds the kernels ahead of time into
+# the sports_kernels_aot extension; load them through sports_kernels, which
+# falls back to JIT compiling this module when the extension is missing
+cc = CC('sports_kernels_aot')
 
 @cc.export('calculate_speed', '(float64, float64, float64, float64[:], float64, float64, float64, float64, int64)')
 def calculate_speed(initial_ts, reference_ts, prev_ts, max_speed, last_nonzero_speed, threshold, ts, az, status):
@@ -89,8 +92,6 @@ def detect_jump(acc_buffer, ts_buffer, jump_threshold, jump_count, last_jump_tim
                     jump_count += 1
                     last_jump_time = ts_buffer[i]
     
-    print(f"Jump counts from calculate_sports_numba: {jump_count}")
-    
     return jump_count, acc_buffer, ts_buffer, last_jump_time
 
 @cc.export('is_acceleration_phase', (types.float64[:],))
@@ -107,4 +108,223 @@ def is_max_velocity_phase(speed_history):
 def is_deceleration_phase(speed_history):
     return speed_history[-1] <= 1.11 and np.any(speed_history[:-1] > 4)
 
-cc.compile()
\ No newline at end of file
+
+# Stateful O(1) kernels
+#
+# The state of one tag lives in a float64 array of STATE_SIZE (see
+# new_state) plus a ring buffer holding the speed window in tenths, so every
+# update is constant time and a whole batch runs in one compiled call.
+
+S_INITIAL_TS = 0
+S_REFERENCE_TS = 1
+S_PREV_TS = 2
+S_LAST_NONZERO_SPEED = 3
+S_WINDOW_SUM = 4        # sum of the speed window, in tenths (exact)
+S_WINDOW_HEAD = 5
+S_PREV_ACC = 6
+S_CURRENT_ACC = 7
+S_PREV_TIME = 8
+S_CURRENT_TIME = 9
+S_STEP_B_TS = 10
+S_STEP_E_TS = 11
+S_STEP_COUNT = 12
+S_FILTERED = 13         # low-passed magnitude of the newest sample
+S_FILTERED_PREV = 14    # and of the sample before it
+S_TS_LAST = 15          # timestamp of the newest sample
+S_SAMPLES = 16
+S_JUMP_COUNT = 17
+S_LAST_JUMP_TIME = 18
+S_FAST_RUN = 19         # consecutive speeds above 4 m/s
+S_LAST_FAST = 20        # sample index of the last speed above 4 m/s
+STATE_SIZE = 21
+
+PHASE_IDLE = 0
+PHASE_ACCELERATION = 1
+PHASE_MAX_VELOCITY = 2
+PHASE_DECELERATION = 3
+
+
+@njit(cache=True)
+def new_state():
+    """Initial kernel state, matching the initial arguments of the scalar kernels"""
+    state = np.zeros(STATE_SIZE)
+    state[S_REFERENCE_TS] = -1
+    state[S_PREV_TS] = -1
+    state[S_PREV_ACC] = -1
+    state[S_CURRENT_ACC] = -1
+    state[S_STEP_B_TS] = -1
+    state[S_STEP_E_TS] = -1
+    state[S_LAST_FAST] = -1e18
+    return state
+
+
+@njit(cache=True)
+def speed_update(state, window, ts, az, status):
+    """calculate_speed with the window mean kept as a running sum of a ring buffer"""
+    if state[S_INITIAL_TS] == 0:
+        state[S_INITIAL_TS] = ts
+    if state[S_REFERENCE_TS] != -1:
+        state[S_REFERENCE_TS] = ts
+    prev_ts = state[S_PREV_TS]
+    dt = ts - prev_ts if prev_ts != -1 else 0
+    state[S_PREV_TS] = ts
+
+    if az != -1:
+        v_z = az * dt
+    else:
+        v_z = 0
+
+    tenths = float(round(abs(round(v_z, 1)) * 10))
+    head = int(state[S_WINDOW_HEAD])
+    state[S_WINDOW_SUM] += tenths - window[head]
+    window[head] = tenths
+    state[S_WINDOW_HEAD] = (head + 1) % len(window)
+    max_velocity = state[S_WINDOW_SUM] / 10 / len(window)
+
+    if state[S_LAST_NONZERO_SPEED] != -1:
+        state[S_LAST_NONZERO_SPEED] = max_velocity
+
+    if status == 0:
+        state[S_LAST_NONZERO_SPEED] = 0
+    elif max_velocity > 0:
+        state[S_LAST_NONZERO_SPEED] = max_velocity
+    return state[S_LAST_NONZERO_SPEED] * 3.6 * 4.5
+
+
+@njit(cache=True)
+def acceleration_update(state, ax, ay, az, ts):
+    """calculate_acceleration on the state array"""
+    if ax != -1 and ay != -1 and az != -1:
+        state[S_PREV_ACC] = state[S_CURRENT_ACC]
+        state[S_CURRENT_ACC] = (ax**2 + ay**2 + az**2)**0.5 - 9.81
+        state[S_PREV_TIME] = state[S_CURRENT_TIME]
+        if state[S_REFERENCE_TS] != -1:
+            state[S_CURRENT_TIME] = ts - state[S_REFERENCE_TS]
+    else:
+        state[S_PREV_ACC] = 0
+        state[S_CURRENT_ACC] = 0
+        state[S_PREV_TIME] = 0
+        state[S_CURRENT_TIME] = 0
+    return state[S_CURRENT_ACC]
+
+
+@njit(cache=True)
+def step_update(state, threshold, ts, status):
+    """detect_steps on the accelerations held in the state array"""
+    prev_acc = state[S_PREV_ACC]
+    current_acc = state[S_CURRENT_ACC]
+    if prev_acc != -1 and status != 0 and ts != 0:
+        if prev_acc < threshold <= current_acc:
+            state[S_STEP_B_TS] = ts
+        elif prev_acc >= threshold > current_acc:
+            state[S_STEP_E_TS] = ts
+            if state[S_STEP_B_TS] != -1 and state[S_STEP_E_TS] > state[S_STEP_B_TS]:
+                state[S_STEP_COUNT] += 1
+    return int(state[S_STEP_COUNT])
+
+
+@njit(cache=True)
+def jump_update(state, acc, ts, jump_threshold):
+    """
+    detect_jump with the low-pass filter carried between samples.
+
+    A sample is tested as a peak once its right neighbour has arrived, so
+    feeding a recording sample by sample counts the same jumps as one
+    detect_jump call over the whole recording.
+    """
+    alpha = 0.2
+    min_distance = 5
+    n = int(state[S_SAMPLES])
+    if n == 0:
+        filtered = acc
+    else:
+        filtered = alpha * acc + (1 - alpha) * state[S_FILTERED]
+
+    if n >= 2:
+        i = n - 1
+        peak = state[S_FILTERED]
+        if (peak > state[S_FILTERED_PREV] and peak > filtered and peak > jump_threshold
+                and (i == 1 or i - 1 >= min_distance)
+                and (state[S_TS_LAST] - state[S_LAST_JUMP_TIME]) > 0.3):
+            state[S_JUMP_COUNT] += 1
+            state[S_LAST_JUMP_TIME] = state[S_TS_LAST]
+
+    state[S_FILTERED_PREV] = state[S_FILTERED]
+    state[S_FILTERED] = filtered
+    state[S_TS_LAST] = ts
+    state[S_SAMPLES] = n + 1
+    return int(state[S_JUMP_COUNT])
+
+
+@njit(cache=True)
+def phase_update(state, speed, history):
+    """
+    Sprint phase of the newest speed (m/s), as the phase detectors would
+    report it for the last `history` speeds.
+
+    Returns PHASE_MAX_VELOCITY, PHASE_DECELERATION, PHASE_ACCELERATION or
+    PHASE_IDLE, checked in that order.
+    """
+    n = state[S_SAMPLES]
+    recent_fast = state[S_LAST_FAST] >= n - history + 1
+    if speed > 4:
+        state[S_FAST_RUN] += 1
+        state[S_LAST_FAST] = n
+    else:
+        state[S_FAST_RUN] = 0
+
+    if history >= 10 and state[S_FAST_RUN] >= 10:
+        return PHASE_MAX_VELOCITY
+    if speed <= 1.11 and recent_fast:
+        return PHASE_DECELERATION
+    if speed > 1.11:
+        return PHASE_ACCELERATION
+    return PHASE_IDLE
+
+
+@cc.export('process_samples',
+           'Tuple((f8[:], i8[:], i8[:], i8[:]))(f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], i8[:], f8, f8, i8)')
+def process_samples(state, window, ts, ax, ay, az, status, step_threshold, jump_threshold, history):
+    """
+    Run a batch of samples through speed, step, jump and phase detection.
+
+    Args:
+        state: Kernel state from new_state, updated in place
+        window: Speed window ring buffer (zeros of the window length), updated in place
+        ts: Timestamps in seconds
+        ax, ay, az: Accelerations
+        status: Activity status per sample
+        step_threshold, jump_threshold: Detection thresholds
+        history: Number of speeds the phase detectors look back over
+
+    Returns:
+        tuple: (speeds, step counts, jump counts, phases), one value per
+            sample; the counts are running totals
+    """
+    n = len(ts)
+    speeds = np.empty(n)
+    steps = np.empty(n, dtype=np.int64)
+    jumps = np.empty(n, dtype=np.int64)
+    phases = np.empty(n, dtype=np.int64)
+    for k in range(n):
+        speed = speed_update(state, window, ts[k], az[k], status[k])
+        acc = acceleration_update(state, ax[k], ay[k], az[k], ts[k])
+        steps[k] = step_update(state, step_threshold, ts[k], status[k])
+        # The phase looks at the sample index before jump_update advances it
+        phases[k] = phase_update(state, speed / 3.6, history)
+        jumps[k] = jump_update(state, acc, ts[k], jump_threshold)
+        speeds[k] = speed
+    return speeds, steps, jumps, phases
+
+
+for _name, _kernel, _signature in (
+        ('new_state', new_state, 'f8[:]()'),
+        ('speed_update', speed_update, 'f8(f8[:], f8[:], f8, f8, i8)'),
+        ('acceleration_update', acceleration_update, 'f8(f8[:], f8, f8, f8, f8)'),
+        ('step_update', step_update, 'i8(f8[:], f8, f8, i8)'),
+        ('jump_update', jump_update, 'i8(f8[:], f8, f8, f8)'),
+        ('phase_update', phase_update, 'i8(f8[:], f8, i8)')):
+    cc.export(_name, _signature)(_kernel.py_func)
+
+if __name__ == '__main__':
+    cc.compile()
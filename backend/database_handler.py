@@ -1,14 +1,77 @@
 import mysql.connector
 from mysql.connector import pooling
 import logging
+import numpy as np
+import threading
 import time
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+
+from analytics_cache import IMMUTABLE_AFTER_SECONDS
+from archive import ARCHIVE_COLUMNS, DAY_MICROS, TrackingArchive, run_retention
+from metrics import REGISTRY
 
 logger = logging.getLogger(__name__)
 
+POOL_WAIT_SECONDS = REGISTRY.histogram(
+    'db_pool_wait_seconds', 'Time to check a connection out of the MySQL pool')
+POOL_EXHAUSTED = REGISTRY.counter(
+    'db_pool_exhausted_total', 'Connection requests refused because every pooled connection was in use')
+POOL_IDLE = REGISTRY.gauge('db_pool_idle_connections', 'Connections waiting in the MySQL pool')
+
+ROLLUP_TABLES = ('player_tracking_1s', 'player_tracking_1m')
+
+# Columns returned by get_player_columns and their array types
+PLAYER_COLUMNS = (
+    ('timestamp_micros', np.int64),
+    ('x_position', np.float32),
+    ('y_position', np.float32),
+    ('accel_x', np.float32),
+    ('accel_y', np.float32),
+    ('accel_z', np.float32),
+    ('heart_rate', np.float32),
+)
+
+# Nominal tag sample period, used to size the column arrays up front
+SAMPLE_PERIOD_MICROS = 20_000
+
+TRACKING_INSERT_QUERY = """
+INSERT INTO player_tracking_data 
+(player_id, tag_id, timestamp_micros,
+ x_position, y_position, 
+ accel_x, accel_y, accel_z, 
+ gyro_x, gyro_y, gyro_z, 
+ battery_life, heart_rate, serial_number, activity_status)
+VALUES 
+(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+class _CheckedOutConnection:
+    """
+    A pooled connection that calls `on_close` once when it goes back to the pool
+
+    Everything else is delegated to the PooledMySQLConnection.
+    """
+
+    def __init__(self, connection, on_close):
+        self._connection = connection
+        self._on_close = on_close
+
+    def close(self) -> None:
+        if self._on_close is None:
+            return
+        on_close, self._on_close = self._on_close, None
+        try:
+            self._connection.close()
+        finally:
+            on_close()
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
 class DatabaseHandler:
-    def __init__(self):
+    def __init__(self, archive_dir: Optional[str] = None):
         self.db_config = {
             "pool_name": "mypool",
             "pool_size": 5,
@@ -26,6 +89,43 @@ class DatabaseHandler:
             logger.error(f"Error creating connection pool: {err}")
             raise
 
+        # Connections handed out by get_connection() and not closed yet
+        self._checked_out = 0
+        self._checked_out_lock = threading.Lock()
+        POOL_IDLE.set_function(lambda: self.connection_pool.pool_size - self._checked_out)
+
+        # Last committed player/tag/assignment state per tag_id, so the
+        # assignment upserts only run when the mapping or player metadata changes
+        self._assignment_cache: Dict[str, tuple] = {}
+        self._assignment_lock = threading.Lock()
+
+        # Rows older than the archive's boundary live in Parquet, see archive.py
+        self.archive = TrackingArchive(archive_dir) if archive_dir else None
+
+    def get_connection(self):
+        """
+        Check a connection out of the pool, recording how long that took
+        
+        Returns:
+            PooledMySQLConnection: Returned to the pool by close(), which also
+                takes it off the checked-out count
+        """
+        started = time.perf_counter()
+        try:
+            connection = self.connection_pool.get_connection()
+        except mysql.connector.errors.PoolError:
+            POOL_EXHAUSTED.inc()
+            raise
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+        with self._checked_out_lock:
+            self._checked_out += 1
+        return _CheckedOutConnection(connection, self._check_in)
+
+    def _check_in(self) -> None:
+        with self._checked_out_lock:
+            self._checked_out -= 1
+
     def get_current_epoch_micros(self) -> int:
         """Get current timestamp in microseconds"""
         return int(time.time() * 1_000_000)
@@ -43,7 +143,7 @@ class DatabaseHandler:
         connection = None
         cursor = None
         try:
-            connection = self.connection_pool.get_connection()
+            connection = self.get_connection()
             cursor = connection.cursor()
             
             # Extract player ID and verify it exists
@@ -52,55 +152,267 @@ class DatabaseHandler:
                 logger.error("Missing player ID in tracking data")
                 return False
             
-            current_time_micros = self.get_current_epoch_micros()
+            # Samples queued by the batched writer carry their receive time
+            timestamp_micros = tracking_data.get('timestamp_micros') or self.get_current_epoch_micros()
             
             # Update tag assignment first with full tracking data
-            self._update_tag_assignment(cursor, player_id, tracking_data['tag_id'], tracking_data)
+            assignment = self._sync_tag_assignment(cursor, player_id, tracking_data['tag_id'], tracking_data)
             
             # Insert tracking data
-            tracking_query = """
-            INSERT INTO player_tracking_data 
-            (player_id, tag_id, timestamp_micros,
-             x_position, y_position, 
-             accel_x, accel_y, accel_z, 
-             gyro_x, gyro_y, gyro_z, 
-             battery_life, heart_rate, serial_number, activity_status)
-            VALUES 
-            (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            tracking_values = (
-                player_id,
-                tracking_data['tag_id'],
-                current_time_micros,
-                tracking_data['x_position'],
-                tracking_data['y_position'],
-                tracking_data['accelerometer']['x'],
-                tracking_data['accelerometer']['y'],
-                tracking_data['accelerometer']['z'],
-                tracking_data['gyroscope']['x'],
-                tracking_data['gyroscope']['y'],
-                tracking_data['gyroscope']['z'],
-                tracking_data['battery_life'],
-                tracking_data['heart_rate'],
-                tracking_data['serial_number'],
-                tracking_data['activity_status']
-            )
-            
-            cursor.execute(tracking_query, tracking_values)
+            cursor.execute(TRACKING_INSERT_QUERY, self.tracking_values(player_id, timestamp_micros, tracking_data))
             connection.commit()
+            if assignment:
+                self._remember_assignments({tracking_data['tag_id']: assignment})
             
             logger.debug(f"Successfully inserted tracking data for player {player_id}")
             return True
             
         except mysql.connector.Error as err:
             logger.error(f"Database error while inserting tracking data: {err}")
+            self.invalidate_assignment_cache(tracking_data.get('tag_id'))
             if connection:
                 connection.rollback()
             return False
             
         except Exception as e:
             logger.error(f"Unexpected error while inserting tracking data: {e}")
+            self.invalidate_assignment_cache(tracking_data.get('tag_id'))
+            if connection:
+                connection.rollback()
+            return False
+            
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    def insert_tracking_batch(self, samples: List[Dict[str, Any]]) -> bool:
+        """
+        Insert a batch of player tracking samples in a single transaction
+        
+        Args:
+            samples (list): Decoded sensor samples, each shaped like the
+                payload accepted by insert_tracking_data
+            
+        Returns:
+            bool: True if the whole batch was committed, False otherwise;
+                nothing is written when a sample has no player
+        """
+        missing = sum(1 for tracking_data in samples if not tracking_data.get('player', {}).get('_id'))
+        if missing:
+            logger.error(f"Missing player ID in {missing} of {len(samples)} samples, rejecting the batch")
+            return False
+        
+        latest_by_tag = {}
+        rows = []
+        for tracking_data in samples:
+            player_id = tracking_data['player']['_id']
+            timestamp_micros = tracking_data.get('timestamp_micros') or self.get_current_epoch_micros()
+            rows.append(self.tracking_values(player_id, timestamp_micros, tracking_data))
+            latest_by_tag[tracking_data['tag_id']] = (player_id, tracking_data)
+        
+        if not rows:
+            return False
+        return self.insert_tracking_rows(rows, latest_by_tag)
+
+    def insert_tracking_rows(self, rows: List[tuple], assignments: Dict[str, Tuple[str, Dict[str, Any]]],
+                             rollups: Optional[Dict[str, List[tuple]]] = None,
+                             sessions: Optional[Dict[str, List[tuple]]] = None,
+                             spool_position: Optional[Tuple[str, int, int]] = None) -> bool:
+        """
+        Insert prepared player_tracking_data rows in a single transaction
+        
+        Tag assignments are refreshed once per tag, the rows are written
+        with one multi-row INSERT, and rollup and session rows are merged
+        in the same transaction. With a spool position the rows commit
+        together with the position they were loaded up to, so a spool
+        drainer never loads a frame twice. Players with rows older than
+        IMMUTABLE_AFTER_SECONDS get their data revision bumped, so cached
+        analytics of finished windows are recomputed.
+        
+        Args:
+            rows (list): Row tuples in TRACKING_INSERT_QUERY column order
+            assignments (dict): tag_id -> (player_id, tracking_data) holding the
+                most recent player info and serial number seen for each tag
+            rollups (dict, optional): Rollup table -> rows in rollups.ROLLUP_COLUMNS order
+            sessions (dict, optional): Summary and session rows from sessions.SessionTracker
+            spool_position (tuple, optional): (spool name, segment, record) loaded up to
+            
+        Returns:
+            bool: True if the whole batch was committed, False otherwise
+        """
+        connection = None
+        cursor = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            
+            changed_assignments = {}
+            for tag_id, (player_id, tracking_data) in assignments.items():
+                assignment = self._sync_tag_assignment(cursor, player_id, tag_id, tracking_data)
+                if assignment:
+                    changed_assignments[tag_id] = assignment
+            
+            if rows:
+                cursor.executemany(TRACKING_INSERT_QUERY, rows)
+                late_before = self.get_current_epoch_micros() - IMMUTABLE_AFTER_SECONDS * 1_000_000
+                self._bump_data_revisions(cursor, {row[0] for row in rows if row[2] < late_before})
+            if rollups:
+                self._upsert_rollups(cursor, rollups)
+            if sessions:
+                self._upsert_sessions(cursor, sessions)
+            if spool_position:
+                cursor.execute("""
+                    INSERT INTO spool_positions (spool_name, segment, record)
+                    VALUES (%s, %s, %s)
+                    ON DUPLICATE KEY UPDATE segment = VALUES(segment), record = VALUES(record)
+                """, spool_position)
+            connection.commit()
+            self._remember_assignments(changed_assignments)
+            
+            logger.debug(f"Successfully inserted batch of {len(rows)} tracking samples")
+            return True
+            
+        except mysql.connector.Error as err:
+            logger.error(f"Database error while inserting tracking batch: {err}")
+            for tag_id in assignments:
+                self.invalidate_assignment_cache(tag_id)
+            if connection:
+                connection.rollback()
+            return False
+            
+        except Exception as e:
+            logger.error(f"Unexpected error while inserting tracking batch: {e}")
+            for tag_id in assignments:
+                self.invalidate_assignment_cache(tag_id)
+            if connection:
+                connection.rollback()
+            return False
+            
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    def upsert_rollups(self, rollups: Dict[str, List[tuple]]) -> bool:
+        """
+        Merge rollup rows into their buckets
+        
+        Args:
+            rollups (dict): Rollup table -> rows in rollups.ROLLUP_COLUMNS order
+            
+        Returns:
+            bool: True if the rows were committed, False otherwise
+        """
+        connection = None
+        cursor = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            self._upsert_rollups(cursor, rollups)
+            connection.commit()
+            return True
+            
+        except mysql.connector.Error as err:
+            logger.error(f"Database error while writing rollups: {err}")
+            if connection:
+                connection.rollback()
+            return False
+            
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    def _upsert_rollups(self, cursor, rollups: Dict[str, List[tuple]]) -> None:
+        """Merge rollup rows on an open cursor: sums and counts add, min/max combine"""
+        for table, rows in rollups.items():
+            if table not in ROLLUP_TABLES:
+                raise ValueError(f"Unknown rollup table {table}")
+            if not rows:
+                continue
+            cursor.executemany(f"""
+                INSERT INTO {table}
+                (player_id, bucket_micros, sample_count,
+                 accel_mag_min, accel_mag_max, accel_mag_sum,
+                 distance, speed_sum, peak_speed,
+                 step_count, jump_count,
+                 heart_rate_sum, heart_rate_count)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                sample_count = sample_count + VALUES(sample_count),
+                accel_mag_min = LEAST(COALESCE(accel_mag_min, VALUES(accel_mag_min)),
+                                      COALESCE(VALUES(accel_mag_min), accel_mag_min)),
+                accel_mag_max = GREATEST(COALESCE(accel_mag_max, VALUES(accel_mag_max)),
+                                         COALESCE(VALUES(accel_mag_max), accel_mag_max)),
+                accel_mag_sum = accel_mag_sum + VALUES(accel_mag_sum),
+                distance = distance + VALUES(distance),
+                speed_sum = speed_sum + VALUES(speed_sum),
+                peak_speed = GREATEST(COALESCE(peak_speed, VALUES(peak_speed)),
+                                      COALESCE(VALUES(peak_speed), peak_speed)),
+                step_count = step_count + VALUES(step_count),
+                jump_count = jump_count + VALUES(jump_count),
+                heart_rate_sum = heart_rate_sum + VALUES(heart_rate_sum),
+                heart_rate_count = heart_rate_count + VALUES(heart_rate_count)
+            """, rows)
+
+    def get_rollups(self, player_id: str, start_time: int, end_time: int,
+                    table: str = 'player_tracking_1s') -> List[Dict[str, Any]]:
+        """
+        Retrieve rollup buckets of a player for a time range
+        
+        Args:
+            player_id (str): Player's unique identifier
+            start_time (int): Start time in epoch microseconds
+            end_time (int): End time in epoch microseconds
+            table (str): One of rollups.ROLLUP_TABLES
+            
+        Returns:
+            list: Rollup rows ordered by bucket
+        """
+        if table not in ROLLUP_TABLES:
+            raise ValueError(f"Unknown rollup table {table}")
+        connection = self.get_connection()
+        cursor = connection.cursor(dictionary=True)
+        
+        cursor.execute(f"""
+            SELECT bucket_micros, sample_count,
+                   accel_mag_min, accel_mag_max, accel_mag_sum,
+                   distance, speed_sum, peak_speed,
+                   step_count, jump_count,
+                   heart_rate_sum, heart_rate_count
+            FROM {table}
+            WHERE player_id = %s
+            AND bucket_micros BETWEEN %s AND %s
+            ORDER BY bucket_micros
+        """, (player_id, start_time, end_time))
+        
+        data = cursor.fetchall()
+        cursor.close()
+        connection.close()
+        return data
+
+    def delete_rollups(self, player_id: str, start_time: int, end_time: int) -> bool:
+        """Delete every rollup bucket of a player in [start_time, end_time)"""
+        connection = None
+        cursor = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            for table in ROLLUP_TABLES:
+                cursor.execute(f"""
+                    DELETE FROM {table}
+                    WHERE player_id = %s
+                    AND bucket_micros >= %s AND bucket_micros < %s
+                """, (player_id, start_time, end_time))
+            connection.commit()
+            return True
+            
+        except mysql.connector.Error as err:
+            logger.error(f"Error deleting rollups: {err}")
             if connection:
                 connection.rollback()
             return False
@@ -111,6 +423,335 @@ class DatabaseHandler:
             if connection:
                 connection.close()
 
+    def get_spool_position(self, spool_name: str) -> Optional[Tuple[int, int]]:
+        """
+        Position a spool has been loaded up to
+        
+        Args:
+            spool_name (str): Name the drainer commits its position under
+            
+        Returns:
+            tuple: (segment, record), None if nothing was loaded yet
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        
+        cursor.execute("SELECT segment, record FROM spool_positions WHERE spool_name = %s", (spool_name,))
+        row = cursor.fetchone()
+        
+        cursor.close()
+        connection.close()
+        return (int(row[0]), int(row[1])) if row else None
+
+    def upsert_sessions(self, sessions: Dict[str, List[tuple]]) -> bool:
+        """
+        Merge summary and session rows
+        
+        Args:
+            sessions (dict): Rows from sessions.SessionTracker
+            
+        Returns:
+            bool: True if the rows were committed, False otherwise
+        """
+        connection = None
+        cursor = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            self._upsert_sessions(cursor, sessions)
+            connection.commit()
+            return True
+            
+        except mysql.connector.Error as err:
+            logger.error(f"Database error while writing sessions: {err}")
+            if connection:
+                connection.rollback()
+            return False
+            
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    def _upsert_sessions(self, cursor, sessions: Dict[str, List[tuple]]) -> None:
+        """Merge summary and session rows on an open cursor: counts add, bounds widen"""
+        if sessions.get('player_tracking_summary'):
+            cursor.executemany("""
+                INSERT INTO player_tracking_summary
+                (player_id, first_micros, last_micros, sample_count)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                first_micros = LEAST(first_micros, VALUES(first_micros)),
+                last_micros = GREATEST(last_micros, VALUES(last_micros)),
+                sample_count = sample_count + VALUES(sample_count)
+            """, sessions['player_tracking_summary'])
+        if sessions.get('player_sessions'):
+            cursor.executemany("""
+                INSERT INTO player_sessions
+                (player_id, start_micros, end_micros, sample_count)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                end_micros = GREATEST(end_micros, VALUES(end_micros)),
+                sample_count = sample_count + VALUES(sample_count)
+            """, sessions['player_sessions'])
+
+    def bump_data_revisions(self, player_ids) -> bool:
+        """
+        Mark the past data of players as changed
+        
+        Args:
+            player_ids (iterable): Players whose rows changed, '' for every player
+            
+        Returns:
+            bool: True if the revisions were committed, False otherwise
+        """
+        connection = None
+        cursor = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            self._bump_data_revisions(cursor, set(player_ids))
+            connection.commit()
+            return True
+            
+        except mysql.connector.Error as err:
+            logger.error(f"Database error while bumping data revisions: {err}")
+            if connection:
+                connection.rollback()
+            return False
+            
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    def _bump_data_revisions(self, cursor, player_ids) -> None:
+        if player_ids:
+            cursor.executemany("""
+                INSERT INTO player_data_revisions (player_id, revision)
+                VALUES (%s, 1)
+                ON DUPLICATE KEY UPDATE revision = revision + 1
+            """, [(player_id,) for player_id in sorted(player_ids)])
+
+    def get_data_revision(self, player_id: str) -> Optional[int]:
+        """
+        Revision of a player's past data, including changes to every player
+        
+        Returns:
+            int: Revision, 0 if never changed; None on error
+        """
+        connection = None
+        cursor = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            cursor.execute("""
+                SELECT COALESCE(SUM(revision), 0)
+                FROM player_data_revisions
+                WHERE player_id IN (%s, '')
+            """, (player_id,))
+            return int(cursor.fetchone()[0])
+            
+        except mysql.connector.Error as err:
+            logger.error(f"Error retrieving data revision: {err}")
+            return None
+            
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    def get_player_summaries(self, player_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        First and last timestamps and sample counts from player_tracking_summary
+        
+        Args:
+            player_id (str, optional): Only this player, every player by default
+            
+        Returns:
+            list: Rows with player_id, start_time, end_time and sample_count
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor(dictionary=True)
+        
+        query = """
+            SELECT player_id, first_micros AS start_time, last_micros AS end_time, sample_count
+            FROM player_tracking_summary
+        """
+        if player_id is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query + " WHERE player_id = %s", (player_id,))
+        
+        data = cursor.fetchall()
+        cursor.close()
+        connection.close()
+        return data
+
+    def get_player_sessions(self, player_id: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Sessions of a player, newest first
+        
+        Args:
+            player_id (str): Player's unique identifier
+            limit (int): Most sessions returned
+            
+        Returns:
+            list: Rows with start_time, end_time and sample_count
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor(dictionary=True)
+        
+        cursor.execute("""
+            SELECT start_micros AS start_time, end_micros AS end_time, sample_count
+            FROM player_sessions
+            WHERE player_id = %s
+            ORDER BY start_micros DESC
+            LIMIT %s
+        """, (player_id, limit))
+        
+        data = cursor.fetchall()
+        cursor.close()
+        connection.close()
+        return data
+
+    def get_latest_session(self, player_id: str) -> Optional[Tuple[int, int]]:
+        """(start_micros, end_micros) of a player's newest session, None if there is none"""
+        sessions = self.get_player_sessions(player_id, limit=1)
+        if not sessions:
+            return None
+        return int(sessions[0]['start_time']), int(sessions[0]['end_time'])
+
+    def delete_sessions(self, player_id: str) -> bool:
+        """Delete the summary and every session of a player"""
+        connection = None
+        cursor = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            cursor.execute("DELETE FROM player_sessions WHERE player_id = %s", (player_id,))
+            cursor.execute("DELETE FROM player_tracking_summary WHERE player_id = %s", (player_id,))
+            connection.commit()
+            return True
+            
+        except mysql.connector.Error as err:
+            logger.error(f"Error deleting sessions: {err}")
+            if connection:
+                connection.rollback()
+            return False
+            
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    @staticmethod
+    def tracking_rows_from_columns(player_id: str, tag_id: str, columns: Dict[str, Any]) -> List[tuple]:
+        """
+        Build player_tracking_data rows from a decoded column batch
+        
+        Args:
+            player_id (str): Player the tag is assigned to
+            tag_id (str): Tag that produced the frames
+            columns (dict): Column arrays as produced by frame_decoder.frames_to_columns
+            
+        Returns:
+            list: Row tuples in TRACKING_INSERT_QUERY column order
+        """
+        n = len(columns['timestamp_micros'])
+        return list(zip(
+            [player_id] * n,
+            [tag_id] * n,
+            columns['timestamp_micros'].tolist(),
+            columns['x_position'].tolist(),
+            columns['y_position'].tolist(),
+            columns['accel_x'].tolist(),
+            columns['accel_y'].tolist(),
+            columns['accel_z'].tolist(),
+            columns['gyro_x'].tolist(),
+            columns['gyro_y'].tolist(),
+            columns['gyro_z'].tolist(),
+            columns['battery_life'].tolist(),
+            columns['heart_rate'].tolist(),
+            columns['serial_number'].tolist(),
+            columns['activity_status'].tolist()
+        ))
+
+    @staticmethod
+    def tracking_values(player_id: str, timestamp_micros: int, tracking_data: Dict[str, Any]) -> tuple:
+        """Build the player_tracking_data row for one decoded sample"""
+        return (
+            player_id,
+            tracking_data['tag_id'],
+            timestamp_micros,
+            tracking_data['x_position'],
+            tracking_data['y_position'],
+            tracking_data['accelerometer']['x'],
+            tracking_data['accelerometer']['y'],
+            tracking_data['accelerometer']['z'],
+            tracking_data['gyroscope']['x'],
+            tracking_data['gyroscope']['y'],
+            tracking_data['gyroscope']['z'],
+            tracking_data['battery_life'],
+            tracking_data['heart_rate'],
+            tracking_data['serial_number'],
+            tracking_data['activity_status']
+        )
+
+    def invalidate_assignment_cache(self, tag_id: Optional[str] = None) -> None:
+        """
+        Forget the cached assignment state so the next sample rewrites it
+        
+        Args:
+            tag_id (str, optional): Tag to forget, or every tag if omitted
+        """
+        with self._assignment_lock:
+            if tag_id is None:
+                self._assignment_cache.clear()
+            else:
+                self._assignment_cache.pop(tag_id, None)
+
+    def _remember_assignments(self, assignments: Dict[str, tuple]) -> None:
+        """Record assignment state that has been committed"""
+        if not assignments:
+            return
+        with self._assignment_lock:
+            self._assignment_cache.update(assignments)
+
+    @staticmethod
+    def _assignment_state(player_id: str, tracking_data: Dict[str, Any]) -> tuple:
+        """Everything _update_tag_assignment writes for a tag, as a comparable tuple"""
+        player_info = tracking_data.get('player', {})
+        return (
+            player_id,
+            player_info.get('name'),
+            player_info.get('initials'),
+            player_info.get('height'),
+            player_info.get('weight'),
+            player_info.get('teamid'),
+            player_info.get('teamName'),
+            tracking_data.get('serial_number')
+        )
+
+    def _sync_tag_assignment(self, cursor, player_id: str, tag_id: str, tracking_data: Dict[str, Any]) -> Optional[tuple]:
+        """
+        Update the tag assignment only if it differs from the cached state
+        
+        Returns:
+            Optional[tuple]: The new state to remember once the transaction
+                commits, or None if nothing had to be written
+        """
+        state = self._assignment_state(player_id, tracking_data)
+        with self._assignment_lock:
+            if self._assignment_cache.get(tag_id) == state:
+                return None
+        self._update_tag_assignment(cursor, player_id, tag_id, tracking_data)
+        return state
+
     def _update_tag_assignment(self, cursor, player_id: str, tag_id: str, tracking_data: Dict[str, Any]) -> None:
         """Update tag assignment record and related player/tag data"""
         try:
@@ -182,6 +823,10 @@ class DatabaseHandler:
         """
         Retrieve player tracking data for a specific time range
         
+        The part of the range before the archive boundary is read from the
+        archive, together with rows that reached MySQL after their day was
+        archived, the rest from MySQL.
+        
         Args:
             player_id (str): Player's unique identifier
             start_time (int): Start time in epoch microseconds
@@ -190,29 +835,309 @@ class DatabaseHandler:
         Returns:
             list: List of tracking data records
         """
-        connection = self.connection_pool.get_connection()
+        archived, live = self._split_at_archive(start_time, end_time)
+        data = []
+        connection = self.get_connection()
         cursor = connection.cursor(dictionary=True)
+        try:
+            if archived:
+                table = self.archive.read_table(player_id, *archived, [name for name, _ in PLAYER_COLUMNS])
+                if table is not None:
+                    data = table.to_pylist()
+                exclude, exclude_params = self._exported_filter(player_id)
+                cursor.execute(f"""
+                    SELECT timestamp_micros, x_position, y_position, 
+                           accel_x, accel_y, accel_z, heart_rate
+                    FROM player_tracking_data
+                    WHERE player_id = %s 
+                    AND timestamp_micros BETWEEN %s AND %s{exclude}
+                    ORDER BY timestamp_micros
+                """, (player_id, *archived, *exclude_params))
+                late = cursor.fetchall()
+                if late:
+                    data = sorted(data + late, key=lambda row: row['timestamp_micros'])
+            if live:
+                cursor.execute("""
+                    SELECT timestamp_micros, x_position, y_position, 
+                           accel_x, accel_y, accel_z, heart_rate
+                    FROM player_tracking_data
+                    WHERE player_id = %s 
+                    AND timestamp_micros BETWEEN %s AND %s
+                    ORDER BY timestamp_micros
+                """, (player_id, *live))
+                data.extend(cursor.fetchall())
+        finally:
+            cursor.close()
+            connection.close()
+        return data
+
+    def get_player_columns(self, player_id: str, start_time: int, end_time: int,
+                           chunk_size: int = 50_000) -> Dict[str, np.ndarray]:
+        """
+        Retrieve player tracking data for a time range as typed column arrays
         
-        cursor.execute("""
-            SELECT timestamp_micros, x_position, y_position, 
-                   accel_x, accel_y, accel_z
+        Rows are streamed in fetchmany chunks straight into preallocated
+        arrays, so no per-row dicts are built. The part of the range before
+        the archive boundary is read from the archive, with late rows still
+        in MySQL merged in.
+        
+        Args:
+            player_id (str): Player's unique identifier
+            start_time (int): Start time in epoch microseconds
+            end_time (int): End time in epoch microseconds
+            chunk_size (int): Rows fetched per round trip
+            
+        Returns:
+            dict: Column name -> array for every entry of PLAYER_COLUMNS
+                (int64 timestamps, float32 sensors), ordered by timestamp
+        """
+        archived, live = self._split_at_archive(start_time, end_time)
+        parts = []
+        if archived:
+            parts.append(self._archive_columns(player_id, *archived))
+        if live:
+            capacity = int(min(max((live[1] - live[0]) // SAMPLE_PERIOD_MICROS + 1, chunk_size), 1 << 22))
+            parts.append(self._fetch_columns("""
+                SELECT timestamp_micros,
+                       COALESCE(x_position, 0), COALESCE(y_position, 0),
+                       COALESCE(accel_x, 0), COALESCE(accel_y, 0), COALESCE(accel_z, 0),
+                       COALESCE(heart_rate, 0)
+                FROM player_tracking_data
+                WHERE player_id = %s 
+                AND timestamp_micros BETWEEN %s AND %s
+                ORDER BY timestamp_micros, id
+            """, (player_id, *live), PLAYER_COLUMNS, capacity, chunk_size))
+        return self._concat_columns(parts)
+
+    def get_team_columns(self, player_ids: List[str], start_time: int, end_time: int,
+                         chunk_size: int = 50_000) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Retrieve the tracking data of several players for a time range in one query
+        
+        Rows come back ordered by player and time, read the same way as
+        get_player_columns, and are split into per-player column arrays at
+        the boundaries of the player index column.
+        
+        Args:
+            player_ids (list): Players' unique identifiers
+            start_time (int): Start time in epoch microseconds
+            end_time (int): End time in epoch microseconds
+            chunk_size (int): Rows fetched per round trip
+            
+        Returns:
+            dict: player_id -> columns as returned by get_player_columns, for
+                the players with data in the range (archived rows included)
+        """
+        if not player_ids:
+            return {}
+        archived, live = self._split_at_archive(start_time, end_time)
+        team = {}
+        if archived:
+            for player_id in player_ids:
+                columns = self._archive_columns(player_id, *archived)
+                if len(columns['timestamp_micros']):
+                    team[player_id] = columns
+        if not live:
+            return team
+        start_time, end_time = live
+        
+        placeholders = ', '.join(['%s'] * len(player_ids))
+        per_player = (end_time - start_time) // SAMPLE_PERIOD_MICROS + 1
+        capacity = int(min(max(per_player * len(player_ids), chunk_size), 1 << 24))
+        columns = self._fetch_columns(f"""
+            SELECT FIELD(player_id, {placeholders}) - 1, timestamp_micros,
+                   COALESCE(x_position, 0), COALESCE(y_position, 0),
+                   COALESCE(accel_x, 0), COALESCE(accel_y, 0), COALESCE(accel_z, 0),
+                   COALESCE(heart_rate, 0)
             FROM player_tracking_data
-            WHERE player_id = %s 
+            WHERE player_id IN ({placeholders})
             AND timestamp_micros BETWEEN %s AND %s
-            ORDER BY timestamp_micros
-        """, (player_id, start_time, end_time))
+            ORDER BY player_id, timestamp_micros, id
+        """, (*player_ids, *player_ids, start_time, end_time),
+            (('player_index', np.int64),) + PLAYER_COLUMNS, capacity, chunk_size)
         
-        data = cursor.fetchall()
-        cursor.close()
-        connection.close()
-        return data
+        index = columns.pop('player_index')
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(index)) + 1)).tolist()
+        ends = starts[1:] + [len(index)]
+        for start, end in zip(starts, ends):
+            if end > start:
+                player_id = player_ids[index[start]]
+                live_columns = {name: values[start:end] for name, values in columns.items()}
+                team[player_id] = (self._concat_columns([team[player_id], live_columns])
+                                   if player_id in team else live_columns)
+        return team
+
+    def _fetch_columns(self, query: str, params: tuple, spec: Tuple[Tuple[str, Any], ...],
+                       capacity: int, chunk_size: int) -> Dict[str, np.ndarray]:
+        """
+        Run a numeric query and read its rows into one typed array per column
+        
+        Rows are streamed from an unbuffered cursor in fetchmany chunks and
+        copied straight into preallocated arrays (grown by doubling), so no
+        per-row dicts are built.
+        
+        Args:
+            query (str): SELECT returning one numeric column per entry of spec
+            params (tuple): Query parameters
+            spec (tuple): (column name, dtype) pairs in SELECT order
+            capacity (int): Expected number of rows
+            chunk_size (int): Rows fetched per round trip
+            
+        Returns:
+            dict: Column name -> array
+        """
+        columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in spec}
+        count = 0
+        
+        connection = self.get_connection()
+        cursor = connection.cursor(buffered=False)
+        try:
+            cursor.execute(query, params)
+            
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                # float64 holds epoch microseconds exactly (< 2**53)
+                chunk = np.array(rows, dtype=np.float64)
+                n = len(chunk)
+                if count + n > capacity:
+                    capacity = max(capacity * 2, count + n)
+                    for name, _ in spec:
+                        grown = np.empty(capacity, dtype=columns[name].dtype)
+                        grown[:count] = columns[name][:count]
+                        columns[name] = grown
+                for i, (name, _) in enumerate(spec):
+                    columns[name][count:count + n] = chunk[:, i]
+                count += n
+        finally:
+            cursor.close()
+            connection.close()
+        
+        return {name: values[:count].copy() if count < len(values) // 2 else values[:count]
+                for name, values in columns.items()}
+
+    def iter_player_columns(self, player_id: str, start_time: int, end_time: int,
+                            chunk_size: int = 50_000) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Stream player tracking data for a time range as consecutive column chunks
+        
+        Each chunk is its own keyset query on the clustered key, continuing
+        after the last (timestamp_micros, id) of the previous one, so no
+        connection is held between chunks however slowly they are consumed.
+        Rows come in the same order as get_player_columns. Archived rows
+        come first, read one day at a time.
+        
+        Args:
+            player_id (str): Player's unique identifier
+            start_time (int): Start time in epoch microseconds
+            end_time (int): End time in epoch microseconds
+            chunk_size (int): Rows per chunk
+            
+        Yields:
+            dict: Column name -> array for every entry of PLAYER_COLUMNS
+        """
+        archived, live = self._split_at_archive(start_time, end_time)
+        if archived:
+            day = archived[0] - archived[0] % DAY_MICROS
+            while day <= archived[1]:
+                columns = self._archive_columns(player_id, max(day, archived[0]),
+                                                min(day + DAY_MICROS - 1, archived[1]))
+                for offset in range(0, len(columns['timestamp_micros']), chunk_size):
+                    yield {name: values[offset:offset + chunk_size] for name, values in columns.items()}
+                day += DAY_MICROS
+        if not live:
+            return
+        
+        last_ts, last_id = live[0], -1
+        while True:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            try:
+                cursor.execute("""
+                    SELECT id, timestamp_micros,
+                           COALESCE(x_position, 0), COALESCE(y_position, 0),
+                           COALESCE(accel_x, 0), COALESCE(accel_y, 0), COALESCE(accel_z, 0),
+                           COALESCE(heart_rate, 0)
+                    FROM player_tracking_data
+                    WHERE player_id = %s
+                    AND timestamp_micros BETWEEN %s AND %s
+                    AND (timestamp_micros > %s OR (timestamp_micros = %s AND id > %s))
+                    ORDER BY timestamp_micros, id
+                    LIMIT %s
+                """, (player_id, last_ts, end_time, last_ts, last_ts, last_id, chunk_size))
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+                connection.close()
+            
+            if not rows:
+                return
+            chunk = np.array(rows, dtype=np.float64)
+            columns = {name: chunk[:, i + 1].astype(dtype) for i, (name, dtype) in enumerate(PLAYER_COLUMNS)}
+            yield columns
+            if len(rows) < chunk_size:
+                return
+            last_id, last_ts = rows[-1][0], rows[-1][1]
+
+    def _split_at_archive(self, start_time: int, end_time: int) -> Tuple[Optional[Tuple[int, int]], Optional[Tuple[int, int]]]:
+        """(archived, live) sub-ranges of a time range, None where a part is empty"""
+        boundary = self.archive.archived_before() if self.archive else 0
+        archived = (start_time, min(end_time, boundary - 1)) if start_time < boundary else None
+        live = (max(start_time, boundary), end_time) if end_time >= boundary else None
+        return archived, live
+
+    def _archive_columns(self, player_id: str, start_time: int, end_time: int) -> Dict[str, np.ndarray]:
+        """
+        Rows before the archive boundary as get_player_columns returns them, NULLs read as 0
+        
+        Rows that arrived after their day was archived are still only in
+        MySQL and are merged in by timestamp.
+        """
+        table = self.archive.read_table(player_id, start_time, end_time, [name for name, _ in PLAYER_COLUMNS])
+        if table is None:
+            archived = {name: np.empty(0, dtype=dtype) for name, dtype in PLAYER_COLUMNS}
+        else:
+            archived = {name: table.column(name).fill_null(0).to_numpy().astype(dtype)
+                        for name, dtype in PLAYER_COLUMNS}
+        
+        exclude, exclude_params = self._exported_filter(player_id)
+        late = self._fetch_columns(f"""
+            SELECT timestamp_micros,
+                   COALESCE(x_position, 0), COALESCE(y_position, 0),
+                   COALESCE(accel_x, 0), COALESCE(accel_y, 0), COALESCE(accel_z, 0),
+                   COALESCE(heart_rate, 0)
+            FROM player_tracking_data
+            WHERE player_id = %s
+            AND timestamp_micros BETWEEN %s AND %s{exclude}
+            ORDER BY timestamp_micros, id
+        """, (player_id, start_time, end_time, *exclude_params), PLAYER_COLUMNS, 1024, 50_000)
+        if not len(late['timestamp_micros']):
+            return archived
+        
+        merged = self._concat_columns([archived, late])
+        order = np.argsort(merged['timestamp_micros'], kind='stable')
+        return {name: values[order] for name, values in merged.items()}
+
+    def _exported_filter(self, player_id: str) -> Tuple[str, tuple]:
+        """SQL condition and parameters leaving out MySQL rows already in the archive"""
+        exported = self.archive.exported_rows(player_id)
+        if exported is None:
+            return '', ()
+        return '\n            AND NOT (timestamp_micros BETWEEN %s AND %s AND id <= %s)', exported
+
+    @staticmethod
+    def _concat_columns(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        if len(parts) == 1:
+            return parts[0]
+        return {name: np.concatenate([part[name] for part in parts]) for name, _ in PLAYER_COLUMNS}
 
     def get_player_latest_data(self, player_id: str) -> Optional[Dict[str, Any]]:
         """Get most recent data for a player"""
         connection = None
         cursor = None
         try:
-            connection = self.connection_pool.get_connection()
+            connection = self.get_connection()
             cursor = connection.cursor(dictionary=True)
             
             query = """
@@ -235,21 +1160,390 @@ class DatabaseHandler:
             if connection:
                 connection.close()
 
-    def cleanup_old_data(self, days_to_keep: int = 30) -> bool:
-        """Clean up data older than specified days"""
+    def get_team_player_ids(self, team_id: str) -> List[str]:
+        """Players of a team, ordered by player_id"""
         connection = None
         cursor = None
         try:
-            connection = self.connection_pool.get_connection()
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            cursor.execute("SELECT player_id FROM players WHERE team_id = %s ORDER BY player_id", (team_id,))
+            return [row[0] for row in cursor.fetchall()]
+
+        except mysql.connector.Error as err:
+            logger.error(f"Error retrieving team players: {err}")
+            return []
+
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    def get_window_watermark(self, player_id: str, start_time: int, end_time: int) -> Optional[Tuple[int, int]]:
+        """
+        Row count and newest timestamp of a player in a time range
+
+        Answered from the clustered (player_id, timestamp_micros) key, so it is
+        cheap enough to tell whether a cached window has received new rows.
+
+        Returns:
+            tuple: (row_count, max_timestamp_micros), None on error
+        """
+        connection = None
+        cursor = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            cursor.execute("""
+                SELECT COUNT(*), COALESCE(MAX(timestamp_micros), 0)
+                FROM player_tracking_data
+                WHERE player_id = %s
+                AND timestamp_micros BETWEEN %s AND %s
+            """, (player_id, start_time, end_time))
+            count, latest = cursor.fetchone()
+            return int(count), int(latest)
+
+        except mysql.connector.Error as err:
+            logger.error(f"Error retrieving window watermark: {err}")
+            return None
+
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    def ensure_daily_partitions(self, days_ahead: int = 7) -> bool:
+        """
+        Split daily partitions off the p_future catch-all partition of
+        player_tracking_data so that every day up to `days_ahead` days from
+        now has its own partition.
+
+        Rows already in p_future (the gateway was down for more than
+        `days_ahead` days, or a tag clock ran ahead) are moved into daily
+        partitions covering them, as migration 001 does for existing history.
+
+        Args:
+            days_ahead (int): Number of future days to pre-create partitions for
+
+        Returns:
+            bool: True if the partitions are in place, False otherwise
+        """
+        connection = None
+        cursor = None
+        try:
+            connection = self.get_connection()
             cursor = connection.cursor()
+
+            cursor.execute("""
+                SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+                FROM information_schema.PARTITIONS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'player_tracking_data'
+                AND PARTITION_NAME IS NOT NULL
+            """)
+            partitions = cursor.fetchall()
+            if not partitions:
+                logger.warning("player_tracking_data is not partitioned, run migrations/001 first")
+                return False
+
+            bounds = [int(desc) for _, desc in partitions if desc != 'MAXVALUE']
+            cursor.execute("""
+                SELECT MIN(timestamp_micros), MAX(timestamp_micros)
+                FROM player_tracking_data PARTITION (p_future)
+            """)
+            future_rows = cursor.fetchone()
+            future_rows = tuple(future_rows) if future_rows and future_rows[0] is not None else None
+
+            today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+            new_partitions = self.daily_partitions(bounds, future_rows, today, days_ahead)
+            if not new_partitions:
+                return True
+
+            cursor.execute(self.split_future_partition_ddl(new_partitions))
+            logger.info(f"Created {len(new_partitions)} daily partitions for player_tracking_data")
+            return True
+
+        except mysql.connector.Error as err:
+            logger.error(f"Error creating tracking data partitions: {err}")
+            return False
+
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    @staticmethod
+    def daily_partitions(bounds: List[int], future_rows: Optional[Tuple[int, int]], today: datetime,
+                         days_ahead: int, max_days_ahead: int = 366) -> List[str]:
+        """
+        Daily partition definitions to split off p_future
+        
+        They continue from the newest existing partition without a gap, so
+        no partition spans several days, and reach `days_ahead` days past
+        today or the day of the newest row in p_future, whichever is later.
+        Rows more than `max_days_ahead` days ahead are left in p_future.
+        
+        Args:
+            bounds (list): VALUES LESS THAN bounds of the existing daily partitions
+            future_rows (tuple, optional): (oldest, newest) timestamp in p_future
+            today (datetime): Start of the current UTC day
+            days_ahead (int): Number of future days to pre-create partitions for
+            max_days_ahead (int): Latest day, counted from today, to partition
             
-            cutoff_time = int((time.time() - (days_to_keep * 86400)) * 1_000_000)
+        Returns:
+            list: "PARTITION pYYYYMMDD VALUES LESS THAN (...)" clauses, oldest first
+        """
+        if bounds:
+            # The newest partition already covers the day before this bound
+            day = datetime.fromtimestamp(max(bounds) // 1_000_000, timezone.utc)
+        elif future_rows:
+            day = min(today, datetime.fromtimestamp(future_rows[0] // DAY_MICROS * 86_400, timezone.utc))
+        else:
+            day = today
+
+        last_day = today + timedelta(days=days_ahead)
+        if future_rows:
+            newest = datetime.fromtimestamp(future_rows[1] // DAY_MICROS * 86_400, timezone.utc)
+            limit = today + timedelta(days=max_days_ahead)
+            if newest > limit:
+                logger.warning(f"Rows up to {newest:%Y-%m-%d} are in p_future, partitioning only "
+                               f"up to {limit:%Y-%m-%d}")
+            last_day = max(last_day, min(newest, limit))
+
+        new_partitions = []
+        while day <= last_day:
+            upper = day + timedelta(days=1)
+            new_partitions.append(
+                f"PARTITION p{day.strftime('%Y%m%d')} "
+                f"VALUES LESS THAN ({int(upper.timestamp()) * 1_000_000})"
+            )
+            day = upper
+        return new_partitions
+
+    @staticmethod
+    def split_future_partition_ddl(new_partitions: List[str]) -> str:
+        """ALTER TABLE moving p_future's rows into `new_partitions` and an empty p_future"""
+        return f"""
+                ALTER TABLE player_tracking_data
+                REORGANIZE PARTITION p_future INTO (
+                    {", ".join(new_partitions)},
+                    PARTITION p_future VALUES LESS THAN MAXVALUE
+                )
+            """
+
+    def get_oldest_timestamp(self) -> Optional[int]:
+        """Oldest timestamp in player_tracking_data, None if it is empty or on error"""
+        connection = None
+        cursor = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            # Loose index scan: one probe per player on the clustered key
+            cursor.execute("""
+                SELECT MIN(oldest) FROM (
+                    SELECT MIN(timestamp_micros) AS oldest
+                    FROM player_tracking_data
+                    GROUP BY player_id
+                ) AS per_player
+            """)
+            oldest = cursor.fetchone()[0]
+            return int(oldest) if oldest is not None else None
+
+        except mysql.connector.Error as err:
+            logger.error(f"Error retrieving oldest tracking timestamp: {err}")
+            return None
+
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    def get_players_in_range(self, start_time: int, end_time: int) -> List[str]:
+        """Players with tracking rows in a time range"""
+        connection = None
+        cursor = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            cursor.execute("""
+                SELECT player_id, MIN(timestamp_micros)
+                FROM player_tracking_data
+                WHERE timestamp_micros BETWEEN %s AND %s
+                GROUP BY player_id
+            """, (start_time, end_time))
+            return [row[0] for row in cursor.fetchall()]
+
+        except mysql.connector.Error as err:
+            logger.error(f"Error retrieving players in range: {err}")
+            return []
+
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    def iter_tracking_rows(self, player_id: str, start_time: int, end_time: int,
+                           chunk_size: int = 50_000) -> Iterator[List[tuple]]:
+        """
+        Stream full player_tracking_data rows of a player for archiving
+        
+        Args:
+            player_id (str): Player's unique identifier
+            start_time (int): Start time in epoch microseconds
+            end_time (int): End time in epoch microseconds
+            chunk_size (int): Rows per chunk
             
-            # Clean up old tracking data
+        Yields:
+            list: Row tuples in archive.ARCHIVE_COLUMNS order, ordered by
+                timestamp_micros and id
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor(buffered=False)
+        try:
+            cursor.execute(f"""
+                SELECT {', '.join(name for name, _ in ARCHIVE_COLUMNS)}
+                FROM player_tracking_data
+                WHERE player_id = %s
+                AND timestamp_micros BETWEEN %s AND %s
+                ORDER BY timestamp_micros, id
+            """, (player_id, start_time, end_time))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+            connection.close()
+
+    def drop_day_partition(self, day_start: int, day_end: int, expected_rows: int) -> bool:
+        """
+        Drop the daily partition ending at `day_end` if it holds exactly `expected_rows` rows
+        
+        Used once the rows of the day are archived: a partition that also
+        holds rows that were not archived (a wider range, late inserts) is
+        left alone and the caller deletes in batches instead.
+        
+        Returns:
+            bool: True if the partition was dropped
+        """
+        connection = None
+        cursor = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
             cursor.execute("""
-                DELETE FROM player_tracking_data 
-                WHERE timestamp_micros < %s
-            """, (cutoff_time,))
+                SELECT PARTITION_NAME
+                FROM information_schema.PARTITIONS
+                WHERE TABLE_SCHEMA = DATABASE()
+                AND TABLE_NAME = 'player_tracking_data'
+                AND PARTITION_DESCRIPTION = %s
+            """, (str(day_end),))
+            row = cursor.fetchone()
+            if row is None:
+                return False
+            partition = row[0]
+            
+            cursor.execute(f"SELECT COUNT(*) FROM player_tracking_data PARTITION ({partition})")
+            if cursor.fetchone()[0] != expected_rows:
+                return False
+            
+            cursor.execute(f"ALTER TABLE player_tracking_data DROP PARTITION {partition}")
+            logger.info(f"Dropped tracking partition {partition} ({expected_rows} rows)")
+            return True
+            
+        except mysql.connector.Error as err:
+            logger.error(f"Error dropping tracking partition: {err}")
+            return False
+            
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    def delete_tracking_range(self, player_id: str, start_time: int, end_time: int,
+                              max_id: int, batch_size: int = 10_000) -> bool:
+        """
+        Delete a player's rows in a time range in bounded primary key batches
+        
+        Every batch is a separate short transaction on the clustered key, so
+        locks are held for one batch at a time rather than for the whole
+        range.
+        
+        Args:
+            player_id (str): Player's unique identifier
+            start_time (int): Start time in epoch microseconds
+            end_time (int): End time in epoch microseconds
+            max_id (int): Only rows with an id up to this are deleted, so rows
+                inserted after they were archived are kept
+            batch_size (int): Rows per DELETE
+            
+        Returns:
+            bool: True if every batch was committed
+        """
+        connection = None
+        cursor = None
+        deleted = 0
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            while True:
+                cursor.execute("""
+                    DELETE FROM player_tracking_data
+                    WHERE player_id = %s
+                    AND timestamp_micros BETWEEN %s AND %s
+                    AND id <= %s
+                    ORDER BY timestamp_micros, id
+                    LIMIT %s
+                """, (player_id, start_time, end_time, max_id, batch_size))
+                connection.commit()
+                deleted += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    break
+            logger.debug(f"Deleted {deleted} tracking rows of player {player_id}")
+            return True
+            
+        except mysql.connector.Error as err:
+            logger.error(f"Error deleting tracking rows: {err}")
+            if connection:
+                connection.rollback()
+            return False
+            
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+
+    def cleanup_old_data(self, days_to_keep: int = 30, batch_size: int = 10_000) -> bool:
+        """
+        Clean up data older than specified days
+        
+        With an archive the tracking rows are archived before they are
+        removed (archive.run_retention), otherwise they are deleted per
+        player in bounded primary key batches.
+        """
+        if self.archive:
+            run_retention(self, self.archive, days_to_keep, batch_size)
+        else:
+            cutoff_time = int((time.time() - (days_to_keep * 86400)) * 1_000_000)
+            for player_id in self.get_players_in_range(0, cutoff_time - 1):
+                deleted = self.delete_tracking_range(player_id, 0, cutoff_time - 1, 2**63 - 1, batch_size)
+                self.bump_data_revisions([player_id])
+                if not deleted:
+                    return False
+        
+        connection = None
+        cursor = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
             
             # Clean up old tag assignments
             cursor.execute("""
@@ -270,4 +1564,4 @@ class DatabaseHandler:
             if cursor:
                 cursor.close()
             if connection:
-                connection.close()
\ No newline at end of file
+                connection.close()
@@ -0,0 +1,115 @@
+"""
+Downsampling of analytics series for charting.
+
+lttb_indices implements Largest-Triangle-Three-Buckets, which keeps the shape
+of a line chart; minmax_indices keeps the minimum and maximum of every bucket,
+which preserves spikes. Both return sample indices, so several series can be
+reduced onto one shared time axis with shared_indices.
+"""
+from typing import Sequence
+
+import numpy as np
+
+DOWNSAMPLE_METHODS = ('lttb', 'minmax')
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the points Largest-Triangle-Three-Buckets keeps.
+
+    Args:
+        x (np.ndarray): Increasing x values (e.g. timestamps)
+        y (np.ndarray): Series values
+        n_out (int): Number of points to keep, at least 3
+
+    Returns:
+        np.ndarray: Sorted int64 indices, always including the first and last point
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n, dtype=np.int64)
+    n_out = max(n_out, 3)
+    x = np.asarray(x, dtype=np.float64) - float(x[0])
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket i covers [edges[i], edges[i + 1]); the first and last points are
+    # buckets of their own
+    every = (n - 2) / (n_out - 2)
+    edges = np.append((np.arange(n_out - 2) * every).astype(np.int64) + 1, n - 1)
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], edges[:-1]) / sizes
+    mean_y = np.add.reduceat(y[:-1], edges[:-1]) / sizes
+    # The triangle of the last bucket closes on the last point
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0] = a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        bx = x[start:end]
+        by = y[start:end]
+        area = np.abs((x[a] - mean_x[i]) * (by - y[a]) - (x[a] - bx) * (mean_y[i] - y[a]))
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+    out[-1] = n - 1
+    return out
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the minimum and maximum of n_out // 2 equal buckets.
+
+    Returns:
+        np.ndarray: Sorted unique int64 indices, at most n_out of them
+    """
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n, dtype=np.int64)
+    n_buckets = max(n_out // 2, 1)
+    bucket = np.arange(n, dtype=np.int64) * n_buckets // n
+    order = np.lexsort((y, bucket))
+    ends = np.flatnonzero(np.diff(bucket[order])) + 1
+    first = np.concatenate(([0], ends))
+    last = np.append(ends - 1, n - 1)
+    return np.unique(np.concatenate((order[first], order[last])))
+
+
+def shared_indices(x: np.ndarray, series: Sequence[np.ndarray], max_points: int,
+                   method: str = 'lttb') -> np.ndarray:
+    """
+    Downsample several series onto one shared axis.
+
+    Each series is reduced with `method` to an equal share of `max_points` and
+    the kept indices are merged, so every series keeps its own extremes while
+    the result holds at most `max_points` points. When the shares cannot go
+    below their minimum of 3 (more series than max_points / 3), the merged
+    indices are thinned evenly to max_points, keeping the first and last.
+
+    Args:
+        x (np.ndarray): Shared x values
+        series (sequence): Series aligned with x
+        max_points (int): Upper bound on the number of points returned, at least 3
+        method (str): 'lttb' or 'minmax'
+
+    Returns:
+        np.ndarray: Sorted int64 indices into x
+
+    Raises:
+        ValueError: For an unknown method or max_points below 3
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method {method!r}")
+    if max_points < 3:
+        raise ValueError(f"max_points must be at least 3, got {max_points}")
+    if len(x) <= max_points or not series:
+        return np.arange(len(x), dtype=np.int64)
+    share = max(max_points // len(series), 3)
+    picks = [
+        lttb_indices(x, values, share) if method == 'lttb' else minmax_indices(values, share)
+        for values in series
+    ]
+    keep = np.unique(np.concatenate(picks))
+    if len(keep) > max_points:
+        keep = keep[np.round(np.linspace(0, len(keep) - 1, max_points)).astype(np.int64)]
+    return keep
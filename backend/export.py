@@ -0,0 +1,174 @@
+"""
+Streaming exports of raw tracking data with the derived analytics columns.
+
+A window is read chunk by chunk (DatabaseHandler.iter_player_columns), the
+derived speed, displacement and acceleration magnitude are computed with
+StreamingAnalytics so they match /api/player-analytics at raw resolution,
+and each chunk is encoded and handed out before the next is read. Memory
+stays bounded by one chunk (CSV) or one row group (Parquet) however long the
+window is.
+
+CSV can be gzip compressed as it streams. Parquet needs pyarrow, which is
+optional and imported on first use; its compression is the file's own
+column codec.
+"""
+import importlib.util
+import io
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from analytics import StreamingAnalytics
+
+EXPORT_FORMATS = ('csv', 'parquet')
+
+# Compressions of each format, the first is the default; Parquet compresses
+# its column pages rather than the file
+EXPORT_COMPRESSIONS = {
+    'csv': ('none', 'gzip'),
+    'parquet': ('snappy', 'gzip', 'none'),
+}
+
+# Exported columns in order, with their CSV number format
+EXPORT_COLUMNS = (
+    ('timestamp_micros', '%d'),
+    ('x_position', '%.7g'),
+    ('y_position', '%.7g'),
+    ('accel_x', '%.7g'),
+    ('accel_y', '%.7g'),
+    ('accel_z', '%.7g'),
+    ('heart_rate', '%.7g'),
+    ('speed', '%.10g'),
+    ('displacement', '%.10g'),
+    ('acc_magnitude', '%.10g'),
+)
+
+PARQUET_ROW_GROUP_SIZE = 100_000
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def export_filename(player_id: str, start_time: int, end_time: int, fmt: str, compression: str) -> str:
+    suffix = '.gz' if fmt == 'csv' and compression == 'gzip' else ''
+    return f"{player_id}_{start_time}_{end_time}.{fmt}{suffix}"
+
+
+def with_derived(chunks: Iterable[Dict[str, np.ndarray]]) -> Iterator[Dict[str, np.ndarray]]:
+    """Add speed, displacement and acc_magnitude to consecutive raw column chunks"""
+    state = StreamingAnalytics()
+    for columns in chunks:
+        derived = state.update(columns)
+        yield {
+            **columns,
+            'speed': derived['speeds'],
+            'displacement': derived['displacements'],
+            'acc_magnitude': derived['acc_magnitude'],
+        }
+
+
+def iter_csv(chunks: Iterable[Dict[str, np.ndarray]], columns: Sequence[str],
+             compression: str = 'none') -> Iterator[bytes]:
+    """
+    Encode column chunks as CSV.
+
+    Args:
+        chunks (iterable): Column dicts as yielded by with_derived
+        columns (sequence): Names from EXPORT_COLUMNS, in output order
+        compression (str): 'none' or 'gzip'
+
+    Yields:
+        bytes: The header, then one piece per chunk
+    """
+    formats = dict(EXPORT_COLUMNS)
+    row = ','.join(formats[name] for name in columns) + '\n'
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compression == 'gzip' else None
+
+    def emit(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor else data
+
+    yield emit((','.join(columns) + '\n').encode('ascii'))
+    for chunk in chunks:
+        # tolist() gives Python ints and floats, so timestamps stay exact
+        text = ''.join(row % values for values in zip(*(chunk[name].tolist() for name in columns)))
+        data = emit(text.encode('ascii'))
+        if data:
+            yield data
+    if compressor:
+        yield compressor.flush()
+
+
+def iter_parquet(chunks: Iterable[Dict[str, np.ndarray]], columns: Sequence[str],
+                 compression: str = 'snappy', row_group_size: int = PARQUET_ROW_GROUP_SIZE) -> Iterator[bytes]:
+    """
+    Encode column chunks as a Parquet file, one row group per `row_group_size` rows.
+
+    Args:
+        chunks (iterable): Column dicts as yielded by with_derived
+        columns (sequence): Names from EXPORT_COLUMNS, in output order
+        compression (str): Column page codec, 'snappy', 'gzip' or 'none'
+        row_group_size (int): Rows per row group
+
+    Yields:
+        bytes: File content as each row group is written
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _DrainableSink()
+    writer: Optional[pq.ParquetWriter] = None
+    pending: List[pa.Table] = []
+    pending_rows = 0
+
+    def write(table):
+        nonlocal writer
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema, compression=compression)
+        writer.write_table(table, row_group_size=row_group_size)
+
+    for chunk in chunks:
+        pending.append(pa.table({name: chunk[name] for name in columns}))
+        pending_rows += len(chunk['timestamp_micros'])
+        if pending_rows < row_group_size:
+            continue
+        table = pa.concat_tables(pending)
+        full = pending_rows - pending_rows % row_group_size
+        write(table.slice(0, full))
+        pending = [table.slice(full)] if full < pending_rows else []
+        pending_rows -= full
+        data = sink.drain()
+        if data:
+            yield data
+
+    if pending_rows:
+        write(pa.concat_tables(pending))
+    if writer is not None:
+        writer.close()
+        yield sink.drain()
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last drain"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._parts = b''.join(self._parts), []
+        return data
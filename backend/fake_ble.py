@@ -0,0 +1,92 @@
+import asyncio
+import math
+import random
+import struct
+from typing import Optional, Callable, Any
+
+
+FRAME_FORMAT = "<8f4B"  # x, y, accel xyz, gyro xyz, battery, heart rate, serial, activity
+
+
+def synthetic_frame(t: float, serial_number: int = 0) -> bytes:
+    """Build one plausible 36-byte tag frame for time `t` in seconds"""
+    return struct.pack(
+        FRAME_FORMAT,
+        50 + 30 * math.sin(t / 7),              # x_position
+        30 + 20 * math.cos(t / 5),              # y_position
+        random.gauss(0, 2),                     # accel_x
+        random.gauss(0, 2),                     # accel_y
+        9.81 + 4 * abs(math.sin(t * math.pi * 2)) + random.gauss(0, 0.5),  # accel_z
+        random.gauss(0, 0.1),                   # gyro_x
+        random.gauss(0, 0.1),                   # gyro_y
+        random.gauss(0, 0.1),                   # gyro_z
+        100,                                    # battery_life
+        120 + int(20 * math.sin(t / 60)),       # heart_rate
+        serial_number & 0xFF,                   # serial_number
+        1                                       # activity_status
+    )
+
+
+class FakeBleakClient:
+    """
+    Stand-in for BleakClient that emits synthetic tag notifications.
+
+    It mirrors the parts of the BleakClient API the gateway uses. Frames are
+    emitted at `rate_hz` from the event loop once notifications are started.
+    Set `fail_connects` to make the first connection attempts raise, and
+    `disconnect_after` to drop the link after that many seconds.
+    """
+
+    rate_hz: float = 50.0
+    fail_connects: int = 0
+    disconnect_after: Optional[float] = None
+
+    def __init__(self, address: str, disconnected_callback: Optional[Callable[[Any], None]] = None, **kwargs):
+        self.address = address
+        self.disconnected_callback = disconnected_callback
+        self.is_connected = False
+        self._task: Optional[asyncio.Task] = None
+        self._serial = sum(address.encode()) & 0xFF
+
+    async def connect(self, **kwargs) -> bool:
+        await asyncio.sleep(0.01)
+        # Counted on the class, so one budget of failures covers every client it creates
+        cls = type(self)
+        if cls.fail_connects > 0:
+            cls.fail_connects -= 1
+            raise OSError(f"Simulated connection failure for {self.address}")
+        self.is_connected = True
+        return True
+
+    async def disconnect(self) -> bool:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        was_connected = self.is_connected
+        self.is_connected = False
+        if was_connected and self.disconnected_callback:
+            self.disconnected_callback(self)
+        return True
+
+    async def start_notify(self, characteristic: str, callback: Callable[[Any, bytearray], Any]) -> None:
+        self._task = asyncio.create_task(self._emit(characteristic, callback))
+
+    async def stop_notify(self, characteristic: str) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _emit(self, characteristic: str, callback: Callable[[Any, bytearray], Any]) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        period = 1.0 / self.rate_hz
+        n = 0
+        while self.is_connected:
+            now = loop.time() - start
+            if self.disconnect_after is not None and now >= self.disconnect_after:
+                self._task = None
+                await self.disconnect()
+                return
+            callback(characteristic, bytearray(synthetic_frame(now, self._serial)))
+            n += 1
+            await asyncio.sleep(max(0.0, start + n * period - loop.time()))
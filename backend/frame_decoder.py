@@ -0,0 +1,126 @@
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FRAME_SIZE = 36
+
+# Wire layout of one tag notification: struct "<8f4B"
+FRAME_DTYPE = np.dtype([
+    ('x_position', '<f4'),
+    ('y_position', '<f4'),
+    ('accel_x', '<f4'),
+    ('accel_y', '<f4'),
+    ('accel_z', '<f4'),
+    ('gyro_x', '<f4'),
+    ('gyro_y', '<f4'),
+    ('gyro_z', '<f4'),
+    ('battery_life', 'u1'),
+    ('heart_rate', 'u1'),
+    ('serial_number', 'u1'),
+    ('activity_status', 'u1'),
+])
+assert FRAME_DTYPE.itemsize == FRAME_SIZE
+
+FRAME_FIELDS = FRAME_DTYPE.names
+
+
+def decode_frames(buffer, count: int, offset: int = 0) -> np.ndarray:
+    """
+    Decode `count` consecutive frames from a bytes-like buffer in one call.
+
+    Args:
+        buffer: bytes, bytearray or memoryview holding packed frames
+        count (int): Number of frames to decode
+        offset (int): Byte offset of the first frame
+
+    Returns:
+        np.ndarray: Structured array with FRAME_DTYPE; a view on `buffer`
+    """
+    return np.frombuffer(buffer, dtype=FRAME_DTYPE, count=count, offset=offset)
+
+
+def frames_to_columns(frames: np.ndarray, timestamps: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Turn decoded frames into a struct-of-arrays batch.
+
+    Args:
+        frames (np.ndarray): Structured array with FRAME_DTYPE
+        timestamps (np.ndarray): Receive time of each frame in epoch microseconds
+
+    Returns:
+        Dict[str, np.ndarray]: One owned array per field plus 'timestamp_micros'
+    """
+    frames = np.array(frames, copy=True)
+    columns = {name: frames[name] for name in FRAME_FIELDS}
+    columns['timestamp_micros'] = np.array(timestamps, dtype=np.int64)
+    return columns
+
+
+class FrameRing:
+    """
+    Preallocated ring of raw frames and their receive timestamps for one tag.
+
+    The BLE notification callback only copies the 36 raw bytes into the ring;
+    decoding happens for the whole backlog at once in drain(). When the ring
+    is full the oldest frame is overwritten and counted in `dropped`.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.dropped = 0
+        self._buffer = bytearray(capacity * FRAME_SIZE)
+        self._timestamps = np.zeros(capacity, dtype=np.int64)
+        self._start = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, frame: bytes, received_micros: int) -> bool:
+        """
+        Copy one raw frame into the ring.
+
+        Returns:
+            bool: False if the frame has the wrong length and was rejected
+        """
+        if len(frame) != FRAME_SIZE:
+            return False
+
+        if self._count == self.capacity:
+            self._start = (self._start + 1) % self.capacity
+            self._count -= 1
+            self.dropped += 1
+
+        slot = (self._start + self._count) % self.capacity
+        self._buffer[slot * FRAME_SIZE:(slot + 1) * FRAME_SIZE] = frame
+        self._timestamps[slot] = received_micros
+        self._count += 1
+        return True
+
+    def drain(self) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Decode and remove every buffered frame.
+
+        Returns:
+            Optional[Dict[str, np.ndarray]]: Column arrays in arrival order, or
+                None if the ring is empty
+        """
+        if self._count == 0:
+            return None
+
+        first = min(self._count, self.capacity - self._start)
+        frames = decode_frames(self._buffer, first, self._start * FRAME_SIZE)
+        timestamps = self._timestamps[self._start:self._start + first]
+        if first < self._count:
+            # Wrapped around the end of the buffer
+            rest = self._count - first
+            frames = np.concatenate([frames, decode_frames(self._buffer, rest)])
+            timestamps = np.concatenate([timestamps, self._timestamps[:rest]])
+
+        columns = frames_to_columns(frames, timestamps)
+        self._start = (self._start + self._count) % self.capacity
+        self._count = 0
+        return columns
@@ -0,0 +1,156 @@
+"""
+Bounded per-tag ingest queues served by a fixed pool of worker coroutines.
+
+process_frames drains the raw frame rings of every tag and hands each
+decoded batch to TagIngestQueue.put; `workers` coroutines take tags that
+have queued samples and process them. A tag is only ever held by one worker
+at a time and its batches are processed in arrival order, while a slow tag
+(e.g. a stalled player lookup) only occupies one worker instead of holding
+up every other tag.
+
+Each tag queues at most `max_samples` samples. When a batch does not fit,
+the overflow policy decides:
+
+    block        the batch is refused and the caller leaves the frames in the
+                 tag's ring until there is room; nothing is lost in the queue
+    drop_oldest  the oldest queued samples are dropped to make room
+    latest       everything queued is dropped in favour of the new batch
+
+Samples dropped by a policy are counted per tag in `dropped`.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'latest')
+
+
+def _samples(columns: Dict[str, np.ndarray]) -> int:
+    return len(columns['timestamp_micros'])
+
+
+def _concat(batches: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    if len(batches) == 1:
+        return batches[0]
+    return {name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]}
+
+
+class TagIngestQueue:
+    """
+    Args:
+        process (callable): async (tag_id, columns) called by the workers
+        workers (int): Number of worker coroutines
+        max_samples (int): Most samples queued per tag
+        policy (str): One of OVERFLOW_POLICIES
+    """
+
+    def __init__(self, process: Callable[[str, Dict[str, np.ndarray]], Awaitable[None]], workers: int = 4,
+                 max_samples: int = 2048, policy: str = 'drop_oldest'):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy {policy!r}, expected one of {OVERFLOW_POLICIES}")
+        self.process = process
+        self.workers = workers
+        self.max_samples = max_samples
+        self.policy = policy
+        self.dropped: Dict[str, int] = {}
+        self._batches: Dict[str, List[Dict[str, np.ndarray]]] = {}
+        self._depth: Dict[str, int] = {}
+        # Tags with queued samples that no worker holds, each at most once
+        self._ready: Optional[asyncio.Queue] = None
+        self._scheduled = set()
+        self._tasks: List[asyncio.Task] = []
+
+    def depth(self, tag_id: Optional[str] = None) -> int:
+        """Samples queued for a tag, or for every tag"""
+        if tag_id is not None:
+            return self._depth.get(tag_id, 0)
+        return sum(self._depth.values())
+
+    def depths(self) -> Dict[str, int]:
+        return dict(self._depth)
+
+    def has_room(self, tag_id: str) -> bool:
+        """False while a 'block' queue is full; frames should then stay in the ring"""
+        return self.policy != 'block' or self._depth.get(tag_id, 0) < self.max_samples
+
+    def put(self, tag_id: str, columns: Dict[str, np.ndarray]) -> bool:
+        """
+        Queue a decoded batch of a tag, applying the overflow policy.
+
+        Returns:
+            bool: False if the batch was refused ('block' and the queue is full)
+        """
+        n = _samples(columns)
+        if not n:
+            return True
+        batches = self._batches.setdefault(tag_id, [])
+        depth = self._depth.get(tag_id, 0)
+
+        if depth and depth + n > self.max_samples:
+            if self.policy == 'block':
+                return False
+            if self.policy == 'latest':
+                self._drop(tag_id, depth)
+                batches.clear()
+                depth = 0
+            else:
+                while batches and depth + n > self.max_samples:
+                    excess = depth + n - self.max_samples
+                    oldest = batches[0]
+                    if _samples(oldest) <= excess:
+                        batches.pop(0)
+                        depth -= _samples(oldest)
+                        self._drop(tag_id, _samples(oldest))
+                    else:
+                        batches[0] = {name: values[excess:] for name, values in oldest.items()}
+                        depth -= excess
+                        self._drop(tag_id, excess)
+
+        batches.append(columns)
+        self._depth[tag_id] = depth + n
+        if tag_id not in self._scheduled:
+            self._scheduled.add(tag_id)
+            self._ready.put_nowait(tag_id)
+        return True
+
+    def _drop(self, tag_id: str, samples: int) -> None:
+        if not self.dropped.get(tag_id):
+            logger.warning(f"Ingest queue of tag {tag_id} is full, dropping samples ({self.policy})")
+        self.dropped[tag_id] = self.dropped.get(tag_id, 0) + samples
+
+    async def start(self) -> None:
+        """Start the workers on the running loop"""
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self) -> None:
+        """Wait until everything queued so far is processed"""
+        while self._scheduled:
+            await asyncio.sleep(0.01)
+
+    async def _work(self) -> None:
+        while True:
+            tag_id = await self._ready.get()
+            # Everything queued for the tag goes out as one batch, in order
+            batches, self._batches[tag_id] = self._batches[tag_id], []
+            self._depth[tag_id] = 0
+            try:
+                await self.process(tag_id, _concat(batches))
+            except Exception as e:
+                logger.error(f"Error processing ingest batch for tag {tag_id}: {e}")
+            if self._batches[tag_id]:
+                self._ready.put_nowait(tag_id)
+            else:
+                self._scheduled.discard(tag_id)
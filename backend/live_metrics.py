@@ -0,0 +1,148 @@
+"""
+Live per-tag metrics computed in the gateway as samples arrive.
+
+Every decoded batch is fed through the stateful calculate_sports_numba
+kernels (speed, acceleration, step and jump detection, sprint phase) in one
+compiled call per tag, and the rolling values are published on
+<base_topic>/<tag_id>/metrics every `interval` seconds.
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+import sports_kernels
+from analytics import JUMP_THRESHOLD, STEP_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+SPEED_WINDOW = 10       # samples averaged by calculate_speed
+SPEED_HISTORY = 20      # speeds (m/s) seen by the phase detectors
+
+
+# Phase codes returned by process_samples
+PHASES = ('idle', 'acceleration', 'max_velocity', 'deceleration')
+
+
+class TagMetricsState:
+    """Kernel state of one tag and the latest metrics it produced"""
+
+    def __init__(self):
+        self.kernels = sports_kernels.load()
+        self.state = self.kernels.new_state()
+        self.window = np.zeros(SPEED_WINDOW)
+        self.speed = 0.0
+        self.step_count = 0
+        self.jump_count = 0
+        self.phase = 'idle'
+        self.samples = 0
+        self.last_timestamp_micros = 0
+        self.player_id: Optional[str] = None
+
+    def update(self, columns: Dict[str, np.ndarray], step_threshold: float, jump_threshold: float) -> None:
+        """Feed a decoded batch through the kernels in one compiled call"""
+        speeds, steps, jumps, phases = self.kernels.process_samples(
+            self.state, self.window,
+            columns['timestamp_micros'] / 1_000_000,
+            columns['accel_x'].astype(np.float64),
+            columns['accel_y'].astype(np.float64),
+            columns['accel_z'].astype(np.float64),
+            columns['activity_status'].astype(np.int64),
+            step_threshold, jump_threshold, SPEED_HISTORY)
+        self.speed = float(speeds[-1])
+        self.step_count = int(steps[-1])
+        self.jump_count = int(jumps[-1])
+        self.phase = PHASES[phases[-1]]
+        self.samples += len(speeds)
+        self.last_timestamp_micros = int(columns['timestamp_micros'][-1])
+
+
+class LiveMetricsEngine:
+    """
+    Per-tag live metrics over decoded sample batches.
+
+    Processing time per sample is tracked against `latency_budget_micros`
+    and a warning is logged for every publishing tick in which the average
+    went over it.
+    """
+
+    def __init__(self, mqtt_client, base_topic: str, interval: float = 0.5,
+                 step_threshold: float = STEP_THRESHOLD, jump_threshold: float = JUMP_THRESHOLD,
+                 latency_budget_micros: float = 300.0):
+        self.mqtt_client = mqtt_client
+        self.base_topic = base_topic
+        self.interval = interval
+        self.step_threshold = step_threshold
+        self.jump_threshold = jump_threshold
+        self.latency_budget_micros = latency_budget_micros
+        self.states: Dict[str, TagMetricsState] = {}
+        self._changed = set()
+        self._busy_ns = 0
+        self._processed = 0
+
+    def warm_up(self) -> None:
+        """Load the kernels and compile them if needed before samples arrive"""
+        columns = {name: np.zeros(2) for name in ('timestamp_micros', 'accel_x', 'accel_y', 'accel_z')}
+        columns['activity_status'] = np.ones(2, dtype=np.uint8)
+        TagMetricsState().update(columns, self.step_threshold, self.jump_threshold)
+
+    def process(self, tag_id: str, player_id: Optional[str], columns: Dict[str, np.ndarray]) -> None:
+        """
+        Feed a decoded batch of a tag through its kernel state.
+
+        Args:
+            tag_id (str): Tag the samples came from
+            player_id (str, optional): Player linked to the tag
+            columns (dict): Decoded column arrays
+        """
+        started = time.perf_counter_ns()
+        state = self.states.get(tag_id)
+        if state is None:
+            state = self.states[tag_id] = TagMetricsState()
+        state.player_id = player_id
+        n = len(columns['timestamp_micros'])
+        if n:
+            state.update(columns, self.step_threshold, self.jump_threshold)
+            self._changed.add(tag_id)
+        self._busy_ns += time.perf_counter_ns() - started
+        self._processed += n
+
+    def snapshot(self, tag_id: str) -> Dict[str, Any]:
+        """Current metrics of a tag as published"""
+        state = self.states[tag_id]
+        return {
+            'tag_id': tag_id,
+            'player_id': state.player_id,
+            'timestamp_micros': state.last_timestamp_micros,
+            'speed': round(float(state.speed), 2),
+            'step_count': int(state.step_count),
+            'jump_count': int(state.jump_count),
+            'phase': state.phase,
+            'samples': state.samples,
+        }
+
+    def flush(self) -> None:
+        """Publish the metrics of every tag that received samples since the last flush"""
+        changed, self._changed = self._changed, set()
+        for tag_id in changed:
+            self.mqtt_client.publish(f"{self.base_topic}/{tag_id}/metrics", json.dumps(self.snapshot(tag_id)))
+
+        if self._processed:
+            per_sample = self._busy_ns / self._processed / 1000
+            if per_sample > self.latency_budget_micros:
+                logger.warning(f"Live metrics took {per_sample:.0f} us per sample "
+                               f"(budget {self.latency_budget_micros:.0f} us)")
+        self._busy_ns = 0
+        self._processed = 0
+
+    async def run(self) -> None:
+        """Publish on every tick"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error publishing live metrics: {e}")
@@ -25,12 +25,17 @@ CREATE TABLE tags (
 );
 
 -- Player Tracking Data Table
--- Stores real-time tracking data from sensors
+-- Stores real-time tracking data from sensors.
+-- Clustered on (player_id, timestamp_micros) so per-player range reads are a
+-- single index range scan, and range-partitioned by day on timestamp_micros.
+-- Partitioned InnoDB tables cannot carry foreign keys, so the player/tag
+-- references are enforced by the ingest path instead.
+-- Daily partitions are split off p_future by DatabaseHandler.ensure_daily_partitions().
 CREATE TABLE player_tracking_data (
-    id INT AUTO_INCREMENT PRIMARY KEY,
-    player_id VARCHAR(255),
+    id BIGINT NOT NULL AUTO_INCREMENT,
+    player_id VARCHAR(255) NOT NULL,
     tag_id VARCHAR(50),
-    timestamp_micros BIGINT,
+    timestamp_micros BIGINT NOT NULL,
     x_position FLOAT,
     y_position FLOAT,
     accel_x FLOAT,
@@ -43,8 +48,72 @@ CREATE TABLE player_tracking_data (
     heart_rate INT,
     serial_number INT,
     activity_status INT,
-    FOREIGN KEY (player_id) REFERENCES players(player_id),
-    FOREIGN KEY (tag_id) REFERENCES tags(tag_id)
+    PRIMARY KEY (player_id, timestamp_micros, id),
+    KEY idx_tracking_id (id),
+    KEY idx_tracking_tag (tag_id)
+)
+PARTITION BY RANGE (timestamp_micros) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+-- Per-second and per-minute rollups of player_tracking_data
+-- Maintained incrementally by the gateway's batched writer (and rebuilt by
+-- rollups.py backfill). Sums and counts are stored instead of means so that
+-- partial buckets from several ingest batches merge with a plain upsert.
+CREATE TABLE player_tracking_1s (
+    player_id VARCHAR(255) NOT NULL,
+    bucket_micros BIGINT NOT NULL,
+    sample_count INT NOT NULL,
+    accel_mag_min FLOAT,
+    accel_mag_max FLOAT,
+    accel_mag_sum DOUBLE,
+    distance DOUBLE,
+    speed_sum DOUBLE,
+    peak_speed FLOAT,
+    step_count INT,
+    jump_count INT,
+    heart_rate_sum BIGINT,
+    heart_rate_count INT,
+    PRIMARY KEY (player_id, bucket_micros)
+);
+
+CREATE TABLE player_tracking_1m LIKE player_tracking_1s;
+
+-- Per-player summary and session index
+-- Maintained by the gateway's batched writer (and rebuilt by sessions.py).
+-- A session is a run of active samples without a pause longer than
+-- SESSION_GAP_SECONDS, keyed by its first timestamp.
+CREATE TABLE player_tracking_summary (
+    player_id VARCHAR(255) NOT NULL PRIMARY KEY,
+    first_micros BIGINT NOT NULL,
+    last_micros BIGINT NOT NULL,
+    sample_count BIGINT NOT NULL
+);
+
+CREATE TABLE player_sessions (
+    player_id VARCHAR(255) NOT NULL,
+    start_micros BIGINT NOT NULL,
+    end_micros BIGINT NOT NULL,
+    sample_count BIGINT NOT NULL,
+    PRIMARY KEY (player_id, start_micros)
+);
+
+-- Spool Positions Table
+-- Position each gateway spool has been loaded up to, committed together
+-- with the rows (see spool.py)
+CREATE TABLE spool_positions (
+    spool_name VARCHAR(64) NOT NULL PRIMARY KEY,
+    segment BIGINT NOT NULL,
+    record BIGINT NOT NULL
+);
+
+-- Revision of each player's past tracking data, bumped when rows arrive
+-- late or are moved by retention ('' applies to every player), so the
+-- analytics cache can tell that a finished window changed
+CREATE TABLE player_data_revisions (
+    player_id VARCHAR(255) NOT NULL PRIMARY KEY,
+    revision BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
 );
 
 -- Tag Assignments Table
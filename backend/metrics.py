@@ -0,0 +1,466 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms live in a MetricsRegistry (REGISTRY by
+default) and are exposed by a MetricsServer on a local port:
+
+    GET  /metrics                  Prometheus text format 0.0.4
+    GET  /profile                  folded stacks from the sampling profiler
+    POST /profile/start?interval=  start sampling every `interval` seconds
+    POST /profile/stop             stop sampling, the stacks are kept
+
+Gauges (and counters kept elsewhere, e.g. FrameRing.dropped) can be backed by
+a function evaluated on every scrape instead of being updated inline.
+
+The folded stacks ("frame;frame;frame count" per line) load directly into
+speedscope or flamegraph.pl.
+"""
+import bisect
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+# Seconds; from sub-millisecond decode batches to slow analytics requests
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Bytes, powers of four from 256 B to 64 MiB
+SIZE_BUCKETS = tuple(float(4 ** n) for n in range(4, 14))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base of the metric types: a name, help text and children per label values"""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], Any]] = None
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """The child for one combination of label values, created on first use"""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def set_function(self, function: Callable[[], Any]) -> None:
+        """
+        Report the result of `function` on every scrape instead of stored values.
+
+        Args:
+            function (callable): Returns a number, or for a labelled metric a
+                dict of label value tuples (or a single string) -> number
+        """
+        self._function = function
+
+    def _samples(self) -> Iterator[Tuple[str, str, float]]:
+        if self._function is not None:
+            try:
+                result = self._function()
+            except Exception as e:
+                logger.error(f"Error collecting metric {self.name}: {e}")
+                return
+            if not self.labelnames:
+                yield self.name, '', result
+                return
+            for key, value in result.items():
+                key = key if isinstance(key, tuple) else (key,)
+                yield self.name, _format_labels(self.labelnames, key), value
+            return
+        for key, child in list(self._children.items()):
+            yield from child.samples(self.name, _format_labels(self.labelnames, key), self.labelnames, key)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in self._samples())
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def samples(self, name: str, labels: str, labelnames, key) -> Iterator[Tuple[str, str, float]]:
+        yield name, labels, self.value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count; use rate() for per-second figures"""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down"""
+
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._children[()].dec(amount)
+
+    def set(self, value: float) -> None:
+        self._children[()].set(value)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of the block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self, name: str, labels: str, labelnames, key) -> Iterator[Tuple[str, str, float]]:
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + [float('inf')], counts):
+            cumulative += count
+            yield f"{name}_bucket", _format_labels(labelnames, key, f'le="{_format_value(float(bound))}"'), cumulative
+        yield f"{name}_sum", labels, total
+        yield f"{name}_count", labels, cumulative
+
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+
+class MeasuredBody:
+    """
+    Wraps a streamed response body, counting the bytes sent.
+
+    `on_close(size)` is called once when the server closes the body, whether
+    it was sent completely, cut short by the client or never started.
+    """
+
+    def __init__(self, body, on_close: Callable[[int], None]):
+        self.body = body
+        self.size = 0
+        self._on_close = on_close
+
+    def __iter__(self):
+        for piece in self.body:
+            self.size += len(piece)
+            yield piece
+
+    def close(self) -> None:
+        try:
+            if hasattr(self.body, 'close'):
+                self.body.close()
+        finally:
+            if self._on_close is not None:
+                on_close, self._on_close = self._on_close, None
+                on_close(self.size)
+
+
+class MetricsRegistry:
+    """Named metrics of one process; registering a name twice returns the existing metric"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered with another type or labels")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Every metric in the text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the stacks of every thread from a background thread.
+
+    Nothing is sampled until start() is called, so it can stay installed in
+    production and be switched on while a problem is happening.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: StackCounter = StackCounter()
+        self.samples = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None, reset: bool = True) -> None:
+        """Start sampling; a running profiler only takes the new interval"""
+        if interval:
+            self.interval = interval
+        if self.running:
+            return
+        if reset:
+            self.reset()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler started, every {self.interval * 1000:.1f} ms")
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        logger.info(f"Sampling profiler stopped after {self.samples} samples")
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stacks = StackCounter()
+            self.samples = 0
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, frame in frames.items():
+                    if thread_id == own:
+                        continue
+                    self.stacks[self._fold(frame)] += 1
+                self.samples += 1
+
+    def _fold(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def folded(self, limit: Optional[int] = None) -> str:
+        """Collected stacks, most frequent first, in the folded format"""
+        with self._lock:
+            stacks = self.stacks.most_common(limit)
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks)
+
+
+class MetricsServer:
+    """
+    Serves a registry (and a profiler) over HTTP from a daemon thread.
+
+    Args:
+        registry (MetricsRegistry): Metrics to expose
+        port (int): TCP port
+        host (str): Interface to bind, the loopback interface by default
+        profiler (SamplingProfiler, optional): Profiler controlled under /profile
+    """
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = '127.0.0.1',
+                 profiler: Optional[SamplingProfiler] = None):
+        self.registry = registry
+        self.profiler = profiler or SamplingProfiler()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.profiler.stop()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/metrics':
+                    self._send(200, server.registry.render(), CONTENT_TYPE)
+                elif url.path == '/profile':
+                    limit = parse_qs(url.query).get('limit', [None])[0]
+                    self._send(200, server.profiler.folded(int(limit) if limit else None))
+                else:
+                    self._send(404, 'Not found\n')
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                if url.path == '/profile/start':
+                    interval = parse_qs(url.query).get('interval', [None])[0]
+                    try:
+                        server.profiler.start(float(interval) if interval else None)
+                    except ValueError:
+                        self._send(400, 'interval must be a number of seconds\n')
+                        return
+                    self._send(200, 'started\n')
+                elif url.path == '/profile/stop':
+                    server.profiler.stop()
+                    self._send(200, f'stopped after {server.profiler.samples} samples\n')
+                else:
+                    self._send(404, 'Not found\n')
+
+            def _send(self, status: int, body: str, content_type: str = 'text/plain; charset=utf-8'):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+
+def start_metrics_server(port: Optional[int], registry: MetricsRegistry = REGISTRY,
+                         host: str = '127.0.0.1') -> Optional[MetricsServer]:
+    """
+    Start serving `registry` on a local port.
+
+    Args:
+        port (int, optional): TCP port, None or 0 disables the server
+        registry (MetricsRegistry): Metrics to expose
+        host (str): Interface to bind
+
+    Returns:
+        Optional[MetricsServer]: The running server, None if disabled or the
+            port could not be bound
+    """
+    if not port:
+        return None
+    try:
+        server = MetricsServer(registry, port, host)
+    except OSError as e:
+        logger.warning(f"Metrics server not started on {host}:{port}: {e}")
+        return None
+    server.start()
+    if os.getenv('METRICS_PROFILER') == '1':
+        server.profiler.start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,63 @@
+-- Migration 001: cluster player_tracking_data on (player_id, timestamp_micros)
+-- and range-partition it by day.
+--
+-- get_player_data (WHERE player_id = ? AND timestamp_micros BETWEEN ? AND ?)
+-- and get_player_latest_data (ORDER BY timestamp_micros DESC LIMIT 1) become a
+-- range scan / single lookup on the clustered primary key instead of a full
+-- table scan.
+--
+-- The ALTERs rebuild the table; run this in a maintenance window. The foreign
+-- key names below are the InnoDB defaults from locusSportsDB.sql, check them
+-- with SHOW CREATE TABLE player_tracking_data if the schema was created by hand.
+USE locusSports;
+
+-- Partitioned tables cannot have foreign keys.
+ALTER TABLE player_tracking_data
+    DROP FOREIGN KEY player_tracking_data_ibfk_1,
+    DROP FOREIGN KEY player_tracking_data_ibfk_2;
+
+-- Rows without a player or timestamp can never be read back by the API and
+-- would block the NOT NULL primary key columns.
+DELETE FROM player_tracking_data
+WHERE player_id IS NULL OR timestamp_micros IS NULL;
+
+ALTER TABLE player_tracking_data
+    MODIFY id BIGINT NOT NULL AUTO_INCREMENT,
+    MODIFY player_id VARCHAR(255) NOT NULL,
+    MODIFY timestamp_micros BIGINT NOT NULL,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (player_id, timestamp_micros, id),
+    ADD KEY idx_tracking_id (id),
+    DROP KEY player_id,
+    DROP KEY tag_id,
+    ADD KEY idx_tracking_tag (tag_id);
+
+-- One partition per UTC day from the oldest row up to today, and p_future
+-- for everything later, so that existing history can be dropped a day at a
+-- time (archive.run_retention). DatabaseHandler.ensure_daily_partitions()
+-- then splits the coming days, and any rows that reached p_future, off
+-- p_future the same way (the gateway calls it on start-up). MySQL allows
+-- 8192 partitions, about 22 years.
+SET time_zone = '+00:00';
+SET SESSION group_concat_max_len = 1048576;
+SET SESSION cte_max_recursion_depth = 10000;
+SET @today = UNIX_TIMESTAMP(UTC_DATE());
+SET @first_day = LEAST(@today, COALESCE(
+    (SELECT MIN(timestamp_micros) DIV 86400000000 * 86400 FROM player_tracking_data), @today));
+SET @partitions = (
+    WITH RECURSIVE days (day) AS (
+        SELECT @first_day
+        UNION ALL
+        SELECT day + 86400 FROM days WHERE day < @today
+    )
+    SELECT GROUP_CONCAT(
+        CONCAT('PARTITION p', DATE_FORMAT(FROM_UNIXTIME(day), '%Y%m%d'),
+               ' VALUES LESS THAN (', (day + 86400) * 1000000, ')')
+        ORDER BY day SEPARATOR ', ')
+    FROM days
+);
+SET @ddl = CONCAT('ALTER TABLE player_tracking_data PARTITION BY RANGE (timestamp_micros) (',
+                  @partitions, ', PARTITION p_future VALUES LESS THAN MAXVALUE)');
+PREPARE partition_by_day FROM @ddl;
+EXECUTE partition_by_day;
+DEALLOCATE PREPARE partition_by_day;
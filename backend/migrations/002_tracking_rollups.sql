@@ -0,0 +1,25 @@
+-- Migration 002: per-second and per-minute rollup tables.
+--
+-- The batched writer keeps these up to date from here on. Backfill existing
+-- history with:
+--     python rollups.py --player <player_id> --start <micros> --end <micros>
+USE locusSports;
+
+CREATE TABLE player_tracking_1s (
+    player_id VARCHAR(255) NOT NULL,
+    bucket_micros BIGINT NOT NULL,
+    sample_count INT NOT NULL,
+    accel_mag_min FLOAT,
+    accel_mag_max FLOAT,
+    accel_mag_sum DOUBLE,
+    distance DOUBLE,
+    speed_sum DOUBLE,
+    peak_speed FLOAT,
+    step_count INT,
+    jump_count INT,
+    heart_rate_sum BIGINT,
+    heart_rate_count INT,
+    PRIMARY KEY (player_id, bucket_micros)
+);
+
+CREATE TABLE player_tracking_1m LIKE player_tracking_1s;
@@ -0,0 +1,22 @@
+-- Migration 003: per-player summary and session index.
+--
+-- /api/player-time-range answers from these instead of a MIN/MAX GROUP BY
+-- over player_tracking_data. The batched writer keeps them up to date from
+-- here on. Backfill existing history with:
+--     python sessions.py --player <player_id>
+USE locusSports;
+
+CREATE TABLE player_tracking_summary (
+    player_id VARCHAR(255) NOT NULL PRIMARY KEY,
+    first_micros BIGINT NOT NULL,
+    last_micros BIGINT NOT NULL,
+    sample_count BIGINT NOT NULL
+);
+
+CREATE TABLE player_sessions (
+    player_id VARCHAR(255) NOT NULL,
+    start_micros BIGINT NOT NULL,
+    end_micros BIGINT NOT NULL,
+    sample_count BIGINT NOT NULL,
+    PRIMARY KEY (player_id, start_micros)
+);
@@ -0,0 +1,10 @@
+-- Migration 004: position the gateway's spool drainer has loaded up to.
+--
+-- Committed in the same transaction as the rows it loads, see spool.py.
+USE locusSports;
+
+CREATE TABLE spool_positions (
+    spool_name VARCHAR(64) NOT NULL PRIMARY KEY,
+    segment BIGINT NOT NULL,
+    record BIGINT NOT NULL
+);
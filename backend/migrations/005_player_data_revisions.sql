@@ -0,0 +1,13 @@
+-- Migration 005: per-player revision of past tracking data.
+--
+-- Bumped whenever rows land in a window the analytics cache already treats
+-- as final (late rows from the spool, retention); the cache compares it
+-- before serving such windows, see analytics_cache.py. The row with an
+-- empty player_id applies to every player.
+USE locusSports;
+
+CREATE TABLE player_data_revisions (
+    player_id VARCHAR(255) NOT NULL PRIMARY KEY,
+    revision BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
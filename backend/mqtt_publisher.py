@@ -0,0 +1,213 @@
+import asyncio
+import json
+import logging
+import struct
+from typing import Dict, Any, List
+
+import numpy as np
+
+from frame_decoder import FRAME_DTYPE, FRAME_FIELDS
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:  # msgpack encoding is optional
+    msgpack = None
+
+COMPACT_VERSION = 1
+
+# version, tag id length, sample count, first timestamp (micros)
+_COMPACT_HEADER = struct.Struct("<BBHq")
+
+STAGE_SECONDS = REGISTRY.histogram('gateway_stage_seconds', 'Time spent per pipeline stage and batch', ['stage'])
+
+
+def json_documents(tag_id: str, player_info: Dict[str, Any], columns: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """
+    Expand a decoded column batch into the per-sample JSON documents published on MQTT.
+
+    Args:
+        tag_id (str): The tag ID the frames came from
+        player_info (dict): Player linked to the tag
+        columns (dict): Decoded column arrays
+
+    Returns:
+        list: One document per sample
+    """
+    return [
+        {
+            "x_position": x, "y_position": y,
+            "accelerometer": {"x": ax, "y": ay, "z": az},
+            "gyroscope": {"x": gx, "y": gy, "z": gz},
+            "battery_life": battery, "heart_rate": hr,
+            "serial_number": serial, "activity_status": status,
+            "tag_id": tag_id, "timestamp_micros": ts,
+            "player": player_info
+        }
+        for x, y, ax, ay, az, gx, gy, gz, battery, hr, serial, status, ts in zip(
+            *(columns[name].tolist() for name in FRAME_FIELDS),
+            columns['timestamp_micros'].tolist()
+        )
+    ]
+
+
+def encode_compact(tag_id: str, columns: Dict[str, np.ndarray]) -> bytes:
+    """
+    Encode a column batch as one compact binary frame.
+
+    Layout (little endian):
+        uint8   version (COMPACT_VERSION)
+        uint8   length of the tag id
+        uint16  sample count n
+        int64   timestamp of the first sample, epoch microseconds
+        bytes   tag id, UTF-8
+        uint32  n timestamp offsets from the first sample, microseconds
+        bytes   n sensor records in the 36-byte BLE wire layout ("<8f4B")
+
+    Args:
+        tag_id (str): Tag the samples belong to
+        columns (dict): Decoded column arrays
+
+    Returns:
+        bytes: The encoded frame
+    """
+    tag = tag_id.encode()
+    timestamps = columns['timestamp_micros']
+    records = np.empty(len(timestamps), dtype=FRAME_DTYPE)
+    for name in FRAME_FIELDS:
+        records[name] = columns[name]
+    offsets = (timestamps - timestamps[0]).astype('<u4')
+    return b"".join((
+        _COMPACT_HEADER.pack(COMPACT_VERSION, len(tag), len(timestamps), int(timestamps[0])),
+        tag,
+        offsets.tobytes(),
+        records.tobytes()
+    ))
+
+
+def decode_compact(payload: bytes) -> Dict[str, Any]:
+    """
+    Decode a frame produced by encode_compact.
+
+    Returns:
+        dict: 'tag_id' plus one array per column, including 'timestamp_micros'
+    """
+    version, tag_length, n, first_ts = _COMPACT_HEADER.unpack_from(payload)
+    if version != COMPACT_VERSION:
+        raise ValueError(f"Unsupported compact frame version {version}")
+    offset = _COMPACT_HEADER.size
+    tag_id = payload[offset:offset + tag_length].decode()
+    offset += tag_length
+    offsets = np.frombuffer(payload, dtype='<u4', count=n, offset=offset)
+    offset += 4 * n
+    records = np.frombuffer(payload, dtype=FRAME_DTYPE, count=n, offset=offset)
+    decoded = {name: records[name] for name in FRAME_FIELDS}
+    decoded['timestamp_micros'] = first_ts + offsets.astype(np.int64)
+    decoded['tag_id'] = tag_id
+    return decoded
+
+
+def encode_msgpack(tag_id: str, columns: Dict[str, np.ndarray]) -> bytes:
+    """Encode a column batch as a msgpack map of column lists (floats as float32)"""
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    timestamps = columns['timestamp_micros']
+    document = {name: columns[name].tolist() for name in FRAME_FIELDS}
+    document['tag_id'] = tag_id
+    document['ts0'] = int(timestamps[0])
+    document['dt'] = (timestamps - timestamps[0]).tolist()
+    return msgpack.packb(document, use_single_float=True)
+
+
+class JsonPublisher:
+    """Legacy publisher: one JSON document with the full player object per sample"""
+
+    def __init__(self, mqtt_client, base_topic: str):
+        self.mqtt_client = mqtt_client
+        self.base_topic = base_topic
+
+    def publish(self, tag_id: str, player_info: Dict[str, Any], columns: Dict[str, np.ndarray]) -> None:
+        topic = f"{self.base_topic}/{tag_id}"
+        for document in json_documents(tag_id, player_info, columns):
+            self.mqtt_client.publish(topic, json.dumps(document))
+
+    @property
+    def pending_samples(self) -> int:
+        return 0
+
+    async def run(self) -> None:
+        """Nothing is buffered in JSON mode"""
+
+
+class CompactPublisher:
+    """
+    Batched publisher for sensor columns.
+
+    Samples are buffered per tag and published every `interval` seconds as a
+    single frame on <base_topic>/<tag_id>/compact, encoded with
+    encode_compact ('binary') or encode_msgpack ('msgpack'). The player object
+    is published on the retained topic <base_topic>/<tag_id>/player only when
+    it changes.
+    """
+
+    def __init__(self, mqtt_client, base_topic: str, interval: float = 0.2, encoding: str = "binary"):
+        if encoding not in ("binary", "msgpack"):
+            raise ValueError(f"Unknown compact encoding {encoding!r}")
+        if encoding == "msgpack" and msgpack is None:
+            raise RuntimeError("msgpack encoding requested but msgpack is not installed")
+        self.mqtt_client = mqtt_client
+        self.base_topic = base_topic
+        self.interval = interval
+        self.encode = encode_compact if encoding == "binary" else encode_msgpack
+        self._pending: Dict[str, List[Dict[str, np.ndarray]]] = {}
+        self._players: Dict[str, Dict[str, Any]] = {}
+
+    def publish(self, tag_id: str, player_info: Dict[str, Any], columns: Dict[str, np.ndarray]) -> None:
+        if self._players.get(tag_id) != player_info:
+            self._players[tag_id] = player_info
+            self.mqtt_client.publish(f"{self.base_topic}/{tag_id}/player", json.dumps(player_info), retain=True)
+        self._pending.setdefault(tag_id, []).append(columns)
+
+    @property
+    def pending_samples(self) -> int:
+        """Samples buffered for the next publishing tick"""
+        return sum(len(batch['timestamp_micros']) for batches in list(self._pending.values()) for batch in batches)
+
+    def flush(self) -> None:
+        """Publish everything buffered so far, one message per tag"""
+        pending, self._pending = self._pending, {}
+        for tag_id, batches in pending.items():
+            columns = batches[0] if len(batches) == 1 else {
+                name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]
+            }
+            # The uint16 sample count caps one message at 65535 samples
+            for start in range(0, len(columns['timestamp_micros']), 0xFFFF):
+                part = {name: values[start:start + 0xFFFF] for name, values in columns.items()}
+                self.mqtt_client.publish(f"{self.base_topic}/{tag_id}/compact", self.encode(tag_id, part))
+
+    async def run(self) -> None:
+        """Flush on every publishing tick"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                with STAGE_SECONDS.labels('publish_flush').time():
+                    self.flush()
+            except Exception as e:
+                logger.error(f"Error publishing compact frames: {e}")
+
+
+def create_publisher(mode: str, mqtt_client, base_topic: str, interval: float = 0.2):
+    """
+    Build the publisher for a publishing mode.
+
+    Args:
+        mode (str): 'json' (default, per-sample documents), 'binary' or 'msgpack'
+        mqtt_client: Connected paho MQTT client
+        base_topic (str): Topic prefix, the tag ID is appended
+        interval (float): Publishing tick for the compact modes, in seconds
+    """
+    if mode == "json":
+        return JsonPublisher(mqtt_client, base_topic)
+    return CompactPublisher(mqtt_client, base_topic, interval=interval, encoding=mode)
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+import traceback
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Iterable, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Marks a failed lookup (network error, bad response) as opposed to a tag
+# that genuinely has no player linked
+_LOOKUP_FAILED = object()
+
+
+class PlayerLookupError(Exception):
+    """The tag API could not be asked and nothing is cached for the tag"""
+
+
+class PlayerInfoCache:
+    """
+    Tag -> player lookup cache in front of the /api/tag/tagInfo endpoint.
+
+    - Entries are fresh for `ttl` seconds and least recently used tags are
+      evicted beyond `max_entries`.
+    - After `ttl` an entry is served stale for up to `stale_ttl` seconds while
+      a single background request refreshes it, so a slow or unavailable tag
+      API never holds up ingestion of a tag that has been seen before.
+    - Concurrent lookups of the same uncached tag share one request.
+    - Tags the API reports as unknown or unassigned are cached for
+      `negative_ttl` seconds.
+    - All requests go through one pooled aiohttp session.
+    """
+
+    def __init__(self, base_url: str, token: str, ttl: float = 300.0, stale_ttl: float = 3600.0,
+                 negative_ttl: float = 30.0, max_entries: int = 1024, request_timeout: float = 2.0,
+                 max_connections: int = 10):
+        self.base_url = base_url
+        self.token = token
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.request_timeout = request_timeout
+        self.max_connections = max_connections
+
+        # tag_id -> (player_info, fresh_until, stale_until)
+        self._entries: "OrderedDict[str, Tuple[Optional[Dict[str, Any]], float, float]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self) -> None:
+        """Open the shared HTTP session"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+                headers={
+                    'Authorization': self.token,
+                    'Content-Type': 'application/json'
+                }
+            )
+
+    async def close(self) -> None:
+        """Cancel pending refreshes and close the shared HTTP session"""
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def get(self, tag_id: str, raise_on_failure: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Look up the player linked to a tag.
+
+        Args:
+            tag_id (str): The tag ID to look up
+            raise_on_failure (bool): Raise PlayerLookupError instead of
+                returning None when the lookup failed with nothing cached
+
+        Returns:
+            Optional[Dict[str, Any]]: Player information, or None if no player
+                is linked, the tag is unknown, or the lookup failed with nothing cached
+        """
+        entry = self._entries.get(tag_id)
+        now = time.monotonic()
+
+        if entry is not None:
+            player_info, fresh_until, stale_until = entry
+            if now < stale_until:
+                self._entries.move_to_end(tag_id)
+                if now >= fresh_until:
+                    self._refresh(tag_id)
+                return player_info
+
+        result = await asyncio.shield(self._refresh(tag_id))
+        if result is _LOOKUP_FAILED:
+            # Better an expired mapping than dropping the sample
+            if entry is not None:
+                return entry[0]
+            if raise_on_failure:
+                raise PlayerLookupError(f"Player lookup for tag {tag_id} failed")
+            return None
+        return result
+
+    async def warm_up(self, tag_ids: Iterable[str]) -> None:
+        """Fetch several tags concurrently so the first packets hit the cache"""
+        tag_ids = list(tag_ids)
+        await asyncio.gather(*(self.get(tag_id) for tag_id in tag_ids))
+        logger.info(f"Warmed player info cache with {len(tag_ids)} tags")
+
+    def invalidate(self, tag_id: Optional[str] = None) -> None:
+        """Drop one tag, or every tag if omitted, from the cache"""
+        if tag_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(tag_id, None)
+
+    def _refresh(self, tag_id: str) -> asyncio.Task:
+        """Start a lookup for the tag unless one is already running"""
+        task = self._inflight.get(tag_id)
+        if task is None:
+            task = asyncio.create_task(self._load(tag_id))
+            self._inflight[tag_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(tag_id, None))
+        return task
+
+    async def _load(self, tag_id: str):
+        result = await self._fetch(tag_id)
+        if result is _LOOKUP_FAILED:
+            return result
+
+        fresh_until = time.monotonic() + (self.ttl if result else self.negative_ttl)
+        stale_until = fresh_until + self.stale_ttl if result else fresh_until
+        self._entries[tag_id] = (result, fresh_until, stale_until)
+        self._entries.move_to_end(tag_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return result
+
+    async def _fetch(self, tag_id: str):
+        """Request the player for a tag from the API"""
+        try:
+            await self.start()
+            url = f"{self.base_url}/{tag_id}"
+            async with self._session.get(url) as response:
+                logger.debug(f"API request to {url} returned status: {response.status}")
+
+                if response.status == 500:
+                    logger.error("Server error occurred. Token might be invalid.")
+                    return _LOOKUP_FAILED
+
+                if response.status == 404:
+                    logger.warning(f"Tag {tag_id} not found in database")
+                    return None
+
+                if response.content_type == 'application/json':
+                    response_data = await response.json()
+                    if response_data.get("status") == "success":
+                        return response_data.get("data", {}).get("player")
+                    logger.error(f"API request failed: {response_data}")
+                    return _LOOKUP_FAILED
+
+                logger.error(f"Unexpected response content type: {response.content_type}")
+                return _LOOKUP_FAILED
+
+        except asyncio.TimeoutError:
+            logger.error(f"Timed out fetching player info for tag {tag_id}")
+            return _LOOKUP_FAILED
+        except aiohttp.ClientError as e:
+            logger.error(f"Network error fetching player info: {e}")
+            return _LOOKUP_FAILED
+        except Exception as e:
+            logger.error(f"Unexpected error fetching player info: {e}")
+            logger.error(traceback.format_exc())
+            return _LOOKUP_FAILED
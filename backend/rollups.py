@@ -0,0 +1,283 @@
+"""
+Incremental per-second and per-minute rollups of player tracking data.
+
+RollupBuilder turns consecutive column batches of a player into rollup rows
+for player_tracking_1s and player_tracking_1m. Derived metrics (speed,
+trapezoidal distance, step and jump detection) carry their state across
+batches so the rollups agree with computing over the raw rows. Rows hold sums
+and counts and are merged into existing buckets by
+DatabaseHandler.upsert_rollups.
+
+Steps and jumps are counted over the player's continuous stream, so the
+counts of a bucket do not depend on which window it is read in. Raw
+analytics (analytics.detect_steps / detect_jumps) restart at the start of
+every window instead: steps count only after the window's first rising
+crossing, the jump filter restarts, peaks 2-5 samples into the window are
+rejected (JUMP_MIN_DISTANCE) and the last sample is never a peak. A window
+answered from rollups (resolution '1s' or '1m') can therefore count about
+one step and a few jumps more or fewer at each end than the same window at
+resolution 'raw', on top of being read in whole buckets.
+
+Run as a script to rebuild the rollups of a player from the raw rows:
+    python rollups.py --player <player_id> --start <micros> --end <micros>
+"""
+import argparse
+import copy
+import logging
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from analytics import (GRAVITY, JUMP_FILTER_ALPHA, JUMP_THRESHOLD, STEP_THRESHOLD,
+                       lowpass, local_peaks, step_edges)
+
+logger = logging.getLogger(__name__)
+
+# Rollup table -> bucket width in microseconds
+ROLLUP_TABLES = {
+    'player_tracking_1s': 1_000_000,
+    'player_tracking_1m': 60_000_000,
+}
+
+ROLLUP_COLUMNS = (
+    'player_id', 'bucket_micros', 'sample_count',
+    'accel_mag_min', 'accel_mag_max', 'accel_mag_sum',
+    'distance', 'speed_sum', 'peak_speed',
+    'step_count', 'jump_count',
+    'heart_rate_sum', 'heart_rate_count'
+)
+
+
+class PlayerRollupState:
+    """Per-player carry-over between consecutive batches"""
+
+    def __init__(self):
+        self.last_ts = None
+        self.last_x = 0.0
+        self.last_y = 0.0
+        self.last_speed = 0.0
+        self.prev_acc = -1.0
+        self.rising_seen = False
+        self.filtered = None
+        # Last two filtered samples; the newest still needs its right neighbour
+        # before it can be tested as a jump peak
+        self.tail_filtered: List[float] = []
+        self.tail_ts: List[int] = []
+
+
+def columns_from_sample(tracking_data: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Wrap one decoded sample dict as a single-row column batch"""
+    return {
+        'timestamp_micros': np.array([tracking_data['timestamp_micros']], dtype=np.int64),
+        'x_position': np.array([tracking_data['x_position']]),
+        'y_position': np.array([tracking_data['y_position']]),
+        'accel_x': np.array([tracking_data['accelerometer']['x']]),
+        'accel_y': np.array([tracking_data['accelerometer']['y']]),
+        'accel_z': np.array([tracking_data['accelerometer']['z']]),
+        'heart_rate': np.array([tracking_data['heart_rate']]),
+        'activity_status': np.array([tracking_data.get('activity_status', 1)]),
+    }
+
+
+def sample_metrics(state: PlayerRollupState, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Derive per-sample metrics for one batch and advance the player state.
+
+    Step and jump detection continue across batches rather than restarting
+    like the raw per-window analytics, see the module docstring.
+
+    Returns:
+        dict: 'acc_magnitude', 'speed', 'distance' (trapezoidal increment),
+            'step' (bool, a step ends at this sample) and 'jump_ts'
+            (timestamps of detected jump peaks)
+    """
+    ts = columns['timestamp_micros'].astype(np.int64)
+    x = columns['x_position'].astype(np.float64)
+    y = columns['y_position'].astype(np.float64)
+    ax = columns['accel_x'].astype(np.float64)
+    ay = columns['accel_y'].astype(np.float64)
+    az = columns['accel_z'].astype(np.float64)
+
+    acc = np.sqrt(ax**2 + ay**2 + az**2) - GRAVITY
+
+    # Speed from consecutive positions, first sample of a player has speed 0
+    if state.last_ts is None:
+        prev_ts = np.concatenate(([ts[0]], ts[:-1]))
+        prev_x = np.concatenate(([x[0]], x[:-1]))
+        prev_y = np.concatenate(([y[0]], y[:-1]))
+        prev_speed0 = 0.0
+    else:
+        prev_ts = np.concatenate(([state.last_ts], ts[:-1]))
+        prev_x = np.concatenate(([state.last_x], x[:-1]))
+        prev_y = np.concatenate(([state.last_y], y[:-1]))
+        prev_speed0 = state.last_speed
+    dt = (ts - prev_ts) / 1_000_000
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed = np.where(dt > 0, np.sqrt((x - prev_x)**2 + (y - prev_y)**2) / dt, 0.0)
+    prev_speed = np.concatenate(([prev_speed0], speed[:-1]))
+    distance = (speed + prev_speed) * dt / 2
+
+    # Steps: a step ends on a falling threshold crossing once any step has begun
+    rising, falling = step_edges(acc, STEP_THRESHOLD, state.prev_acc)
+    step = falling & (state.rising_seen | (np.cumsum(rising) > 0))
+
+    # Jumps: strict local maxima of the low-passed magnitude above the threshold
+    filtered = lowpass(acc, JUMP_FILTER_ALPHA, state.filtered)
+    ext = np.concatenate((state.tail_filtered, filtered))
+    ext_ts = np.concatenate((np.asarray(state.tail_ts, dtype=np.int64), ts))
+    # ext[0] is either the first sample ever or was tested with the previous batch
+    peaks = local_peaks(ext, JUMP_THRESHOLD)
+
+    state.last_ts = int(ts[-1])
+    state.last_x = float(x[-1])
+    state.last_y = float(y[-1])
+    state.last_speed = float(speed[-1])
+    state.prev_acc = float(acc[-1])
+    state.rising_seen = state.rising_seen or bool(rising.any())
+    state.filtered = float(filtered[-1])
+    state.tail_filtered = ext[-2:].tolist()
+    state.tail_ts = ext_ts[-2:].tolist()
+
+    return {
+        'acc_magnitude': acc,
+        'speed': speed,
+        'distance': distance,
+        'step': step,
+        'jump_ts': ext_ts[peaks],
+    }
+
+
+def bucket_rows(player_id: str, ts: np.ndarray, metrics: Dict[str, np.ndarray],
+                heart_rate: np.ndarray, bucket_micros: int) -> List[tuple]:
+    """
+    Aggregate per-sample metrics into rollup rows of `bucket_micros` width.
+
+    Returns:
+        list: Row tuples in ROLLUP_COLUMNS order
+    """
+    buckets = ts // bucket_micros * bucket_micros
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    acc = metrics['acc_magnitude']
+    hr = heart_rate.astype(np.int64)
+    hr_valid = hr > 0
+
+    counts = np.diff(np.append(starts, len(ts)))
+    acc_min = np.minimum.reduceat(acc, starts)
+    acc_max = np.maximum.reduceat(acc, starts)
+    acc_sum = np.add.reduceat(acc, starts)
+    distance = np.add.reduceat(metrics['distance'], starts)
+    speed_sum = np.add.reduceat(metrics['speed'], starts)
+    peak_speed = np.maximum.reduceat(metrics['speed'], starts)
+    steps = np.add.reduceat(metrics['step'].astype(np.int64), starts)
+    hr_sum = np.add.reduceat(np.where(hr_valid, hr, 0), starts)
+    hr_count = np.add.reduceat(hr_valid.astype(np.int64), starts)
+
+    jump_buckets = metrics['jump_ts'] // bucket_micros * bucket_micros
+    jumps: Dict[int, int] = {}
+    for bucket in jump_buckets.tolist():
+        jumps[bucket] = jumps.get(bucket, 0) + 1
+
+    rows = []
+    for i, bucket in enumerate(buckets[starts].tolist()):
+        rows.append((
+            player_id, bucket, int(counts[i]),
+            float(acc_min[i]), float(acc_max[i]), float(acc_sum[i]),
+            float(distance[i]), float(speed_sum[i]), float(peak_speed[i]),
+            int(steps[i]), jumps.pop(bucket, 0),
+            int(hr_sum[i]), int(hr_count[i])
+        ))
+    # Peaks confirmed for the last sample of the previous batch
+    for bucket, count in jumps.items():
+        rows.append((player_id, bucket, 0, None, None, 0.0, 0.0, 0.0, None, 0, count, 0, 0))
+    return rows
+
+
+class RollupBuilder:
+    """Builds rollup rows from successive column batches, keeping per-player state"""
+
+    def __init__(self):
+        self.states: Dict[str, PlayerRollupState] = {}
+
+    def add(self, player_id: str, columns: Dict[str, np.ndarray], rollups: Dict[str, List[tuple]]) -> None:
+        """
+        Add one batch of a player and append its rows to `rollups`.
+
+        Args:
+            player_id (str): Player the samples belong to
+            columns (dict): Column arrays, ordered by timestamp
+            rollups (dict): Rollup table -> rows, extended in place
+        """
+        if len(columns['timestamp_micros']) == 0:
+            return
+        state = self.states.get(player_id)
+        if state is None:
+            state = self.states[player_id] = PlayerRollupState()
+        metrics = sample_metrics(state, columns)
+        ts = columns['timestamp_micros'].astype(np.int64)
+        for table, bucket_micros in ROLLUP_TABLES.items():
+            rollups.setdefault(table, []).extend(
+                bucket_rows(player_id, ts, metrics, columns['heart_rate'], bucket_micros)
+            )
+
+    def reset(self, player_id: str) -> None:
+        """Forget the carry-over state of a player"""
+        self.states.pop(player_id, None)
+
+    def snapshot(self, player_ids) -> Dict[str, Optional[PlayerRollupState]]:
+        """Copy of the carry-over state of some players, for restore()"""
+        return {player_id: copy.deepcopy(self.states.get(player_id)) for player_id in player_ids}
+
+    def restore(self, snapshot: Dict[str, Optional[PlayerRollupState]]) -> None:
+        """
+        Put back state taken by snapshot(), e.g. when the rows built since
+        were not committed and the same samples will be added again
+        """
+        for player_id, state in snapshot.items():
+            if state is None:
+                self.states.pop(player_id, None)
+            else:
+                self.states[player_id] = state
+
+
+def backfill(db_handler, player_id: str, start_time: int, end_time: int,
+             chunk_micros: int = 3600 * 1_000_000) -> int:
+    """
+    Rebuild the rollups of a player for a time range from the raw rows.
+
+    The range is widened to whole minutes and existing rollup rows in it are
+    replaced.
+
+    Returns:
+        int: Number of raw samples processed
+    """
+    minute = ROLLUP_TABLES['player_tracking_1m']
+    start_time = start_time // minute * minute
+    end_time = -(-end_time // minute) * minute
+    db_handler.delete_rollups(player_id, start_time, end_time)
+
+    builder = RollupBuilder()
+    processed = 0
+    for chunk_start in range(start_time, end_time, chunk_micros):
+        chunk_end = min(chunk_start + chunk_micros, end_time)
+        columns = db_handler.get_player_columns(player_id, chunk_start, chunk_end - 1)
+        if len(columns['timestamp_micros']) == 0:
+            continue
+        rollups: Dict[str, List[tuple]] = {}
+        builder.add(player_id, columns, rollups)
+        db_handler.upsert_rollups(rollups)
+        processed += len(columns['timestamp_micros'])
+    logger.info(f"Rebuilt rollups for player {player_id} from {processed} samples")
+    return processed
+
+
+if __name__ == '__main__':
+    from database_handler import DatabaseHandler
+
+    parser = argparse.ArgumentParser(description="Rebuild tracking rollups from raw rows")
+    parser.add_argument('--player', required=True, help="player_id to rebuild")
+    parser.add_argument('--start', type=int, required=True, help="start time, epoch microseconds")
+    parser.add_argument('--end', type=int, required=True, help="end time, epoch microseconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)-15s %(name)-8s %(levelname)s: %(message)s")
+    backfill(DatabaseHandler(), args.player, args.start, args.end)
@@ -0,0 +1,176 @@
+"""
+Per-player data summary and session index, maintained at ingest.
+
+SessionTracker turns consecutive batches of a player into rows for
+
+    player_tracking_summary  first/last timestamp and sample count per player
+    player_sessions          one row per session, keyed by its start
+
+A session is a run of active samples (activity_status != 0) without a gap
+longer than `gap_seconds` between consecutive samples; an inactive sample
+or a long gap ends it. The session being recorded carries across batches,
+so every batch upserts the same (player_id, start_micros) row until the
+session ends. Rows hold counts and bounds and are merged by
+DatabaseHandler.upsert_sessions.
+
+Run as a script to rebuild the summary and sessions of a player from the raw rows:
+    python sessions.py --player <player_id>
+"""
+import argparse
+import copy
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SESSION_GAP_SECONDS = 300
+
+SUMMARY_COLUMNS = ('player_id', 'first_micros', 'last_micros', 'sample_count')
+SESSION_COLUMNS = ('player_id', 'start_micros', 'end_micros', 'sample_count')
+
+
+class PlayerSessionState:
+    """Per-player carry-over between consecutive batches"""
+
+    def __init__(self, last_ts: Optional[int] = None, active: bool = False, session_start: Optional[int] = None):
+        self.last_ts = last_ts
+        self.active = active
+        # Start of the session the last sample belongs to, None when inactive
+        self.session_start = session_start
+
+
+class SessionTracker:
+    """
+    Builds summary and session rows from successive batches, keeping per-player state.
+
+    Args:
+        gap_seconds (float): Longest pause between samples within one session
+        load_latest (callable, optional): player_id -> (start_micros, end_micros)
+            of the newest stored session or None; used the first time a player
+            is seen so a restart continues the open session instead of starting
+            a new one
+    """
+
+    def __init__(self, gap_seconds: float = SESSION_GAP_SECONDS,
+                 load_latest: Optional[Callable[[str], Optional[Tuple[int, int]]]] = None):
+        self.gap_micros = int(gap_seconds * 1_000_000)
+        self.load_latest = load_latest
+        self.states: Dict[str, PlayerSessionState] = {}
+
+    def _state(self, player_id: str) -> PlayerSessionState:
+        state = self.states.get(player_id)
+        if state is None:
+            latest = self.load_latest(player_id) if self.load_latest else None
+            state = PlayerSessionState(latest[1], True, latest[0]) if latest else PlayerSessionState()
+            self.states[player_id] = state
+        return state
+
+    def add(self, player_id: str, columns: Dict[str, np.ndarray], sessions: Dict[str, List[tuple]]) -> None:
+        """
+        Add one batch of a player and append its rows to `sessions`.
+
+        Args:
+            player_id (str): Player the samples belong to
+            columns (dict): Column arrays ordered by timestamp; without an
+                activity_status column every sample counts as active
+            sessions (dict): 'player_tracking_summary' and 'player_sessions'
+                -> rows in SUMMARY_COLUMNS / SESSION_COLUMNS order, extended in place
+        """
+        ts = np.asarray(columns['timestamp_micros'], dtype=np.int64)
+        n = len(ts)
+        if n == 0:
+            return
+        status = columns.get('activity_status')
+        active = np.ones(n, dtype=bool) if status is None else np.asarray(status) != 0
+        state = self._state(player_id)
+
+        sessions.setdefault('player_tracking_summary', []).append(
+            (player_id, int(ts.min()), int(ts.max()), n))
+
+        prev_ts = np.concatenate(([state.last_ts if state.last_ts is not None else ts[0]], ts[:-1]))
+        prev_active = np.concatenate(([state.active], active[:-1]))
+        starts = active & (~prev_active | (ts - prev_ts > self.gap_micros))
+        # Session number of every sample, 0 for the one carried in from the last batch
+        number = np.cumsum(starts)
+        member = active & ((number > 0) | (state.session_start is not None))
+
+        rows = sessions.setdefault('player_sessions', [])
+        if member.any():
+            ids = number[member]
+            member_ts = ts[member]
+            bounds = np.flatnonzero(np.diff(ids)) + 1
+            first = np.concatenate(([0], bounds))
+            last = np.concatenate((bounds, [len(ids)])) - 1
+            for a, b in zip(first.tolist(), last.tolist()):
+                start = state.session_start if ids[a] == 0 else int(member_ts[a])
+                rows.append((player_id, start, int(member_ts[b]), b - a + 1))
+
+        state.last_ts = int(ts[-1])
+        state.active = bool(active[-1])
+        if not state.active:
+            state.session_start = None
+        elif number[-1] > 0:
+            state.session_start = int(ts[np.flatnonzero(starts)[-1]])
+
+    def reset(self, player_id: str) -> None:
+        """Forget the carry-over state of a player"""
+        self.states.pop(player_id, None)
+
+    def snapshot(self, player_ids) -> Dict[str, Optional[PlayerSessionState]]:
+        """Copy of the carry-over state of some players, for restore()"""
+        return {player_id: copy.deepcopy(self.states.get(player_id)) for player_id in player_ids}
+
+    def restore(self, snapshot: Dict[str, Optional[PlayerSessionState]]) -> None:
+        """
+        Put back state taken by snapshot(), e.g. when the rows built since
+        were not committed and the same samples will be added again
+        """
+        for player_id, state in snapshot.items():
+            if state is None:
+                self.states.pop(player_id, None)
+            else:
+                self.states[player_id] = state
+
+
+def backfill(db_handler, player_id: str, gap_seconds: float = SESSION_GAP_SECONDS) -> int:
+    """
+    Rebuild the summary and sessions of a player from the raw rows in MySQL.
+
+    Returns:
+        int: Number of raw samples processed
+    """
+    from archive import ARCHIVE_COLUMNS
+
+    names = [name for name, _ in ARCHIVE_COLUMNS]
+    ts_index = names.index('timestamp_micros')
+    status_index = names.index('activity_status')
+
+    db_handler.delete_sessions(player_id)
+    tracker = SessionTracker(gap_seconds)
+    processed = 0
+    for rows in db_handler.iter_tracking_rows(player_id, 0, 2**63 - 1):
+        columns = {
+            'timestamp_micros': np.array([row[ts_index] for row in rows], dtype=np.int64),
+            'activity_status': np.array([row[status_index] or 0 for row in rows]),
+        }
+        sessions: Dict[str, List[tuple]] = {}
+        tracker.add(player_id, columns, sessions)
+        db_handler.upsert_sessions(sessions)
+        processed += len(rows)
+    logger.info(f"Rebuilt sessions for player {player_id} from {processed} samples")
+    return processed
+
+
+if __name__ == '__main__':
+    from database_handler import DatabaseHandler
+
+    parser = argparse.ArgumentParser(description="Rebuild the tracking summary and sessions of a player from raw rows")
+    parser.add_argument('--player', required=True, help="player_id to rebuild")
+    parser.add_argument('--gap', type=float, default=SESSION_GAP_SECONDS,
+                        help="longest pause within a session, seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)-15s %(name)-8s %(levelname)s: %(message)s")
+    backfill(DatabaseHandler(), args.player, args.gap)
@@ -0,0 +1,530 @@
+"""
+Durable local spool of raw tag frames between BLE receive and MySQL.
+
+The gateway appends every received 36-byte frame with its tag id and
+receive time to a segmented, memory-mapped, append-only spool; a drainer
+loads the spool into MySQL in bulk at its own pace. Receiving never waits
+on the database, and frames survive MySQL outages and gateway restarts.
+
+Layout: <dir>/<sequence>.seg, each a preallocated file of one 64-byte
+header and `segment_records` 64-byte records (SPOOL_RECORD_DTYPE). A record
+is written payload first and its CRC32 last, so a record with a zero or
+mismatching checksum is unwritten or torn and ends the readable data.
+Appends are plain memory writes: they survive a process crash as soon as
+they are made, and power loss once sync() (msync) has run.
+
+Positions are (segment sequence, record index) pairs. The drainer commits
+the position it has loaded up to in the same MySQL transaction as the
+rows (see DatabaseHandler.insert_tracking_rows), so a frame is loaded
+exactly once however the gateway stops. Disk use is bounded by
+`max_segments`: drained segments are kept for replay until space is
+needed; when every segment is still undrained new frames are refused and
+counted in `dropped`.
+
+Run as a script to inspect a spool:
+    python spool.py --dir <spool dir>
+"""
+import argparse
+import asyncio
+import glob
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from frame_decoder import FRAME_DTYPE, FRAME_SIZE, frames_to_columns
+
+logger = logging.getLogger(__name__)
+
+SPOOL_MAGIC = b'LOCSPOOL'
+SPOOL_VERSION = 1
+TAG_ID_SIZE = 16
+
+# magic, version, record size, segment sequence, records per segment
+_HEADER = struct.Struct('<8sIIqq')
+HEADER_SIZE = 64
+
+SPOOL_RECORD_DTYPE = np.dtype([
+    ('received_micros', '<i8'),
+    ('tag_id', f'S{TAG_ID_SIZE}'),
+    ('frame', FRAME_DTYPE),
+    ('crc', '<u4'),
+])
+RECORD_SIZE = SPOOL_RECORD_DTYPE.itemsize
+assert RECORD_SIZE == 64
+
+_PAYLOAD = struct.Struct(f'<q{TAG_ID_SIZE}s{FRAME_SIZE}s')
+_CRC = struct.Struct('<I')
+PAYLOAD_SIZE = _PAYLOAD.size
+
+SEGMENT_RECORDS = 1 << 20  # 64 MiB per segment
+
+SpoolPosition = Tuple[int, int]
+
+
+def record_crc(payload) -> int:
+    """Checksum of a record payload, never 0 so that 0 marks an unwritten record"""
+    return zlib.crc32(payload) or 1
+
+
+def segment_path(directory: str, sequence: int) -> str:
+    return os.path.join(directory, f"{sequence:016d}.seg")
+
+
+def list_segments(directory: str) -> List[int]:
+    """Sequences of the segments in a spool directory, oldest first"""
+    return sorted(int(os.path.basename(path)[:-4]) for path in glob.glob(os.path.join(directory, '*.seg')))
+
+
+def _open_segment(path: str, writable: bool) -> Tuple[mmap.mmap, int, int]:
+    """Map a segment; returns (map, sequence, records)"""
+    with open(path, 'r+b' if writable else 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+    magic, version, record_size, sequence, records = _HEADER.unpack_from(mapped, 0)
+    if magic != SPOOL_MAGIC or version != SPOOL_VERSION or record_size != RECORD_SIZE:
+        mapped.close()
+        raise ValueError(f"{path} is not a version {SPOOL_VERSION} spool segment")
+    return mapped, sequence, records
+
+
+class SpoolWriter:
+    """
+    Appends frames to the newest segment of a spool directory.
+
+    Opening an existing spool continues after its last complete record.
+
+    Args:
+        directory (str): Spool directory, created if missing
+        segment_records (int): Records per new segment
+        max_segments (int): Most segments kept on disk
+    """
+
+    def __init__(self, directory: str, segment_records: int = SEGMENT_RECORDS, max_segments: int = 16):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.max_segments = max(2, max_segments)
+        self.dropped = 0
+        self.appended = 0
+        self.rejected = 0
+        # Everything before this position is loaded and may be deleted
+        self.released: SpoolPosition = (-1, 0)
+        self._map: Optional[mmap.mmap] = None
+        self._sequence = -1
+        self._capacity = 0
+        self._index = 0
+        self._full = False
+
+        os.makedirs(directory, exist_ok=True)
+        segments = list_segments(directory)
+        if segments:
+            self._map, self._sequence, self._capacity = _open_segment(segment_path(directory, segments[-1]), True)
+            self._index = self._first_free()
+            logger.info(f"Spool {directory} continues at segment {self._sequence} record {self._index}")
+        else:
+            self._new_segment(0)
+
+    @property
+    def position(self) -> SpoolPosition:
+        """Position the next record will be written at"""
+        return self._sequence, self._index
+
+    def _first_free(self) -> int:
+        records = np.frombuffer(self._map, dtype=SPOOL_RECORD_DTYPE, count=self._capacity, offset=HEADER_SIZE)
+        free = np.flatnonzero(records['crc'] == 0)
+        del records
+        return int(free[0]) if len(free) else self._capacity
+
+    def _new_segment(self, sequence: int) -> None:
+        path = segment_path(self.directory, sequence)
+        with open(path + '.tmp', 'wb') as f:
+            f.truncate(HEADER_SIZE + self.segment_records * RECORD_SIZE)
+            f.write(_HEADER.pack(SPOOL_MAGIC, SPOOL_VERSION, RECORD_SIZE, sequence, self.segment_records))
+        # Readers only ever see segments with a complete header
+        os.replace(path + '.tmp', path)
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+        self._map, self._sequence, self._capacity = _open_segment(path, True)
+        self._index = 0
+
+    def _roll_over(self) -> bool:
+        """Start the next segment, deleting the oldest drained one if the spool is at its limit"""
+        segments = list_segments(self.directory)
+        if len(segments) >= self.max_segments:
+            if segments[0] >= self.released[0]:
+                if not self._full:
+                    logger.error(f"Spool {self.directory} is full of undrained frames, refusing new frames")
+                self._full = True
+                return False
+            os.remove(segment_path(self.directory, segments[0]))
+        if self._full:
+            logger.info(f"Spool {self.directory} has room again after dropping {self.dropped} frames")
+        self._full = False
+        self._new_segment(self._sequence + 1)
+        return True
+
+    def append(self, tag_id: str, frame: bytes, received_micros: int) -> bool:
+        """
+        Append one raw frame.
+
+        Returns:
+            bool: False if the frame was rejected (wrong length, or a tag id
+                that does not fit the record) or dropped (spool full)
+        """
+        if len(frame) != FRAME_SIZE:
+            return False
+        try:
+            tag = tag_id.encode('ascii')
+        except UnicodeEncodeError:
+            tag = b''
+        if not tag or len(tag) > TAG_ID_SIZE:
+            # struct would silently truncate it and the frames would load under another tag
+            if not self.rejected:
+                logger.error(f"Tag id {tag_id!r} does not fit a spool record (at most {TAG_ID_SIZE} "
+                             f"ASCII characters), not spooling its frames")
+            self.rejected += 1
+            return False
+        if self._index == self._capacity and not self._roll_over():
+            self.dropped += 1
+            return False
+
+        offset = HEADER_SIZE + self._index * RECORD_SIZE
+        _PAYLOAD.pack_into(self._map, offset, received_micros, tag, bytes(frame))
+        _CRC.pack_into(self._map, offset + PAYLOAD_SIZE,
+                       record_crc(memoryview(self._map)[offset:offset + PAYLOAD_SIZE]))
+        self._index += 1
+        self.appended += 1
+        return True
+
+    def release(self, position: SpoolPosition) -> None:
+        """Mark everything before `position` as loaded"""
+        if position > self.released:
+            self.released = position
+            if self._full:
+                self._roll_over()
+
+    def sync(self) -> None:
+        """Flush the current segment to disk"""
+        if self._map is not None:
+            self._map.flush()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+
+
+class SpoolReader:
+    """
+    Reads records from a spool directory, following a writer that may still be appending.
+
+    Args:
+        directory (str): Spool directory
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.corrupt = 0
+        self._map: Optional[mmap.mmap] = None
+        self._sequence = -1
+        self._capacity = 0
+
+    def start(self) -> SpoolPosition:
+        """Position of the oldest record on disk"""
+        segments = list_segments(self.directory)
+        return (segments[0], 0) if segments else (0, 0)
+
+    def _segment(self, sequence: int) -> bool:
+        if sequence == self._sequence:
+            return True
+        self.close()
+        try:
+            self._map, self._sequence, self._capacity = _open_segment(segment_path(self.directory, sequence), False)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def read(self, position: SpoolPosition, max_records: int = 10_000) -> Tuple[np.ndarray, SpoolPosition]:
+        """
+        Read the complete records from `position` on, within one segment.
+
+        Args:
+            position (tuple): (segment sequence, record index) to start at
+            max_records (int): Most records returned
+
+        Returns:
+            tuple: (records with SPOOL_RECORD_DTYPE, position after them); no
+                records when the writer has not appended past `position` yet
+        """
+        records, _, _, next_position = self.read_indexed(position, max_records)
+        return records, next_position
+
+    def read_indexed(self, position: SpoolPosition,
+                     max_records: int = 10_000) -> Tuple[np.ndarray, int, np.ndarray, SpoolPosition]:
+        """
+        Like read(), also returning where every record is
+
+        Returns:
+            tuple: (records, their segment sequence, their record indices,
+                position after them)
+        """
+        sequence, index = position
+        if not self._segment(sequence):
+            # Deleted to make room, continue with the oldest segment left
+            segments = [s for s in list_segments(self.directory) if s > sequence]
+            if not segments:
+                return np.empty(0, dtype=SPOOL_RECORD_DTYPE), sequence, np.empty(0, dtype=np.int64), position
+            logger.error(f"Spool segment {sequence} is gone, continuing at segment {segments[0]}")
+            return self.read_indexed((segments[0], 0), max_records)
+
+        count = min(max_records, self._capacity - index)
+        records = np.frombuffer(self._map, dtype=SPOOL_RECORD_DTYPE, count=count,
+                                offset=HEADER_SIZE + index * RECORD_SIZE).copy()
+        unwritten = np.flatnonzero(records['crc'] == 0)
+        if len(unwritten):
+            records = records[:unwritten[0]]
+
+        end = index + len(records)
+        if end == self._capacity:
+            next_position = (sequence + 1, 0)
+        elif not len(records) and self._abandoned(sequence, index):
+            logger.error(f"Spool segment {sequence} ends at record {index}, continuing with the next segment")
+            next_position = (sequence + 1, 0)
+        else:
+            next_position = (sequence, end)
+
+        # Verify the checksums; torn records are skipped
+        indices = np.arange(index, end, dtype=np.int64)
+        raw = records.tobytes()
+        valid = np.fromiter((record_crc(raw[offset:offset + PAYLOAD_SIZE]) == crc
+                             for offset, crc in zip(range(0, len(raw), RECORD_SIZE), records['crc'].tolist())),
+                            dtype=bool, count=len(records))
+        if not valid.all():
+            self.corrupt += int((~valid).sum())
+            logger.error(f"Skipping {int((~valid).sum())} corrupt spool records in segment {sequence}")
+            records = records[valid]
+            indices = indices[valid]
+        return records, sequence, indices, next_position
+
+    def _abandoned(self, sequence: int, index: int) -> bool:
+        """
+        Whether the writer moved on without filling the segment, which only
+        a crash can cause; checked again after seeing the next segment so a
+        writer that filled it in the meantime is not mistaken for one
+        """
+        if not os.path.exists(segment_path(self.directory, sequence + 1)):
+            return False
+        return _CRC.unpack_from(self._map, HEADER_SIZE + index * RECORD_SIZE + PAYLOAD_SIZE)[0] == 0
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._sequence = -1
+
+
+def spool_batches(records: np.ndarray) -> Dict[str, Dict[str, np.ndarray]]:
+    """Split records into per-tag column batches in arrival order"""
+    batches = {}
+    tag_ids = records['tag_id']
+    for tag in np.unique(tag_ids):
+        mask = tag_ids == tag
+        batches[tag.decode('ascii')] = frames_to_columns(records['frame'][mask], records['received_micros'][mask])
+    return batches
+
+
+def spool_lag(writer: SpoolWriter, position: SpoolPosition) -> int:
+    """Records between a drain position and the write position"""
+    sequence, index = writer.position
+    return max(0, (sequence - position[0]) * writer.segment_records + index - position[1])
+
+
+class SpoolDrainer:
+    """
+    Loads a spool into MySQL in bulk.
+
+    Args:
+        reader (SpoolReader): Reader on the spool directory
+        resolve_player (callable): async tag_id -> player info, or None when
+            no player is linked to the tag (its frames are skipped and counted
+            in `unassigned`); raises when the lookup itself failed, and the
+            frames of that tag then hold the drain position (counted in
+            `waiting`) until a later lookup succeeds
+        write (callable): (batches, position) -> bool, writes the
+            [(tag_id, player_info, columns)] batches and the position in one
+            transaction; run in a worker thread
+        load_position (callable): () -> position stored by `write` or None;
+            run in a worker thread
+        on_release (callable, optional): Called with each committed position
+        batch_records (int): Most records per transaction
+        interval (float): Seconds between polls once the spool is drained
+        retry_interval (float): Seconds before retrying a failed write
+    """
+
+    def __init__(self, reader: SpoolReader, resolve_player: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+                 write: Callable[[List[tuple], SpoolPosition], bool],
+                 load_position: Callable[[], Optional[SpoolPosition]],
+                 on_release: Optional[Callable[[SpoolPosition], None]] = None,
+                 batch_records: int = 10_000, interval: float = 0.1, retry_interval: float = 1.0):
+        self.reader = reader
+        self.resolve_player = resolve_player
+        self.write = write
+        self.load_position = load_position
+        self.on_release = on_release
+        self.batch_records = batch_records
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.position: Optional[SpoolPosition] = None
+        self.loaded = 0
+        self.unassigned = 0
+        # Records held back at `position` until the lookup of their tag succeeds
+        self.waiting = 0
+
+    async def _start_position(self) -> SpoolPosition:
+        while True:
+            try:
+                stored = await asyncio.to_thread(self.load_position)
+                break
+            except Exception as e:
+                logger.error(f"Could not load the spool position, retrying: {e}")
+                await asyncio.sleep(self.retry_interval)
+        oldest = self.reader.start()
+        position = tuple(stored) if stored else oldest
+        # Segments before the oldest on disk were deleted after loading
+        return max(position, oldest)
+
+    async def drain_once(self) -> int:
+        """Load the next batch of records; returns how many records were consumed"""
+        if self.position is None:
+            self.position = await self._start_position()
+            if self.on_release:
+                self.on_release(self.position)
+
+        records, sequence, indices, next_position = self.reader.read_indexed(self.position, self.batch_records)
+        if next_position == self.position:
+            return 0
+
+        # Loading stops at the first frame of a tag whose lookup failed (e.g.
+        # the tag API is down after a restart); it and everything after it
+        # stay in the spool and are read again on the next poll. Tags with no
+        # player are not worth waiting for and are skipped.
+        players = {}
+        failed = []
+        for tag in np.unique(records['tag_id']):
+            try:
+                players[tag.decode('ascii')] = await self.resolve_player(tag.decode('ascii'))
+            except Exception as e:
+                logger.debug(f"Player lookup for tag {tag.decode('ascii')} failed: {e}")
+                failed.append(tag)
+        if failed:
+            first = int(np.argmax(np.isin(records['tag_id'], failed)))
+            held = len(records) - first
+            if held != self.waiting:
+                logger.warning(f"Player lookup failed for tags {[tag.decode('ascii') for tag in failed]}, "
+                               f"holding {held} spooled frames at segment {sequence} record {int(indices[first])}")
+            self.waiting = held
+            if first == 0:
+                return 0
+            records = records[:first]
+            next_position = (sequence, int(indices[first]))
+        else:
+            self.waiting = 0
+
+        batches = []
+        for tag_id, columns in spool_batches(records).items():
+            if not players[tag_id]:
+                self.unassigned += len(columns['timestamp_micros'])
+                logger.warning(f"No player info found for tag {tag_id}, skipping "
+                               f"{len(columns['timestamp_micros'])} spooled frames")
+                continue
+            batches.append((tag_id, players[tag_id], columns))
+
+        if not await asyncio.to_thread(self.write, batches, next_position):
+            raise IOError(f"Failed to load spool records up to {next_position}")
+        self.position = next_position
+        self.loaded += len(records)
+        if self.on_release:
+            self.on_release(next_position)
+        return max(len(records), 1)
+
+    async def run(self) -> None:
+        """Drain forever"""
+        while True:
+            try:
+                if not await self.drain_once():
+                    await asyncio.sleep(self.retry_interval if self.waiting else self.interval)
+            except Exception as e:
+                logger.error(f"Spool drain failed, retrying in {self.retry_interval}s: {e}")
+                await asyncio.sleep(self.retry_interval)
+
+
+async def replay(directory: str, handler: Callable[[str, bytes, int], None], speed: float = 1.0,
+                 start: Optional[SpoolPosition] = None) -> int:
+    """
+    Feed a recorded spool back through a frame handler at `speed` times real time.
+
+    Frames keep their original receive timestamps; speed 0 replays as fast
+    as possible.
+
+    Args:
+        directory (str): Spool directory to read
+        handler (callable): (tag_id, frame bytes, received_micros). The frames
+            are already stored, so the handler must not spool or insert them
+            again (the gateway's replay mode only publishes them)
+        speed (float): Replay speed relative to the recording
+        start (tuple, optional): Position to start at, the oldest record by default
+
+    Returns:
+        int: Number of frames replayed
+    """
+    reader = SpoolReader(directory)
+    position = start or reader.start()
+    first_micros = None
+    started = time.monotonic()
+    replayed = 0
+    try:
+        while True:
+            records, next_position = reader.read(position)
+            if next_position == position:
+                return replayed
+            position = next_position
+            frames = records['frame'].tobytes()
+            for i, (tag_id, received) in enumerate(zip(records['tag_id'].tolist(),
+                                                        records['received_micros'].tolist())):
+                if first_micros is None:
+                    first_micros = received
+                if speed > 0:
+                    delay = (received - first_micros) / 1e6 / speed - (time.monotonic() - started)
+                    if delay > 0.001:
+                        await asyncio.sleep(delay)
+                handler(tag_id.decode('ascii'), frames[i * FRAME_SIZE:(i + 1) * FRAME_SIZE], received)
+                replayed += 1
+    finally:
+        reader.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Summarize the segments of a spool directory")
+    parser.add_argument('--dir', required=True, help="spool directory")
+    args = parser.parse_args()
+
+    reader = SpoolReader(args.dir)
+    for sequence in list_segments(args.dir):
+        position, total, first, last = (sequence, 0), 0, None, None
+        while position[0] == sequence:
+            records, next_position = reader.read(position, 100_000)
+            if next_position == position:
+                break
+            if len(records):
+                first = first if first is not None else int(records['received_micros'][0])
+                last = int(records['received_micros'][-1])
+            total += len(records)
+            position = next_position
+        print(f"segment {sequence}: {total} records, received {first} .. {last}")
+    reader.close()
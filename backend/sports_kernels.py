@@ -0,0 +1,75 @@
+"""
+Loader for the calculate_sports_numba kernels.
+
+load() returns the kernels from the prebuilt sports_kernels_aot extension
+(`python calculate_sports_numba.py`) when it is importable, which needs
+neither numba nor any compilation. Kernels missing from it, or all of them
+when it has not been built, are taken from calculate_sports_numba and
+JIT-compiled with numba's on-disk cache on their first call. Nothing is
+loaded or compiled on import of this module.
+"""
+import importlib
+import inspect
+import logging
+import threading
+from types import SimpleNamespace
+
+logger = logging.getLogger(__name__)
+
+AOT_MODULE = 'sports_kernels_aot'
+
+KERNEL_NAMES = (
+    'calculate_speed', 'calculate_acceleration', 'detect_steps', 'detect_jump',
+    'is_acceleration_phase', 'is_max_velocity_phase', 'is_deceleration_phase',
+    'new_state', 'speed_update', 'acceleration_update', 'step_update',
+    'jump_update', 'phase_update', 'process_samples',
+)
+
+_kernels = None
+_lock = threading.Lock()
+
+
+def _jit(fn):
+    from numba import njit
+    # Helpers already decorated with @njit come back unchanged
+    return njit(cache=True)(fn) if inspect.isfunction(fn) else fn
+
+
+def load() -> SimpleNamespace:
+    """
+    The kernels, one attribute per name in KERNEL_NAMES.
+
+    `source` tells where they came from: 'aot', 'jit', or 'mixed' when the
+    extension predates some of the kernels.
+    """
+    global _kernels
+    if _kernels is not None:
+        return _kernels
+    with _lock:
+        if _kernels is not None:
+            return _kernels
+        try:
+            aot = importlib.import_module(AOT_MODULE)
+        except ImportError:
+            aot = None
+
+        kernels = {}
+        missing = [name for name in KERNEL_NAMES if aot is None or not hasattr(aot, name)]
+        for name in KERNEL_NAMES:
+            if name not in missing:
+                kernels[name] = getattr(aot, name)
+        if missing:
+            import calculate_sports_numba
+            for name in missing:
+                kernels[name] = _jit(getattr(calculate_sports_numba, name))
+
+        if not missing:
+            source = 'aot'
+        elif len(missing) == len(KERNEL_NAMES):
+            source = 'jit'
+        else:
+            source = 'mixed'
+            logger.warning(f"{AOT_MODULE} is out of date, JIT compiling {', '.join(missing)}")
+        logger.info(f"Loaded sports kernels ({source})")
+        _kernels = SimpleNamespace(source=source, **kernels)
+    return _kernels
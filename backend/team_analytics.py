@@ -0,0 +1,139 @@
+"""
+Team-wide analytics on a pool of worker processes.
+
+The analytics of one player are single-threaded numpy/scipy work, so a
+squad's worth of players is fanned out over a persistent
+ProcessPoolExecutor, one task per player, and the formatted responses come
+back to the API process. Small requests are answered inline where the
+pickling round trip would cost more than it saves.
+
+The pool is started on the first request large enough to need it, so
+importing the API (the debug reloader's parent process, tools) forks
+nothing. By then the API process holds database connections and threads,
+so the workers come from a 'forkserver' where available, which inherits
+neither; elsewhere the platform default ('spawn') is used. Both import the
+parent's script again as __mp_main__, so a script that creates a pool must
+keep that import free of side effects (see app.py).
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from analytics import analyze_columns
+from analytics_response import format_analytics
+
+logger = logging.getLogger(__name__)
+
+# Below this many samples in total the players are analysed in the API process
+INLINE_MAX_SAMPLES = 200_000
+
+
+def analyze_player(columns: Dict[str, np.ndarray], fmt: str, max_points: Optional[int],
+                   method: str) -> Dict[str, Any]:
+    """Analytics response of one player's raw columns, run in a worker"""
+    return format_analytics(analyze_columns(columns), fmt, max_points, method)
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def team_summary(players: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Aggregate the per-player responses of a team.
+
+    The average speed is weighted by each player's sample count, so it is
+    the mean over every sample of the team.
+
+    Args:
+        players (dict): player_id -> response as built by format_analytics
+            in the 'compact', 'binary' or 'summary' format
+
+    Returns:
+        dict: Team statistics
+    """
+    summaries = [response['summary'] for response in players.values()]
+    samples = [response['samples'] for response in players.values()]
+    total_samples = sum(samples)
+    return {
+        'players': len(players),
+        'samples': total_samples,
+        'average_speed': (sum(s['average_speed'] * n for s, n in zip(summaries, samples)) / total_samples
+                          if total_samples else 0.0),
+        'max_speed': max((s['max_speed'] for s in summaries), default=0.0),
+        'total_displacement': sum(s['total_displacement'] for s in summaries),
+        'step_count': sum(s['step_count'] for s in summaries),
+        'jump_count': sum(s['jump_count'] for s in summaries),
+    }
+
+
+class TeamAnalyticsPool:
+    """
+    Persistent worker processes for team analytics, started on first use.
+
+    With `workers` of 0 or 1 everything runs inline.
+    """
+
+    def __init__(self, workers: Optional[int] = None, inline_max_samples: int = INLINE_MAX_SAMPLES):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.inline_max_samples = inline_max_samples
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the workers now rather than on the first request that needs them"""
+        if self.workers <= 1 or self._executor is not None:
+            return
+        with self._lock:
+            if self._executor is not None:
+                return
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else None
+            context = multiprocessing.get_context(method)
+            if method == 'forkserver':
+                # Imported once by the server, so each worker forks ready to run
+                context.set_forkserver_preload([__name__, 'scipy.signal'])
+            executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            # Workers are started on demand; bring them all up now
+            for future in [executor.submit(_worker_ready) for _ in range(self.workers)]:
+                future.result()
+            self._executor = executor
+        logger.info(f"Team analytics pool started with {self.workers} workers ({method or 'default'})")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def analyze(self, team_columns: Dict[str, Dict[str, np.ndarray]], fmt: str = 'summary',
+                max_points: Optional[int] = None, method: str = 'lttb') -> Dict[str, Dict[str, Any]]:
+        """
+        Analytics response of every player.
+
+        Args:
+            team_columns (dict): player_id -> raw columns, as returned by
+                DatabaseHandler.get_team_columns
+            fmt (str): Response format of each player, see format_analytics
+            max_points (int, optional): Downsample each player's series
+            method (str): Downsampling method
+
+        Returns:
+            dict: player_id -> response, in the order of team_columns
+        """
+        sizes = {player_id: len(columns['timestamp_micros']) for player_id, columns in team_columns.items()}
+        if self.workers <= 1 or len(team_columns) < 2 or sum(sizes.values()) <= self.inline_max_samples:
+            return {player_id: analyze_player(columns, fmt, max_points, method)
+                    for player_id, columns in team_columns.items()}
+
+        self.start()
+        # Largest players first so the longest tasks do not start last
+        futures = {
+            player_id: self._executor.submit(analyze_player, team_columns[player_id], fmt, max_points, method)
+            for player_id in sorted(team_columns, key=sizes.get, reverse=True)
+        }
+        return {player_id: futures[player_id].result() for player_id in team_columns}
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The backend modules are flat scripts, imported the way the benchmarks import them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -0,0 +1,123 @@
+"""Vectorized analytics against the per-element loops app.py shipped with"""
+import numpy as np
+import pytest
+
+import analytics
+
+
+def reference_speed_and_displacement(x_positions, y_positions, z_positions, timestamps):
+    dt = np.diff(timestamps) / 1_000_000
+    speeds = np.zeros(len(timestamps))
+    displacements = np.zeros(len(timestamps))
+    vx = np.diff(x_positions) / dt
+    vy = np.diff(y_positions) / dt
+    vz = np.diff(z_positions) / dt
+    speeds[1:] = np.sqrt(vx**2 + vy**2 + vz**2)
+    for i in range(1, len(timestamps)):
+        time_interval = (timestamps[i] - timestamps[i-1]) / 1_000_000
+        displacements[i] = displacements[i-1] + (speeds[i] + speeds[i-1]) * time_interval / 2
+    return speeds, displacements
+
+
+def reference_detect_steps(acc_magnitude, threshold):
+    step_counter = 0
+    step_b_ts = -1
+    step_e_ts = -1
+    prev_acc = -1
+    for ts, current_acc in enumerate(acc_magnitude):
+        if prev_acc != -1 and current_acc > threshold:
+            if prev_acc < threshold:
+                step_b_ts = ts
+        elif prev_acc >= threshold and current_acc <= threshold:
+            step_e_ts = ts
+            if step_b_ts != -1 and step_e_ts > step_b_ts:
+                step_counter += 1
+        prev_acc = current_acc
+    return step_counter
+
+
+def reference_detect_jumps(acc_buffer, jump_threshold):
+    alpha = 0.2
+    filtered_acc = np.zeros_like(acc_buffer)
+    filtered_acc[0] = acc_buffer[0]
+    for i in range(1, len(acc_buffer)):
+        filtered_acc[i] = alpha * acc_buffer[i] + (1 - alpha) * filtered_acc[i-1]
+    jump_count = 0
+    min_distance = 5
+    for i in range(1, len(filtered_acc) - 1):
+        if (filtered_acc[i] > filtered_acc[i-1] and
+                filtered_acc[i] > filtered_acc[i+1] and
+                filtered_acc[i] > jump_threshold):
+            if (i == 1 or i - 1 >= min_distance):
+                jump_count += 1
+    return jump_count
+
+
+def match_window(n, seed):
+    """A match-like 50 Hz window with stride and jump bursts"""
+    rng = np.random.default_rng(seed)
+    timestamps = 1_700_000_000_000_000 + np.cumsum(rng.integers(18_000, 22_000, n))
+    t = (timestamps - timestamps[0]) / 1e6
+    x = np.cumsum(rng.normal(0, 0.05, n)) + 50 * np.sin(t / 40)
+    y = np.cumsum(rng.normal(0, 0.05, n)) + 30 * np.cos(t / 55)
+    ax = rng.normal(0, 1.5, n)
+    ay = rng.normal(0, 1.5, n)
+    az = 9.81 + 3 * np.abs(np.sin(2 * np.pi * 1.6 * t)) + 8 * (rng.random(n) < 0.002) + rng.normal(0, 0.8, n)
+    return timestamps, x, y, ax, ay, az
+
+
+@pytest.mark.parametrize('n, seed', [(2, 0), (7, 1), (500, 2), (20_000, 3)])
+def test_matches_reference_loops(n, seed):
+    timestamps, x, y, ax, ay, az = match_window(n, seed)
+    acc = analytics.calculate_acceleration(ax, ay, az)
+
+    speeds, displacements = analytics.calculate_speed_and_displacement(x, y, None, timestamps)
+    ref_speeds, ref_displacements = reference_speed_and_displacement(x, y, np.zeros(n), timestamps)
+    assert np.array_equal(speeds, ref_speeds)
+    np.testing.assert_allclose(displacements, ref_displacements, rtol=1e-12, atol=0)
+
+    for threshold in (0.5, analytics.STEP_THRESHOLD, 3.5):
+        assert analytics.detect_steps(acc, threshold) == reference_detect_steps(acc, threshold)
+    for threshold in (1.0, analytics.JUMP_THRESHOLD, 6.0):
+        assert analytics.detect_jumps(acc, threshold) == reference_detect_jumps(acc, threshold)
+
+
+def test_threshold_edge_cases():
+    # Samples exactly at the threshold, plateaus, and a step right at the start
+    acc = np.array([2.0, 3.0, 2.0, 2.0, 5.0, 5.0, 1.0, 2.0, 2.5, -1.0, 3.0, 0.0, 4.0, 4.0])
+    for threshold in (2.0, 2.5, 4.0):
+        assert analytics.detect_steps(acc, threshold) == reference_detect_steps(acc, threshold)
+    # Peaks at index 1, inside the minimum distance, and on plateaus
+    acc = np.array([0.0, 30.0, 0.0, 30.0, 0.0, 0.0, 0.0, 40.0, 0.0, 25.0, 25.0, 0.0, 0.0, 35.0, 0.0])
+    for threshold in (1.0, 4.0, 10.0):
+        assert analytics.detect_jumps(acc, threshold) == reference_detect_jumps(acc, threshold)
+
+
+def test_empty_window():
+    empty = np.array([], dtype=np.float64)
+    speeds, displacements = analytics.calculate_speed_and_displacement(empty, empty, None, np.array([], dtype=np.int64))
+    assert len(speeds) == 0 and len(displacements) == 0
+    assert analytics.detect_steps(empty, analytics.STEP_THRESHOLD) == reference_detect_steps(empty, 2.0) == 0
+    # The reference loop cannot filter an empty buffer; there are no jumps in it
+    assert analytics.detect_jumps(empty, analytics.JUMP_THRESHOLD) == 0
+
+
+def test_single_sample():
+    timestamps, x, y, ax, ay, az = match_window(1, 4)
+    acc = analytics.calculate_acceleration(ax, ay, az)
+    speeds, displacements = analytics.calculate_speed_and_displacement(x, y, None, timestamps)
+    ref_speeds, ref_displacements = reference_speed_and_displacement(x, y, np.zeros(1), timestamps)
+    assert np.array_equal(speeds, ref_speeds) and np.array_equal(displacements, ref_displacements)
+    assert analytics.detect_steps(acc, 0.0) == reference_detect_steps(acc, 0.0)
+    assert analytics.detect_jumps(acc, 0.0) == reference_detect_jumps(acc, 0.0)
+
+    # A lone sample above the threshold is neither a step nor a jump
+    assert analytics.detect_steps(np.array([9.0]), 2.0) == reference_detect_steps(np.array([9.0]), 2.0) == 0
+    assert analytics.detect_jumps(np.array([9.0]), 4.0) == reference_detect_jumps(np.array([9.0]), 4.0) == 0
+
+
+def test_lowpass_matches_loop():
+    values = np.random.default_rng(5).normal(0, 3, 1000)
+    expected = np.empty_like(values)
+    analytics._lowpass_loop(values, analytics.JUMP_FILTER_ALPHA, 1.5, expected)
+    np.testing.assert_allclose(analytics.lowpass(values, initial=1.5), expected, rtol=1e-12, atol=1e-12)
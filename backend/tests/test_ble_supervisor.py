@@ -0,0 +1,159 @@
+"""BleSupervisor against FakeBleakClient"""
+import asyncio
+
+import pytest
+
+import ble_supervisor
+from ble_supervisor import BleSupervisor, DeviceConfig
+from fake_ble import FakeBleakClient
+
+CHARACTERISTIC = "ef47b05a-5571-4688-8aba-9c6b51463208"
+
+
+def roster(n):
+    return [DeviceConfig(address=f"aa:bb:cc:dd:ee:{i:02x}", characteristic_uuid=CHARACTERISTIC, tag_id=f"{i:04x}")
+            for i in range(n)]
+
+
+def recording_client(fail_connects=0, disconnect_after=None, rate_hz=200.0):
+    """A FakeBleakClient subclass that records its instances and concurrent connects"""
+
+    class Client(FakeBleakClient):
+        instances = []
+        connecting = 0
+        max_connecting = 0
+
+        def __init__(self, address, disconnected_callback=None, **kwargs):
+            super().__init__(address, disconnected_callback, **kwargs)
+            self.kwargs = kwargs
+            self.stopped_notify = False
+            Client.instances.append(self)
+
+        async def connect(self, **kwargs):
+            Client.connecting += 1
+            Client.max_connecting = max(Client.max_connecting, Client.connecting)
+            try:
+                return await super().connect(**kwargs)
+            finally:
+                Client.connecting -= 1
+
+        async def stop_notify(self, characteristic):
+            self.stopped_notify = True
+            await super().stop_notify(characteristic)
+
+    Client.fail_connects = fail_connects
+    Client.disconnect_after = disconnect_after
+    Client.rate_hz = rate_hz
+    return Client
+
+
+async def run_for(supervisor, seconds, until=None):
+    """Run the supervisor until `until()` holds or `seconds` pass, then stop it"""
+    task = asyncio.create_task(supervisor.run())
+    deadline = asyncio.get_running_loop().time() + seconds
+    while asyncio.get_running_loop().time() < deadline and not (until and until()):
+        await asyncio.sleep(0.01)
+    supervisor.stop()
+    await asyncio.wait_for(task, timeout=2)
+
+
+@pytest.fixture
+def backoff_ceilings(monkeypatch):
+    """Make the jittered backoff deterministic (its ceiling) and record it"""
+    ceilings = []
+
+    def uniform(low, high):
+        ceilings.append(high)
+        return high
+
+    monkeypatch.setattr(ble_supervisor.random, 'uniform', uniform)
+    return ceilings
+
+
+def test_reconnects_with_exponential_backoff(backoff_ceilings):
+    client = recording_client(fail_connects=4)
+    received = []
+    supervisor = BleSupervisor(roster(1), lambda *args: received.append(args), client_factory=client,
+                               initial_backoff=0.01, max_backoff=0.04, mtu=40)
+
+    asyncio.run(run_for(supervisor, 3, until=lambda: len(received) >= 5))
+
+    # Ceilings double per consecutive failure up to max_backoff
+    assert backoff_ceilings == [0.01, 0.02, 0.04, 0.04]
+    health = supervisor.health["0000"]
+    assert health.connect_attempts == 5
+    assert health.consecutive_failures == 0 and health.last_error is None
+    assert health.state == "stopped"
+    assert health.notifications == len(received) >= 5
+    tag_id, characteristic, data = received[0]
+    assert tag_id == "0000" and characteristic == CHARACTERISTIC and len(data) == 36
+    # A fresh client per attempt, created with the client kwargs
+    assert len(client.instances) == 5 and all(c.kwargs == {'mtu': 40} for c in client.instances)
+
+
+def test_reconnects_in_a_loop_after_link_drops(backoff_ceilings):
+    client = recording_client(disconnect_after=0.03)
+    supervisor = BleSupervisor(roster(2), lambda *args: None, client_factory=client,
+                               initial_backoff=0.001, max_backoff=0.001)
+
+    async def scenario():
+        baseline = len(asyncio.all_tasks())
+        peak = 0
+
+        async def watch():
+            nonlocal peak
+            while True:
+                peak = max(peak, len(asyncio.all_tasks()) - baseline)
+                await asyncio.sleep(0.005)
+
+        watcher = asyncio.create_task(watch())
+        await run_for(supervisor, 3, until=lambda: all(h.reconnects >= 5 for h in supervisor.health.values()))
+        watcher.cancel()
+        return peak
+
+    peak_tasks = asyncio.run(scenario())
+    for health in supervisor.health.values():
+        assert health.reconnects >= 5
+        assert health.connect_attempts == health.reconnects + 1
+    # Per device: the supervise loop, the emitter and the two waits; no
+    # growth with the number of reconnects as with recursion
+    assert peak_tasks <= 2 + 2 * 4
+
+
+def test_notifications_torn_down_on_stop(backoff_ceilings):
+    client = recording_client()
+    counts = []
+    supervisor = BleSupervisor(roster(3), lambda tag_id, *_: counts.append(tag_id), client_factory=client)
+
+    async def scenario():
+        await run_for(supervisor, 3, until=lambda: len(set(counts)) == 3)
+        stopped_at = len(counts)
+        await asyncio.sleep(0.05)
+        return stopped_at
+
+    stopped_at = asyncio.run(scenario())
+    assert len(counts) == stopped_at, "notifications arrived after stop()"
+    for c in client.instances:
+        assert c.stopped_notify and not c.is_connected and c._task is None
+    assert all(h.state == "stopped" for h in supervisor.health.values())
+
+
+def test_concurrent_connects_are_bounded(backoff_ceilings):
+    client = recording_client(fail_connects=6)
+    supervisor = BleSupervisor(roster(8), lambda *args: None, client_factory=client,
+                               max_concurrent_connects=2, initial_backoff=0.001, max_backoff=0.001)
+
+    asyncio.run(run_for(supervisor, 3, until=lambda: all(
+        h.state == "connected" for h in supervisor.health.values())))
+
+    assert client.max_connecting == 2
+    assert sum(h.connect_attempts for h in supervisor.health.values()) == 8 + 6
+
+
+def test_backoff_delay_has_full_jitter():
+    supervisor = BleSupervisor(roster(1), lambda *args: None, client_factory=FakeBleakClient,
+                               initial_backoff=1.0, max_backoff=8.0)
+    for failures, ceiling in ((0, 1.0), (1, 1.0), (2, 2.0), (3, 4.0), (4, 8.0), (10, 8.0)):
+        delays = [supervisor._backoff_delay(failures) for _ in range(200)]
+        assert 0 <= min(delays) and max(delays) <= ceiling
+        assert max(delays) > ceiling / 2
@@ -0,0 +1,91 @@
+"""Daily partition DDL built by DatabaseHandler.ensure_daily_partitions, checked without a server"""
+import re
+from datetime import datetime, timezone
+
+from archive import DAY_MICROS
+from database_handler import DatabaseHandler
+
+TODAY = datetime(2026, 10, 17, tzinfo=timezone.utc)
+TODAY_MICROS = int(TODAY.timestamp()) * 1_000_000
+PARTITION = re.compile(r"PARTITION p(\d{8}) VALUES LESS THAN \((\d+)\)")
+
+
+def parse(new_partitions):
+    """[(partition name, upper bound)] of the definitions, checking their exact form"""
+    parsed = []
+    for definition in new_partitions:
+        match = PARTITION.fullmatch(definition)
+        assert match, definition
+        parsed.append(('p' + match.group(1), int(match.group(2))))
+    return parsed
+
+
+def partition_of(parsed, timestamp_micros):
+    """Name of the partition MySQL puts a row in: the first whose bound exceeds it"""
+    for name, upper in parsed:
+        if timestamp_micros < upper:
+            return name
+    return 'p_future'
+
+
+def day_name(timestamp_micros):
+    return datetime.fromtimestamp(timestamp_micros // 1_000_000, timezone.utc).strftime('%Y%m%d')
+
+
+def assert_one_day_each(parsed, first_lower):
+    lower = first_lower
+    for name, upper in parsed:
+        assert upper - lower == DAY_MICROS
+        assert name == 'p' + day_name(lower)
+        lower = upper
+
+
+def test_empty_future_partition_gets_the_coming_days():
+    bounds = [TODAY_MICROS - DAY_MICROS, TODAY_MICROS + DAY_MICROS]
+    parsed = parse(DatabaseHandler.daily_partitions(bounds, None, TODAY, days_ahead=7))
+
+    assert_one_day_each(parsed, TODAY_MICROS + DAY_MICROS)
+    assert parsed[-1][1] == TODAY_MICROS + 8 * DAY_MICROS
+
+
+def test_up_to_date_partitions_need_nothing():
+    bounds = [TODAY_MICROS + 8 * DAY_MICROS]
+    assert DatabaseHandler.daily_partitions(bounds, None, TODAY, days_ahead=7) == []
+
+
+def test_rows_in_future_partition_land_in_their_own_day():
+    # Gateway down for three weeks, then a tag clock 20 days ahead
+    last_bound = TODAY_MICROS - 21 * DAY_MICROS
+    rows = [last_bound + 5, TODAY_MICROS - 3 * DAY_MICROS + 7, TODAY_MICROS + 12, TODAY_MICROS + 20 * DAY_MICROS + 9]
+    parsed = parse(DatabaseHandler.daily_partitions([last_bound], (min(rows), max(rows)), TODAY, days_ahead=7))
+
+    assert_one_day_each(parsed, last_bound)
+    for ts in rows:
+        assert partition_of(parsed, ts) == 'p' + day_name(ts)
+
+
+def test_unpartitioned_history_starts_at_the_oldest_row():
+    oldest = TODAY_MICROS - 2 * DAY_MICROS + 30
+    parsed = parse(DatabaseHandler.daily_partitions([], (oldest, TODAY_MICROS), TODAY, days_ahead=1))
+
+    assert [name for name, _ in parsed] == ['p20261015', 'p20261016', 'p20261017', 'p20261018']
+    assert partition_of(parsed, oldest) == 'p20261015'
+
+
+def test_rows_far_ahead_stay_in_future_partition():
+    far = TODAY_MICROS + 5000 * DAY_MICROS
+    parsed = parse(DatabaseHandler.daily_partitions([TODAY_MICROS], (far, far), TODAY, days_ahead=7,
+                                                    max_days_ahead=30))
+
+    assert len(parsed) == 31
+    assert partition_of(parsed, far) == 'p_future'
+
+
+def test_split_ddl_keeps_a_catch_all_partition():
+    new_partitions = DatabaseHandler.daily_partitions([TODAY_MICROS], None, TODAY, days_ahead=1)
+    ddl = ' '.join(DatabaseHandler.split_future_partition_ddl(new_partitions).split())
+
+    assert ddl == ("ALTER TABLE player_tracking_data REORGANIZE PARTITION p_future INTO ( "
+                   f"PARTITION p20261017 VALUES LESS THAN ({TODAY_MICROS + DAY_MICROS}), "
+                   f"PARTITION p20261018 VALUES LESS THAN ({TODAY_MICROS + 2 * DAY_MICROS}), "
+                   "PARTITION p_future VALUES LESS THAN MAXVALUE )")
@@ -0,0 +1,82 @@
+"""SpoolDrainer against a spool on disk and an in-memory store"""
+import asyncio
+import struct
+
+import pytest
+
+from spool import SpoolDrainer, SpoolReader, SpoolWriter, spool_lag
+
+
+def frame(x):
+    return struct.pack('<8f4B', x, 0.0, 0.0, 0.0, 9.81, 0.0, 0.0, 0.0, 90, 70, 1, 1)
+
+
+class Store:
+    """Committed batches and drain position, as the MySQL transaction keeps them"""
+
+    def __init__(self):
+        self.rows = {}
+        self.position = None
+
+    def write(self, batches, position):
+        for tag_id, _, columns in batches:
+            self.rows.setdefault(tag_id, []).extend(columns['x_position'].tolist())
+        self.position = position
+        return True
+
+
+@pytest.fixture
+def spool(tmp_path):
+    writer = SpoolWriter(str(tmp_path), segment_records=64)
+    yield writer
+    writer.close()
+
+
+def drainer_for(spool, store, players, batch_records=100):
+    async def resolve_player(tag_id):
+        player = players[tag_id]
+        if isinstance(player, Exception):
+            raise player
+        return player
+
+    return SpoolDrainer(SpoolReader(spool.directory), resolve_player, store.write,
+                        lambda: store.position, on_release=spool.release, batch_records=batch_records)
+
+
+async def drain(drainer):
+    while await drainer.drain_once():
+        pass
+
+
+def test_tag_without_player_is_skipped(spool):
+    for i in range(6):
+        spool.append('spare' if i % 2 else 'a', frame(i), 1_000 + i)
+    store = Store()
+    drainer = drainer_for(spool, store, {'a': {'_id': 'p1'}, 'spare': None})
+
+    asyncio.run(drain(drainer))
+
+    assert store.rows == {'a': [0.0, 2.0, 4.0]}
+    assert drainer.unassigned == 3
+    assert drainer.waiting == 0
+    assert spool_lag(spool, drainer.position) == 0
+
+
+def test_failed_lookup_holds_the_position_until_it_succeeds(spool):
+    for i, tag in enumerate(['a', 'a', 'b', 'a', 'b']):
+        spool.append(tag, frame(i), 1_000 + i)
+    store = Store()
+    players = {'a': {'_id': 'p1'}, 'b': LookupError('tag API down')}
+    drainer = drainer_for(spool, store, players)
+
+    asyncio.run(drain(drainer))
+    assert store.rows == {'a': [0.0, 1.0]}
+    assert drainer.waiting == 3
+    assert spool_lag(spool, drainer.position) == 3
+
+    players['b'] = {'_id': 'p2'}
+    asyncio.run(drain(drainer))
+    assert store.rows == {'a': [0.0, 1.0, 3.0], 'b': [2.0, 4.0]}
+    assert drainer.waiting == 0
+    assert drainer.unassigned == 0
+    assert spool_lag(spool, drainer.position) == 0
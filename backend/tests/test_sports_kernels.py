@@ -0,0 +1,151 @@
+"""Stateful batch kernels against the scalar calculate_sports_numba kernels"""
+import numpy as np
+import pytest
+
+numba = pytest.importorskip('numba')
+
+import calculate_sports_numba as scalar  # noqa: E402
+import sports_kernels  # noqa: E402
+
+SPEED_WINDOW = 10
+HISTORY = 20
+STEP_THRESHOLD = 2.0
+JUMP_THRESHOLD = 4.0
+SAMPLES = 3000
+
+calculate_speed = numba.njit(scalar.calculate_speed)
+calculate_acceleration = numba.njit(scalar.calculate_acceleration)
+detect_steps = numba.njit(scalar.detect_steps)
+detect_jump = numba.njit(scalar.detect_jump)
+is_acceleration_phase = numba.njit(scalar.is_acceleration_phase)
+is_max_velocity_phase = numba.njit(scalar.is_max_velocity_phase)
+is_deceleration_phase = numba.njit(scalar.is_deceleration_phase)
+
+
+def samples(n, seed=3):
+    """50 Hz samples with sprints, strides, jumps and a few inactive samples"""
+    rng = np.random.default_rng(seed)
+    ts = 1_700_000_000 + np.cumsum(rng.integers(18_000, 22_000, n)) / 1e6
+    t = ts - ts[0]
+    ax = rng.normal(0, 1.5, n)
+    ay = rng.normal(0, 1.5, n)
+    sprint = 60 * np.clip(np.sin(2 * np.pi * t / 12), 0, None) ** 2
+    az = 9.81 + sprint + 3 * np.abs(np.sin(2 * np.pi * 1.6 * t)) + 8 * (rng.random(n) < 0.01)
+    az += rng.normal(0, 0.8, n)
+    status = (rng.random(n) > 0.01).astype(np.int64)
+    return ts, ax, ay, az, status
+
+
+def scalar_reference(ts, ax, ay, az, status):
+    """One scalar kernel call per sample, shifting the buffers as the gateway used to"""
+    n = len(ts)
+    speeds = np.empty(n)
+    steps = np.empty(n, dtype=np.int64)
+    phases = np.empty(n, dtype=np.int64)
+    acc = np.empty(n)
+    initial_ts, reference_ts, prev_ts, last_nonzero = 0.0, -1.0, -1.0, 0.0
+    max_speed = np.zeros(SPEED_WINDOW)
+    prev_acc, current_acc, prev_time, current_time = -1.0, -1.0, 0.0, 0.0
+    step_b, step_e, step_count = -1.0, -1.0, 0
+    history = np.zeros(HISTORY)
+    for k in range(n):
+        (speed, initial_ts, reference_ts, prev_ts, max_speed, last_nonzero, *_) = calculate_speed(
+            initial_ts, reference_ts, prev_ts, max_speed, last_nonzero, 0.0, ts[k], az[k], status[k])
+        (prev_acc, current_acc, prev_time, current_time, *_) = calculate_acceleration(
+            prev_acc, current_acc, prev_time, current_time, ax[k], ay[k], az[k], ts[k], reference_ts)
+        (_, _, _, step_count, _, step_b, step_e, _, _) = detect_steps(
+            prev_acc, current_acc, STEP_THRESHOLD, step_count, prev_ts, step_b, step_e, ts[k], status[k])
+        history[:-1] = history[1:]
+        history[-1] = speed / 3.6
+        if is_max_velocity_phase(history):
+            phases[k] = scalar.PHASE_MAX_VELOCITY
+        elif is_deceleration_phase(history):
+            phases[k] = scalar.PHASE_DECELERATION
+        elif is_acceleration_phase(history):
+            phases[k] = scalar.PHASE_ACCELERATION
+        else:
+            phases[k] = scalar.PHASE_IDLE
+        speeds[k] = speed
+        steps[k] = step_count
+        acc[k] = current_acc
+    # Running jump counts: detect_jump over every prefix of the recording
+    jumps = np.array([detect_jump(acc[:k + 1], ts[:k + 1], JUMP_THRESHOLD, 0, 0.0)[0] for k in range(n)])
+    return speeds, steps, jumps, phases
+
+
+@pytest.fixture(scope='module')
+def recording():
+    data = samples(SAMPLES)
+    return data, scalar_reference(*data)
+
+
+@pytest.fixture(scope='module', params=['loaded', 'jit'])
+def kernels(request):
+    """The kernels as sports_kernels.load() serves them (AOT when built) and JIT-compiled from source"""
+    if request.param == 'loaded':
+        return sports_kernels.load()
+    return sports_kernels.SimpleNamespace(
+        **{name: sports_kernels._jit(getattr(scalar, name)) for name in sports_kernels.KERNEL_NAMES})
+
+
+def run_chunked(kernels, data, bounds):
+    state = kernels.new_state()
+    window = np.zeros(SPEED_WINDOW)
+    parts = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        parts.append(kernels.process_samples(state, window, *(column[start:end] for column in data),
+                                             STEP_THRESHOLD, JUMP_THRESHOLD, HISTORY))
+    return tuple(np.concatenate(column) for column in zip(*parts)), state, window
+
+
+def chunk_bounds(chunk, n=SAMPLES, seed=None):
+    if seed is not None:
+        sizes = np.random.default_rng(seed).integers(1, 40, n)
+        return [0] + [int(b) for b in np.cumsum(sizes) if b < n] + [n]
+    return list(range(0, n, chunk)) + [n]
+
+
+@pytest.mark.parametrize('bounds', [
+    chunk_bounds(SAMPLES), chunk_bounds(1), chunk_bounds(2), chunk_bounds(3), chunk_bounds(64),
+    chunk_bounds(None, seed=11),
+], ids=['whole', 'chunk1', 'chunk2', 'chunk3', 'chunk64', 'random'])
+def test_process_samples_matches_scalar_kernels(kernels, recording, bounds):
+    data, (ref_speeds, ref_steps, ref_jumps, ref_phases) = recording
+    (speeds, steps, jumps, phases), _, _ = run_chunked(kernels, data, bounds)
+
+    np.testing.assert_allclose(speeds, ref_speeds, rtol=1e-12, atol=1e-12)
+    assert np.array_equal(steps, ref_steps)
+    assert np.array_equal(jumps, ref_jumps)
+    assert np.array_equal(phases, ref_phases)
+    # The recording exercises every detector
+    assert steps[-1] > 0 and jumps[-1] > 0 and set(phases.tolist()) == {0, 1, 2, 3}
+
+
+def test_state_carries_over_between_chunks(kernels, recording):
+    data, _ = recording
+    _, whole_state, whole_window = run_chunked(kernels, data, chunk_bounds(SAMPLES))
+    for bounds in (chunk_bounds(1), chunk_bounds(7), chunk_bounds(None, seed=5)):
+        _, state, window = run_chunked(kernels, data, bounds)
+        assert np.array_equal(state, whole_state)
+        assert np.array_equal(window, whole_window)
+
+
+def test_empty_batch_leaves_state_unchanged(kernels, recording):
+    data, _ = recording
+    _, state, window = run_chunked(kernels, data, [0, 100])
+    before = state.copy(), window.copy()
+    result = kernels.process_samples(state, window, *(column[:0] for column in data),
+                                     STEP_THRESHOLD, JUMP_THRESHOLD, HISTORY)
+    assert all(len(column) == 0 for column in result)
+    assert np.array_equal(state, before[0]) and np.array_equal(window, before[1])
+
+
+def test_jump_straddling_a_chunk_boundary(kernels):
+    # A single peak whose rise, top and fall arrive in three separate calls
+    acc = np.array([0.0] * 8 + [40.0, 60.0, 20.0] + [0.0] * 8)
+    ts = 1_700_000_000 + np.arange(len(acc)) * 0.02
+    expected = detect_jump(acc, ts, JUMP_THRESHOLD, 0, 0.0)[0]
+    assert expected == 1
+    state = kernels.new_state()
+    counts = [kernels.jump_update(state, a, t, JUMP_THRESHOLD) for a, t in zip(acc, ts)]
+    assert counts[-1] == expected
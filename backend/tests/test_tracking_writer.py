@@ -0,0 +1,47 @@
+"""BatchedTrackingWriter acknowledgements against an in-memory database handler"""
+import asyncio
+
+from tracking_writer import BatchedTrackingWriter
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.rows = []
+
+    @staticmethod
+    def get_current_epoch_micros():
+        return 1_000_000
+
+    def insert_tracking_rows(self, rows, assignments, rollups, sessions, spool_position):
+        self.rows.extend(rows)
+        return True
+
+
+def sample(player_id, tag_id='t1'):
+    return {
+        'tag_id': tag_id,
+        'player': {'_id': player_id} if player_id else {},
+        'timestamp_micros': 2_000_000,
+        'x_position': 1.0, 'y_position': 2.0,
+        'accelerometer': {'x': 0.0, 'y': 0.0, 'z': 9.81},
+        'gyroscope': {'x': 0.0, 'y': 0.0, 'z': 0.0},
+        'battery_life': 90, 'heart_rate': 70, 'serial_number': 1, 'activity_status': 1,
+    }
+
+
+def test_sample_without_player_is_not_acknowledged():
+    handler = RecordingHandler()
+    writer = BatchedTrackingWriter(handler, flush_interval=0.01)
+
+    async def scenario():
+        await writer.start()
+        missing = writer.submit(sample(None, 't2'), ack=True)
+        stored = writer.submit(sample('p1'), ack=True)
+        results = await asyncio.gather(missing, stored)
+        await writer.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [False, True]
+    assert len(handler.rows) == 1
+    assert writer.rejected_samples == 1
+    assert writer.dropped_samples == 0
@@ -0,0 +1,276 @@
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from database_handler import DatabaseHandler
+from rollups import RollupBuilder, columns_from_sample
+from sessions import SessionTracker
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+STAGE_SECONDS = REGISTRY.histogram('gateway_stage_seconds', 'Time spent per pipeline stage and batch', ['stage'])
+BATCH_SAMPLES = REGISTRY.histogram('tracking_write_batch_samples', 'Samples per database write batch',
+                                   buckets=(1, 10, 50, 100, 250, 500, 1000, 5000))
+
+
+class BatchedTrackingWriter:
+    """
+    Asynchronous batched writer for player tracking samples.
+
+    Decoded samples (single dicts or column batches) are queued by the
+    gateway and a background task flushes them through
+    DatabaseHandler.insert_tracking_rows whenever `max_batch_size` samples
+    are waiting or `flush_interval` seconds have passed since the first
+    queued sample, one transaction per batch. Row building and the database
+    work run in a worker thread so the asyncio loop never blocks on MySQL.
+    With a RollupBuilder the per-second and per-minute rollups, and with a
+    SessionTracker the player summary and session index, are updated in the
+    same transaction.
+    """
+
+    def __init__(self, db_handler: DatabaseHandler, max_batch_size: int = 500,
+                 flush_interval: float = 0.1, max_queue_size: int = 50_000,
+                 rollup_builder: Optional[RollupBuilder] = None,
+                 session_tracker: Optional[SessionTracker] = None):
+        """
+        Args:
+            db_handler (DatabaseHandler): Handler used to write the batches
+            max_batch_size (int): Flush as soon as this many samples are queued
+            flush_interval (float): Longest time in seconds a sample waits in the queue
+            max_queue_size (int): Samples beyond this are dropped instead of queued
+            rollup_builder (RollupBuilder, optional): Maintains rollups from the written samples
+            session_tracker (SessionTracker, optional): Maintains the summary and sessions
+        """
+        self.db_handler = db_handler
+        self.rollup_builder = rollup_builder
+        self.session_tracker = session_tracker
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_queue_size = max_queue_size
+        self.dropped_samples = 0
+        self.rejected_samples = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Start the background flush task on the running loop"""
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything still queued and stop the background task"""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    def submit(self, tracking_data: Dict[str, Any], ack: bool = False) -> Optional[asyncio.Future]:
+        """
+        Queue one decoded sample for the next batch.
+
+        Args:
+            tracking_data (dict): Decoded sample as accepted by insert_tracking_data
+            ack (bool): Return a future resolved with the commit result of the
+                batch holding this sample
+
+        Returns:
+            Optional[asyncio.Future]: The acknowledgement future if `ack` is set;
+                resolved with False right away for a sample without a player
+        """
+        if self._queue is None:
+            raise RuntimeError("BatchedTrackingWriter.start() has not been awaited")
+
+        if not tracking_data.get('player', {}).get('_id'):
+            return self._reject(tracking_data.get('tag_id'), 1, ack)
+        if not tracking_data.get('timestamp_micros'):
+            tracking_data['timestamp_micros'] = self.db_handler.get_current_epoch_micros()
+
+        return self._enqueue((tracking_data, None, 1), tracking_data.get('tag_id'), ack)
+
+    def submit_columns(self, tag_id: str, player_info: Dict[str, Any], columns: Dict[str, np.ndarray],
+                       ack: bool = False) -> Optional[asyncio.Future]:
+        """
+        Queue a decoded column batch from one tag for the next database batch.
+
+        Args:
+            tag_id (str): Tag that produced the frames
+            player_info (dict): Player currently linked to the tag
+            columns (dict): Column arrays as produced by frame_decoder.frames_to_columns
+            ack (bool): Return a future resolved with the commit result
+
+        Returns:
+            Optional[asyncio.Future]: The acknowledgement future if `ack` is set
+        """
+        if self._queue is None:
+            raise RuntimeError("BatchedTrackingWriter.start() has not been awaited")
+        if not player_info.get('_id'):
+            return self._reject(tag_id, len(columns['timestamp_micros']), ack)
+        return self._enqueue(((tag_id, player_info), columns, len(columns['timestamp_micros'])), tag_id, ack)
+
+    def _reject(self, tag_id: Optional[str], samples: int, ack: bool) -> Optional[asyncio.Future]:
+        """Refuse samples without a player; they could never be written"""
+        self.rejected_samples += samples
+        logger.error(f"Missing player ID for tag {tag_id}, dropped {samples} samples")
+        if not ack:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(False)
+        return future
+
+    def _enqueue(self, chunk, tag_id: Optional[str], ack: bool) -> Optional[asyncio.Future]:
+        future = asyncio.get_running_loop().create_future() if ack else None
+        try:
+            self._queue.put_nowait((chunk, future))
+        except asyncio.QueueFull:
+            self.dropped_samples += chunk[2]
+            logger.error(f"Tracking write queue full, dropped {chunk[2]} samples for tag {tag_id}")
+            if future:
+                future.set_result(False)
+        return future
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of submissions (samples or column batches) waiting to be written"""
+        return self._queue.qsize() if self._queue else 0
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            batch_size = item[0][2]
+            deadline = loop.time() + self.flush_interval
+            while batch_size < self.max_batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                batch_size += item[0][2]
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[tuple, Optional[asyncio.Future]]]) -> None:
+        chunks = [chunk for chunk, _ in batch]
+        BATCH_SAMPLES.observe(sum(chunk[2] for chunk in chunks))
+        try:
+            with STAGE_SECONDS.labels('db_write').time():
+                ok = await asyncio.to_thread(self._write, chunks)
+        except Exception as e:
+            logger.error(f"Unexpected error flushing tracking batch: {e}")
+            ok = False
+
+        if not ok:
+            logger.error(f"Failed to write batch of {sum(chunk[2] for chunk in chunks)} tracking samples")
+
+        for _, future in batch:
+            if future and not future.done():
+                future.set_result(ok)
+
+    def write_columns(self, batches: List[Tuple[str, Dict[str, Any], Dict[str, np.ndarray]]],
+                      spool_position: Optional[Tuple[str, int, int]] = None) -> bool:
+        """
+        Write column batches in one transaction right away, bypassing the queue.
+        
+        Blocks on the database; used by the spool drainer from a worker thread.
+        
+        Args:
+            batches (list): (tag_id, player_info, columns) per tag; batches
+                without a player are skipped and counted in rejected_samples
+            spool_position (tuple, optional): Spool position committed with the rows
+            
+        Returns:
+            bool: True if the transaction was committed
+        """
+        chunks = []
+        for tag_id, player_info, columns in batches:
+            if not player_info.get('_id'):
+                self._reject(tag_id, len(columns['timestamp_micros']), False)
+                continue
+            chunks.append(((tag_id, player_info), columns, len(columns['timestamp_micros'])))
+        BATCH_SAMPLES.observe(sum(chunk[2] for chunk in chunks))
+        with STAGE_SECONDS.labels('db_write').time():
+            return self._write(chunks, spool_position)
+
+    def _write(self, chunks: List[tuple], spool_position: Optional[Tuple[str, int, int]] = None) -> bool:
+        """
+        Build rows for every queued chunk and write them in one transaction.
+
+        The rollup and session state of the players involved is put back if
+        the transaction fails, so a retry of the same samples (as by the
+        spool drainer) continues from where the last commit left off.
+        """
+        player_ids = {(head.get('player', {}) if columns is None else head[1]).get('_id')
+                      for head, columns, _ in chunks}
+        player_ids.discard(None)
+        rollup_state = self.rollup_builder.snapshot(player_ids) if self.rollup_builder else None
+        session_state = self.session_tracker.snapshot(player_ids) if self.session_tracker else None
+        ok = False
+        try:
+            ok = self._build_and_insert(chunks, spool_position)
+        finally:
+            if not ok:
+                if self.rollup_builder:
+                    self.rollup_builder.restore(rollup_state)
+                if self.session_tracker:
+                    self.session_tracker.restore(session_state)
+        return ok
+
+    def _build_and_insert(self, chunks: List[tuple], spool_position: Optional[Tuple[str, int, int]]) -> bool:
+        rows = []
+        assignments = {}
+        rollups = {}
+        sessions = {}
+        for head, columns, _ in chunks:
+            if columns is None:
+                tracking_data = head
+                player_id = tracking_data.get('player', {}).get('_id')
+                if not player_id:
+                    logger.error("Missing player ID in tracking data, dropping sample from batch")
+                    continue
+                rows.append(DatabaseHandler.tracking_values(player_id, tracking_data['timestamp_micros'], tracking_data))
+                assignments[tracking_data['tag_id']] = (player_id, tracking_data)
+                sample = columns_from_sample(tracking_data)
+                if self.rollup_builder:
+                    self.rollup_builder.add(player_id, sample, rollups)
+                if self.session_tracker:
+                    self.session_tracker.add(player_id, sample, sessions)
+            else:
+                tag_id, player_info = head
+                player_id = player_info.get('_id')
+                if not player_id:
+                    logger.error(f"Missing player ID for tag {tag_id}, dropping {len(columns['timestamp_micros'])} samples")
+                    continue
+                rows.extend(DatabaseHandler.tracking_rows_from_columns(player_id, tag_id, columns))
+                assignments[tag_id] = (player_id, {
+                    'tag_id': tag_id,
+                    'player': player_info,
+                    'serial_number': int(columns['serial_number'][-1])
+                })
+                if self.rollup_builder:
+                    self.rollup_builder.add(player_id, columns, rollups)
+                if self.session_tracker:
+                    self.session_tracker.add(player_id, columns, sessions)
+
+        if not rows and not spool_position:
+            return False
+        return self.db_handler.insert_tracking_rows(rows, assignments, rollups, sessions, spool_position)
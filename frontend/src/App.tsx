@@ -46,6 +46,26 @@ interface AnalyticsData {
   };
 }
 
+interface PlayerSession {
+  start_time: number;
+  end_time: number;
+  sample_count: number;
+}
+
+interface AnalyticsJob {
+  job_id: string;
+  state: 'queued' | 'running' | 'done' | 'failed';
+  progress: {
+    stage: string;
+    rows_total?: number | null;
+    rows_fetched?: number;
+    chunks_processed?: number;
+    fraction: number;
+  };
+  eta?: number;
+  error: string | null;
+}
+
 function App() {
   const [players, setPlayers] = useState<Player[]>([]);
   const [selectedPlayer, setSelectedPlayer] = useState('');
@@ -54,7 +74,10 @@ function App() {
   const [analyticsData, setAnalyticsData] = useState<AnalyticsData | null>(null);
   const [loading, setLoading] = useState(false);
   const [progress, setProgress] = useState(0);
+  const [eta, setEta] = useState<number | null>(null);
   const [timeRange, setTimeRange] = useState<{ start: Date | null; end: Date | null }>({ start: null, end: null });
+  const [sessions, setSessions] = useState<PlayerSession[]>([]);
+  const [selectedSession, setSelectedSession] = useState('');
 
   useEffect(() => {
     fetch('http://localhost:5001/api/players')
@@ -74,41 +97,72 @@ function App() {
             setStartTime(start);
             setEndTime(end);
             setTimeRange({ start, end });
+            setSessions(range.sessions || []);
+          } else {
+            setSessions([]);
           }
+          setSelectedSession('');
         });
     }
   }, [selectedPlayer]);
 
+  const handleSessionChange = (value: string) => {
+    setSelectedSession(value);
+    const session = sessions.find(s => String(s.start_time) === value);
+    if (session) {
+      setStartTime(new Date(session.start_time / 1000));
+      setEndTime(new Date(session.end_time / 1000));
+    }
+  };
+
   const handleAnalyze = () => {
     if (!selectedPlayer || !startTime || !endTime) return;
 
     setLoading(true);
     setProgress(0);
+    setEta(null);
 
     const startMicros = startTime.getTime() * 1000;
     const endMicros = endTime.getTime() * 1000;
 
-    const interval = setInterval(() => {
-      setProgress(prev => {
-        if (prev >= 100) {
-          clearInterval(interval);
-          return 100;
-        }
-        return prev + 10; // Simulate progress
-      });
-    }, 1000); // Update every second
-
-    fetch(`http://localhost:5001/api/player-analytics?player_id=${selectedPlayer}&start_time=${startMicros}&end_time=${endMicros}`)
-      .then(res => res.json())
-      .then(data => {
-        setAnalyticsData(data);
-        setLoading(false);
-        clearInterval(interval);
+    const fail = () => {
+      setLoading(false);
+      setEta(null);
+    };
+
+    // Submit the window as a job and follow its progress until the result is ready
+    fetch('http://localhost:5001/api/analytics-jobs', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ player_id: selectedPlayer, start_time: startMicros, end_time: endMicros })
+    })
+      .then(res => (res.ok ? res.json() : Promise.reject(res)))
+      .then((job: AnalyticsJob) => {
+        const events = new EventSource(`http://localhost:5001/api/analytics-jobs/${job.job_id}/events`);
+        events.onmessage = (event) => {
+          const status: AnalyticsJob = JSON.parse(event.data);
+          setProgress(Math.round(status.progress.fraction * 100));
+          setEta(status.eta ?? null);
+          if (status.state === 'failed') {
+            events.close();
+            fail();
+          } else if (status.state === 'done') {
+            events.close();
+            fetch(`http://localhost:5001/api/analytics-jobs/${job.job_id}/result?max_points=2000`)
+              .then(res => (res.ok ? res.json() : Promise.reject(res)))
+              .then(data => {
+                setAnalyticsData(data);
+                setLoading(false);
+              })
+              .catch(fail);
+          }
+        };
+        events.onerror = () => {
+          events.close();
+          fail();
+        };
       })
-      .catch(() => {
-        setLoading(false);
-        clearInterval(interval);
-      });
+      .catch(fail);
   };
 
   const generateCSV = () => {
@@ -151,6 +205,15 @@ function App() {
     document.body.removeChild(downloadLink);
   };
 
+  // Full-resolution rows are streamed by the backend rather than built here
+  const downloadRawData = () => {
+    if (!selectedPlayer || !startTime || !endTime) return;
+
+    const startMicros = startTime.getTime() * 1000;
+    const endMicros = endTime.getTime() * 1000;
+    window.location.href = `http://localhost:5001/api/export?player_id=${selectedPlayer}&start_time=${startMicros}&end_time=${endMicros}&format=csv&compression=gzip`;
+  };
+
   return (
     <LocalizationProvider dateAdapter={AdapterDateFns}>
       <Container maxWidth="lg">
@@ -159,9 +222,14 @@ function App() {
             Player Analytics Dashboard
           </Typography>
           {analyticsData && (
-            <Button variant="contained" onClick={generateCSV}>
-              Export as CSV
-            </Button>
+            <Box sx={{ display: 'flex', gap: 1 }}>
+              <Button variant="contained" onClick={generateCSV}>
+                Export as CSV
+              </Button>
+              <Button variant="outlined" onClick={downloadRawData}>
+                Download raw data
+              </Button>
+            </Box>
           )}
         </Box>
 
@@ -185,6 +253,22 @@ function App() {
             </FormControl>
           </Grid>
 
+          <Grid item xs={12}>
+            <FormControl fullWidth disabled={sessions.length === 0}>
+              <InputLabel>Session</InputLabel>
+              <Select
+                value={selectedSession}
+                onChange={(e) => handleSessionChange(e.target.value)}
+              >
+                {sessions.map(session => (
+                  <MenuItem key={session.start_time} value={String(session.start_time)}>
+                    {new Date(session.start_time / 1000).toLocaleString()} – {new Date(session.end_time / 1000).toLocaleTimeString()} ({session.sample_count} samples)
+                  </MenuItem>
+                ))}
+              </Select>
+            </FormControl>
+          </Grid>
+
           <Grid item xs={12} md={4}>
             <DateTimePicker
               label="Start Time"
@@ -222,7 +306,9 @@ function App() {
           <Box sx={{ mt: 4 }}>
             <LinearProgress variant="determinate" value={progress} />
             <Typography variant="body2" sx={{ mt: 1 }}>
-              {progress < 100 ? `Processing... ETA: ${Math.round((100 - progress) * 0.1)} seconds` : 'Completed'}
+              {progress < 100
+                ? `Processing... ${progress}%${eta !== null ? ` ETA: ${Math.ceil(eta)} seconds` : ''}`
+                : 'Completed'}
             </Typography>
           </Box>
         )}